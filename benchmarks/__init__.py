@@ -0,0 +1 @@
+"""Benchmarks for Phoenix AI Tutor hot paths."""
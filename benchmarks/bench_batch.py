@@ -0,0 +1,77 @@
+"""Benchmark process_batch throughput as concurrency grows.
+
+Runs a syllabus-style batch (explanations with repeats, plus submissions
+that share a question but differ in code) against the simulated backend,
+once as a process_query loop and then through process_batch at each
+concurrency level. Caches are off, so all savings come from batching.
+
+Usage:
+    python -m benchmarks.bench_batch --items 200 --concurrency 1 4 16 32
+"""
+import argparse
+import os
+import time
+
+os.environ.update({
+    "PHOENIX_BACKEND": "simulated",
+    "PHOENIX_WARMUP": "0",
+    "PHOENIX_METRICS_PORT": "0",
+    "PHOENIX_TRACE_SAMPLE_RATE": "0",
+    "PHOENIX_RPM_LIMIT": "0",
+    "PHOENIX_TPM_LIMIT": "0",
+    "PHOENIX_CACHE": "0",
+    "PHOENIX_SIMILARITY_CACHE": "0",
+    "PHOENIX_COALESCE": "0"
+})
+
+
+def make_batch(items: int):
+    topics = ["recursion", "list comprehensions", "decorators", "generators", "closures",
+              "dictionaries", "exceptions", "classes", "sorting algorithms", "file handling"]
+    batch = []
+    for i in range(items):
+        if i % 3 == 2:
+            batch.append({"id": f"submission-{i}", "query": "Review my code for the palindrome assignment",
+                          "code": f"def is_palindrome(s):\n    return s == s[::-1]  # v{i}"})
+        else:
+            batch.append(f"Explain {topics[i % len(topics)]} with an example (unit {i % 25})")
+    return batch
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--ttft", default="lognormal:0.3,0.3")
+    args = parser.parse_args()
+    os.environ["PHOENIX_SIM_TTFT"] = args.ttft
+    os.environ["PHOENIX_SIM_CHUNK_DELAY"] = "constant:0.005"
+
+    from src.core.batch import BatchRun
+    from src.core.system import build_orchestrator
+
+    orchestrator = build_orchestrator()
+    batch = make_batch(args.items)
+
+    start = time.perf_counter()
+    for item in batch:
+        if isinstance(item, str):
+            orchestrator.process_query(item)
+        else:
+            orchestrator.process_query(item["query"], item["code"])
+    loop = time.perf_counter() - start
+    print(f"{'mode':<22} {'time':>8} {'items/s':>9} {'model calls':>12}")
+    print(f"{'process_query loop':<22} {loop:>7.2f}s {args.items / loop:>9.1f} {'':>12}")
+
+    for concurrency in args.concurrency:
+        run = BatchRun(orchestrator, batch, concurrency)
+        start = time.perf_counter()
+        for _ in run:
+            pass
+        elapsed = time.perf_counter() - start
+        calls = run.stats["agent_calls"] + run.stats["syntheses"]
+        print(f"{f'batch, concurrency {concurrency}':<22} {elapsed:>7.2f}s {args.items / elapsed:>9.1f} {calls:>12}")
+
+
+if __name__ == "__main__":
+    main()
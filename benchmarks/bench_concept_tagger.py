@@ -0,0 +1,83 @@
+"""Benchmark concept tagging of agent responses as the taxonomy grows.
+
+Compares the compiled ConceptTagger against a substring scan over the same
+phrases (the approach the orchestrator used for its 15 built-in concepts),
+and checks that streamed tagging finds the same concepts as whole-text tagging.
+
+Usage:
+    python -m benchmarks.bench_concept_tagger --responses 2000 --extra-concepts 0 1000 5000
+"""
+import argparse
+import json
+import random
+import time
+from typing import Dict, List
+
+from src.core.concept_tagger import ConceptTagger, DEFAULT_TAXONOMY_PATH
+
+FILLER = [
+    "the", "a", "you", "can", "use", "this", "to", "when", "your", "code", "is", "each",
+    "value", "then", "we", "call", "it", "with", "here", "example", "note", "that", "python"
+]
+
+
+def legacy_tag(text: str, taxonomy: Dict[str, List[str]]) -> List[str]:
+    """Substring scan: one pass over the text per phrase."""
+    lowered = text.lower()
+    return [concept for concept, phrases in taxonomy.items() if any(p in lowered for p in phrases)]
+
+
+def make_response(rng: random.Random, phrases: List[str], words: int) -> str:
+    """Prose-like text with a phrase from the taxonomy every dozen words or so."""
+    out: List[str] = []
+    while len(out) < words:
+        out.extend(rng.choice(FILLER) for _ in range(rng.randint(6, 18)))
+        out.append(rng.choice(phrases))
+    return " ".join(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--responses", type=int, default=2000)
+    parser.add_argument("--words", type=int, default=400)
+    parser.add_argument("--extra-concepts", type=int, nargs="+", default=[0, 1000, 5000])
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(DEFAULT_TAXONOMY_PATH, encoding="utf-8") as f:
+        base = json.load(f)["concepts"]
+    rng = random.Random(args.seed)
+    phrases = [p for ps in base.values() for p in ps]
+    corpus = [make_response(rng, phrases, args.words) for _ in range(args.responses)]
+
+    print(f"{'concepts':>9} {'tagger resp/s':>14} {'legacy resp/s':>14} {'speedup':>8} {'stream==whole':>14}")
+    for extra in args.extra_concepts:
+        taxonomy = dict(base)
+        for i in range(extra):
+            taxonomy[f"synthetic concept {i}"] = [f"synthetic concept {i}", f"syn{i} term"]
+        tagger = ConceptTagger(taxonomy)
+
+        start = time.perf_counter()
+        for text in corpus:
+            tagger.tag([text])
+        tagger_rps = len(corpus) / (time.perf_counter() - start)
+
+        sample = corpus[:max(1, len(corpus) // 10)]
+        start = time.perf_counter()
+        for text in sample:
+            legacy_tag(text, taxonomy)
+        legacy_rps = len(sample) / (time.perf_counter() - start)
+
+        consistent = True
+        for text in sample:
+            scanner = tagger.scanner()
+            for i in range(0, len(text), 7):
+                scanner.feed(text[i:i + 7])
+            consistent &= scanner.finish() == tagger.tag([text])
+
+        print(f"{len(taxonomy):>9} {tagger_rps:>14,.0f} {legacy_rps:>14,.0f} "
+              f"{tagger_rps / legacy_rps:>7.1f}x {str(consistent):>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""Micro-benchmarks of the per-message hot paths, with regression gating.
+
+Measures the local CPU cost of routing, context serialization, session
+updates, observability logging, prompt building and a whole process_query
+(against a zero-latency simulated model) for a typical session and a long
+one. Each case reports the best time per call over several repeats; cases
+without per-repeat setup run enough calls for each repeat to take at least
+MIN_REPEAT_SECONDS, so timer noise does not dominate sub-microsecond paths.
+
+Timings are divided by a pure-Python calibration loop measured in the same
+run, so a baseline recorded on one machine can be checked on another.
+--check compares against the baseline in benchmarks/baselines/ and exits
+with status 1 when any case is slower than the threshold allows, ignoring
+slowdowns smaller than an absolute floor (--min-delta, in score units).
+
+Usage:
+    python -m benchmarks.bench_hotpaths                   # print timings
+    python -m benchmarks.bench_hotpaths --check           # gate against the baseline
+    python -m benchmarks.bench_hotpaths --save-baseline   # record a new baseline
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Stub the model out and keep I/O (traces, quota waits) off the measured paths
+os.environ.update({
+    "PHOENIX_BACKEND": "simulated",
+    "PHOENIX_SIM_TTFT": "constant:0",
+    "PHOENIX_SIM_CHUNK_DELAY": "constant:0",
+    "PHOENIX_WARMUP": "0",
+    "PHOENIX_METRICS_PORT": "0",
+    "PHOENIX_TRACE_SAMPLE_RATE": "0",
+    "PHOENIX_RPM_LIMIT": "0",
+    "PHOENIX_TPM_LIMIT": "0",
+    "PHOENIX_CACHE": "0",
+    "PHOENIX_SIMILARITY_CACHE": "0",
+    "PHOENIX_COALESCE": "0",
+    "PHOENIX_SESSION_DB": ""
+})
+
+from src.core.concept_tagger import get_concept_tagger  # noqa: E402
+from src.core.observability import ObservabilityManager  # noqa: E402
+from src.core.session_manager import SessionManager  # noqa: E402
+from src.core.session_store import SessionStore  # noqa: E402
+from src.core.system import build_orchestrator  # noqa: E402
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines", "hotpaths.json")
+
+# Shortest time one repeat of a case may take, and the smallest slowdown (in
+# calibration units, ~0.7us on the baseline machine) that can count as a regression
+MIN_REPEAT_SECONDS = 0.005
+MIN_DELTA = 0.02
+
+# Session and observability sizes: (concepts, exercises, code reviews, logged interactions)
+SIZES = {
+    "typical": (25, 10, 10, 50),
+    "long": (200, 5000, 5000, 100000)
+}
+
+QUERIES = [
+    "Explain recursion in python with an example",
+    "What is the difference between a list and a tuple?",
+    "My loop never ends, can you debug it?",
+    "Give me a practice exercise on dictionaries",
+    "Write a function that checks whether a string is a palindrome",
+    "hello there"
+]
+
+LONG_QUERY = ("I get this traceback when my decorator wraps a generator inside a class method "
+              "and the async loop calls it from another thread " * 12)
+
+
+def calibrate() -> float:
+    """Seconds per iteration of a fixed pure-Python workload."""
+    def work():
+        d = {}
+        for i in range(200):
+            d[i % 17] = d.get(i % 17, 0) + len(str(i))
+        return d
+    return best_time(work, number=200, repeat=5)
+
+
+def best_time(fn: Callable[[], Any], number: int, repeat: int,
+              setup: Optional[Callable[[], None]] = None) -> float:
+    """Best seconds per call of fn over repeat runs of number calls (GC paused, as in timeit)."""
+    best = float("inf")
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            best = min(best, (time.perf_counter() - start) / number)
+        finally:
+            gc.enable()
+    return best
+
+
+def scale_number(fn: Callable[[], Any], number: int) -> int:
+    """Calls per repeat, at least number, for one repeat of fn to take MIN_REPEAT_SECONDS."""
+    start = time.perf_counter()
+    for _ in range(number):
+        fn()
+    elapsed = time.perf_counter() - start
+    if elapsed >= MIN_REPEAT_SECONDS:
+        return number
+    return max(number, int(number * MIN_REPEAT_SECONDS / max(elapsed, 1e-9)) + 1)
+
+
+def make_session(size: str) -> SessionManager:
+    concepts, exercises, reviews, _ = SIZES[size]
+    session_mgr = SessionManager(SessionStore())
+    session_mgr.create_session("bench", "intermediate")
+    names = get_concept_tagger().concepts[:concepts]
+    session_mgr.add_concepts(names)
+    session_mgr.add_progress(5 * len(names))
+
+    def fill(context):
+        context["exercises_completed"].extend(f"Give me a practice exercise on topic {i}" for i in range(exercises))
+        context["code_reviews"].extend({"query": f"Review my code for bug {i}", "timestamp": "2026-01-01T00:00:00"}
+                                       for i in range(reviews))
+    session_mgr.store.update(session_mgr.session_id, fill)
+    return session_mgr
+
+
+def make_observability(size: str, responses: Dict[str, str]) -> ObservabilityManager:
+    observability = ObservabilityManager()
+    for i in range(SIZES[size][3]):
+        observability.log(QUERIES[i % len(QUERIES)], responses, "final answer", {"latency": 0.5})
+    return observability
+
+
+Case = Tuple[str, Callable[[], Any], int, Optional[Callable[[], None]]]
+
+
+def build_cases(size: str) -> List[Case]:
+    """(name, fn, minimum calls per repeat, setup before each repeat) for every hot path."""
+    orchestrator = build_orchestrator(make_session(size))
+    backend = orchestrator.model
+    responses = {name: backend.respond(f"{name}: {QUERIES[0]}")
+                 for name in ("ConceptExplainer", "PracticeGenerator", "CodeReviewer")}
+    observability = make_observability(size, responses)
+    queries = QUERIES if size == "typical" else [LONG_QUERY]
+    ctx, _ = orchestrator.context_builder.build(orchestrator.session_manager.get_context())
+    agent = orchestrator.agents["ConceptExplainer"]
+    counter = [0]
+
+    def next_query() -> str:
+        counter[0] += 1
+        return queries[counter[0] % len(queries)]
+
+    def fresh_session():
+        # these cases grow the session, so each repeat starts from the same size
+        orchestrator.session_manager = make_session(size)
+
+    return [
+        ("decide_agents", lambda: orchestrator.decide_agents(next_query()), 2000, None),
+        ("context_build", lambda: orchestrator.context_builder.build(orchestrator.session_manager.get_context()),
+         500, None),
+        ("session_update", lambda: orchestrator._update_session_from_responses(responses, next_query()),
+         200, fresh_session),
+        ("observability_log", lambda: observability.log(next_query(), responses, "final answer", {"latency": 0.5}),
+         2000, None),
+        ("agent_usage_stats", observability.get_agent_usage_stats, 5000, None),
+        ("build_prompt", lambda: agent.build_prompt(next_query(), ctx), 5000, None),
+        ("process_query", lambda: orchestrator.process_query(next_query()), 50, fresh_session)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--check", action="store_true", help="fail if a case regressed against the baseline")
+    parser.add_argument("--save-baseline", action="store_true", help=f"write results to {BASELINE_PATH}")
+    parser.add_argument("--threshold", type=float,
+                        help="allowed slowdown as a fraction (default: the baseline's, else 0.5)")
+    parser.add_argument("--min-delta", type=float,
+                        help=f"smallest score increase that counts as a regression "
+                             f"(default: the baseline's, else {MIN_DELTA})")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    args = parser.parse_args()
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    threshold = args.threshold if args.threshold is not None else (baseline or {}).get("threshold", 0.5)
+    min_delta = args.min_delta if args.min_delta is not None else (baseline or {}).get("min_delta", MIN_DELTA)
+
+    def regressed(score: float, expected: float) -> bool:
+        return score / expected - 1 > threshold and score - expected > min_delta
+
+    cases = {f"{name}/{size}": (fn, number if setup else scale_number(fn, number), setup)
+             for size in SIZES for name, fn, number, setup in build_cases(size)}
+    # Calibrate between cases and keep the best time, so one noisy moment on
+    # a shared machine does not skew every score
+    calibration = float("inf")
+    results: Dict[str, float] = {}
+    for case, (fn, number, setup) in cases.items():
+        calibration = min(calibration, calibrate())
+        results[case] = best_time(fn, number, args.repeat, setup)
+    if args.check and baseline is not None:
+        # Measure apparent regressions again, longer, before failing on them
+        for case, seconds in results.items():
+            expected = baseline["scores"].get(case)
+            if expected is not None and regressed(seconds / calibration, expected):
+                fn, number, setup = cases[case]
+                results[case] = min(seconds, best_time(fn, number, args.repeat * 3, setup))
+
+    print(f"calibration {calibration * 1e6:.1f}us")
+    print(f"{'case':<30} {'us/call':>10} {'score':>8} {'baseline':>9} {'change':>8}")
+    regressions = []
+    for case, seconds in results.items():
+        score = seconds / calibration
+        line = f"{case:<30} {seconds * 1e6:>10.2f} {score:>8.3f}"
+        if baseline and case in baseline["scores"]:
+            change = score / baseline["scores"][case] - 1
+            line += f" {baseline['scores'][case]:>9.3f} {change:>+7.0%}"
+            if regressed(score, baseline["scores"][case]):
+                regressions.append(case)
+                line += "  REGRESSION"
+        print(line)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "threshold": threshold,
+                "min_delta": min_delta,
+                "calibration_us": round(calibration * 1e6, 3),
+                "scores": {case: round(seconds / calibration, 4) for case, seconds in results.items()}
+            }, f, indent=2)
+            f.write("\n")
+        print(f"baseline written to {args.baseline}")
+
+    if args.check:
+        if baseline is None:
+            print(f"no baseline at {args.baseline}; run with --save-baseline first")
+            sys.exit(2)
+        if regressions:
+            print(f"{len(regressions)} case(s) slower than the baseline by more than {threshold:.0%} "
+                  f"and {min_delta} score: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"no regressions beyond {threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
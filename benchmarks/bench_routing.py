@@ -0,0 +1,73 @@
+"""Benchmark query routing throughput on a large synthetic corpus.
+
+Compares the compiled QueryRouter against the previous keyword-scan
+implementation, and shows how each scales as the rules table grows.
+
+Usage:
+    python -m benchmarks.bench_routing --queries 50000 --extra-keywords 0 500 2000
+"""
+import argparse
+import copy
+import random
+import time
+from typing import List
+
+from src.core.router import QueryRouter, DEFAULT_RULES_PATH
+
+WORDS = [
+    "python", "list", "loop", "function", "recursion", "decorator", "class", "error", "my",
+    "code", "the", "a", "this", "which", "is", "faster", "explain", "why", "write", "give",
+    "me", "exercise", "traceback", "review", "optimize", "hello", "thanks", "dictionary",
+    "generator", "async", "thread", "broken", "not", "working", "create", "quiz", "sorting"
+]
+
+
+def legacy_decide(q: str, general: List[str], keyword_lists: List[List[str]], has_code: bool = False) -> List[str]:
+    """The original substring-scan routing, parameterized by keyword lists."""
+    q = q.lower().strip()
+    if any(p in q for p in general) or \
+       (len(q.split()) <= 3 and any(w in q for w in ["hi", "hello", "hey", "bye", "thanks"])):
+        return ["GeneralChatAgent"]
+    selected = [str(i) for i, words in enumerate(keyword_lists) if any(w in q for w in words)]
+    if not selected:
+        selected.append("ConceptExplainer" if len(q.split()) > 2 else "GeneralChatAgent")
+    return selected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=50000)
+    parser.add_argument("--extra-keywords", type=int, nargs="+", default=[0, 500, 2000])
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    corpus = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 14))) for _ in range(args.queries)]
+    base = QueryRouter.from_file(DEFAULT_RULES_PATH)
+    base_table = {"rules": base.rules, "default_agent": base.default_agent,
+                  "default_min_words": base.default_min_words, "fallback_agent": base.fallback_agent}
+
+    print(f"{'extra':>6} {'router q/s':>12} {'legacy q/s':>12} {'speedup':>8}")
+    for extra in args.extra_keywords:
+        table = copy.deepcopy(base_table)
+        for i in range(extra):
+            table["rules"][1 + i % (len(table["rules"]) - 1)]["patterns"].append(f"kw{i} term{i}")
+        router = QueryRouter(table)
+        general = table["rules"][0]["patterns"]
+        keyword_lists = [r["patterns"] for r in table["rules"][1:]]
+
+        start = time.perf_counter()
+        for q in corpus:
+            router.route(q)
+        router_qps = len(corpus) / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for q in corpus:
+            legacy_decide(q, general, keyword_lists)
+        legacy_qps = len(corpus) / (time.perf_counter() - start)
+
+        print(f"{extra:>6} {router_qps:>12,.0f} {legacy_qps:>12,.0f} {router_qps / legacy_qps:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
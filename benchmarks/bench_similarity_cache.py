@@ -0,0 +1,69 @@
+"""Benchmark SimilarityCache lookups against a large synthetic index.
+
+Usage:
+    python -m benchmarks.bench_similarity_cache --entries 100000 --lookups 5000
+"""
+import argparse
+import random
+import time
+
+from src.utils.similarity_cache import SimilarityCache
+
+TOPICS = [
+    "decorator", "generator", "recursion", "closure", "list comprehension", "dictionary",
+    "tuple", "set", "lambda", "iterator", "context manager", "exception", "class",
+    "inheritance", "polymorphism", "module", "package", "async", "await", "thread",
+    "process", "file", "json", "regex", "string", "slice", "sorting", "binary search",
+    "hash table", "linked list", "stack", "queue", "tree", "graph", "heap", "dynamic programming"
+]
+LANGUAGES = ["python", "javascript", "java", "rust", "go", "c++", "typescript", "kotlin"]
+TEMPLATES = [
+    "what is a {lang} {a}", "explain {a} in {lang}", "how does {a} work with {b} in {lang}",
+    "difference between {a} and {b} in {lang}", "when should i use {a} over {b}",
+    "{lang} {a} vs {b} performance", "why is my {a} slower than {b} in {lang}"
+]
+AGENT_SETS = [("ConceptExplainer",), ("ConceptExplainer", "PracticeGenerator"), ("CodeGenerator",)]
+
+
+def make_query(rng: random.Random) -> str:
+    """Build one synthetic student question."""
+    a, b = rng.sample(TOPICS, 2)
+    return rng.choice(TEMPLATES).format(a=a, b=b, lang=rng.choice(LANGUAGES)) + f" case {rng.randrange(10000)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cache = SimilarityCache(max_entries=args.entries)
+    queries = [(make_query(rng), rng.choice(AGENT_SETS)) for _ in range(args.entries)]
+
+    start = time.perf_counter()
+    for query, agents in queries:
+        cache.store(query, agents, {"final_response": query, "agent_responses": {}})
+    fill = time.perf_counter() - start
+
+    probes = [rng.choice(queries) if i % 2 else (make_query(rng), rng.choice(AGENT_SETS))
+              for i in range(args.lookups)]
+    timings = []
+    for query, agents in probes:
+        t = time.perf_counter()
+        cache.lookup(query, agents)
+        timings.append(time.perf_counter() - t)
+    timings.sort()
+
+    def pct(p: float) -> float:
+        return timings[min(len(timings) - 1, int(p * len(timings)))] * 1000
+
+    print(f"entries={args.entries} fill={fill:.1f}s ({fill / args.entries * 1e6:.0f}us/insert)")
+    print(f"lookups={args.lookups} p50={pct(0.5):.3f}ms p95={pct(0.95):.3f}ms "
+          f"p99={pct(0.99):.3f}ms max={timings[-1] * 1000:.3f}ms")
+    print(cache.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Benchmark cold start: module import, first system start and per-session setup.
+
+Import and first-start times are measured in fresh interpreters (median of
+--runs). Session setup compares new_session(), which binds the shared
+orchestrator, with building a whole orchestrator per session as the app did
+before. Warm-up is disabled and a placeholder API key is used if none is set,
+so no request reaches the model.
+
+Usage:
+    python -m benchmarks.bench_startup --runs 5 --sessions 200
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+FIRST_START_SNIPPET = """
+import time
+from src.core.system import get_orchestrator
+start = time.perf_counter()
+get_orchestrator()
+print(time.perf_counter() - start)
+"""
+
+
+def child_env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.setdefault("GOOGLE_API_KEY", "benchmark-placeholder")
+    env["PHOENIX_WARMUP"] = "0"
+    env["PHOENIX_METRICS_PORT"] = "0"
+    env["PYTHONPATH"] = os.pathsep.join(p for p in (os.getcwd(), env.get("PYTHONPATH")) if p)
+    return env
+
+
+def time_in_child(snippet: str, runs: int) -> float:
+    """Median seconds printed by snippet across fresh interpreters."""
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", snippet], env=child_env(),
+                             capture_output=True, text=True, check=True)
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--sessions", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'step':<40} {'median':>10}")
+    for label, module in (("import src.core.system", "src.core.system"),
+                          ("import google.generativeai (deferred)", "google.generativeai")):
+        seconds = time_in_child(IMPORT_SNIPPET.format(module=module), args.runs)
+        print(f"{label:<40} {seconds * 1000:>8.1f}ms")
+    seconds = time_in_child(FIRST_START_SNIPPET, args.runs)
+    print(f"{'first get_orchestrator()':<40} {seconds * 1000:>8.1f}ms")
+
+    os.environ.update({k: v for k, v in child_env().items() if k.startswith(("GOOGLE_", "PHOENIX_"))})
+    from src.core.session_manager import SessionManager
+    from src.core.session_store import SessionStore
+    from src.core.system import build_orchestrator, get_orchestrator, new_session
+
+    get_orchestrator()
+    start = time.perf_counter()
+    for _ in range(args.sessions):
+        new_session()
+    shared = (time.perf_counter() - start) / args.sessions
+
+    store = SessionStore()
+    start = time.perf_counter()
+    for _ in range(args.sessions):
+        session_mgr = SessionManager(store)
+        session_mgr.create_session("user", "beginner")
+        build_orchestrator(session_mgr)
+    rebuilt = (time.perf_counter() - start) / args.sessions
+
+    print(f"{'new session (shared orchestrator)':<40} {shared * 1000:>8.3f}ms")
+    print(f"{'new session (rebuild orchestrator)':<40} {rebuilt * 1000:>8.3f}ms")
+    print(f"speedup: {rebuilt / shared:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Load-test the orchestrator offline against the simulated model backend.
+
+Replays a weighted mix of queries through OrchestratorAgent.process_query
+from --concurrency simulated learners (each with its own session) until
+--queries have been answered, then reports throughput and latency
+percentiles. No network or API key is needed.
+
+A query mix is a JSONL file with one {"query": ..., "code": ..., "weight": ...}
+object per line ("code" and "weight" are optional); without one a built-in
+mix of concept, debugging, practice and chat questions is used.
+
+Usage:
+    python -m benchmarks.loadgen --concurrency 32 --queries 2000 --ttft lognormal:0.8,0.35
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+DEFAULT_MIX = [
+    {"query": "Explain recursion in python with an example", "weight": 5},
+    {"query": "What is the difference between a list and a tuple?", "weight": 4},
+    {"query": "How do decorators work?", "weight": 3},
+    {"query": "My loop never ends, can you debug it?", "code": "i = 0\nwhile i < 10:\n    print(i)", "weight": 3},
+    {"query": "Why do I get a KeyError here?", "code": "d = {}\nprint(d['x'])", "weight": 2},
+    {"query": "Give me a practice exercise on dictionaries", "weight": 3},
+    {"query": "Write a function that checks whether a string is a palindrome", "weight": 2},
+    {"query": "Review my code and explain generators", "code": "def gen():\n    yield 1", "weight": 2},
+    {"query": "hello there", "weight": 2},
+    {"query": "thanks, that helped!", "weight": 1}
+]
+
+
+def load_mix(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--mix", help="JSONL query mix (default: built-in mix)")
+    parser.add_argument("--ttft", default="lognormal:0.8,0.35", help="time to first chunk distribution")
+    parser.add_argument("--chunk-delay", default="constant:0.02", help="delay between chunks distribution")
+    parser.add_argument("--output-words", type=int, default=150)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--agent-workers", type=int, help="PHOENIX_MAX_AGENT_WORKERS for the run")
+    parser.add_argument("--rpm", type=float, help="PHOENIX_RPM_LIMIT for the run (0 removes it)")
+    parser.add_argument("--tpm", type=float, help="PHOENIX_TPM_LIMIT for the run (0 removes it)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="disable response/similarity caches and coalescing, so every query hits the model")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    # Settings are read when the modules are imported, so set them first
+    os.environ.update({
+        "PHOENIX_BACKEND": "simulated",
+        "PHOENIX_SIM_TTFT": args.ttft,
+        "PHOENIX_SIM_CHUNK_DELAY": args.chunk_delay,
+        "PHOENIX_SIM_OUTPUT_WORDS": str(args.output_words),
+        "PHOENIX_SIM_ERROR_RATE": str(args.error_rate),
+        "PHOENIX_SIM_SEED": str(args.seed),
+        "PHOENIX_WARMUP": "0",
+        "PHOENIX_METRICS_PORT": "0"
+    })
+    if args.agent_workers:
+        os.environ["PHOENIX_MAX_AGENT_WORKERS"] = str(args.agent_workers)
+    if args.rpm is not None:
+        os.environ["PHOENIX_RPM_LIMIT"] = str(args.rpm)
+    if args.tpm is not None:
+        os.environ["PHOENIX_TPM_LIMIT"] = str(args.tpm)
+    if args.no_cache:
+        os.environ.update({"PHOENIX_CACHE": "0", "PHOENIX_SIMILARITY_CACHE": "0", "PHOENIX_COALESCE": "0"})
+
+    from src.core.system import get_orchestrator, new_session
+    from src.utils.helpers import is_error_response
+
+    mix = load_mix(args.mix) if args.mix else DEFAULT_MIX
+    weights = [item.get("weight", 1) for item in mix]
+    rng = random.Random(args.seed)
+    plan = rng.choices(mix, weights=weights, k=args.queries)
+
+    orchestrator = get_orchestrator()
+    models = {id(agent.model): agent.model for agent in [orchestrator, *orchestrator.agents.values()]}
+    latencies: List[float] = []
+    errors = 0
+    next_index = 0
+    lock = threading.Lock()
+
+    def learner(n: int):
+        nonlocal errors, next_index
+        session = new_session(f"load{n}")
+        while True:
+            with lock:
+                if next_index >= len(plan):
+                    return
+                item = plan[next_index]
+                next_index += 1
+            start = time.perf_counter()
+            result = session.process_query(item["query"], item.get("code", ""))
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                errors += is_error_response(result["final_response"])
+
+    calls_before = sum(getattr(m, "calls", 0) for m in models.values())
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for future in [pool.submit(learner, n) for n in range(args.concurrency)]:
+            future.result()
+    wall = time.perf_counter() - start
+    calls = sum(getattr(m, "calls", 0) for m in models.values()) - calls_before
+
+    latencies.sort()
+    print(f"queries      {len(latencies)} at concurrency {args.concurrency} in {wall:.2f}s")
+    print(f"throughput   {len(latencies) / wall:.1f} queries/s, {calls / wall:.1f} model calls/s ({calls} calls)")
+    print(f"latency      p50 {percentile(latencies, 0.50):.3f}s  p90 {percentile(latencies, 0.90):.3f}s  "
+          f"p95 {percentile(latencies, 0.95):.3f}s  p99 {percentile(latencies, 0.99):.3f}s  max {latencies[-1]:.3f}s")
+    print(f"errors       {errors} ({errors / len(latencies):.1%} of answers)")
+
+
+if __name__ == "__main__":
+    main()
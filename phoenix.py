@@ -1,5 +1,17 @@
-"""Entry point for Phoenix Multi-Agent AI Tutor."""
-from src.main import run_streamlit_app
+"""Entry point for Phoenix Multi-Agent AI Tutor.
+
+    streamlit run phoenix.py               # Streamlit chat app
+    python phoenix.py serve [--workers N]  # headless HTTP API
+"""
+import sys
 
 if __name__ == "__main__":
-    run_streamlit_app()
+    # settings in .env are read when src is imported, so load it first
+    from dotenv import load_dotenv
+    load_dotenv()
+    if len(sys.argv) > 1 and sys.argv[1] == "serve":
+        from src.server import main
+        main(sys.argv[2:])
+    else:
+        from src.main import run_streamlit_app
+        run_streamlit_app()
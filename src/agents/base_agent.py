@@ -1,23 +1,37 @@
 """Base agent class for all specialized agents."""
+import time
 import logging
-from datetime import datetime
-from typing import Dict, Any, List
-import google.generativeai as genai
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, List, Optional
 
-from src.utils.helpers import safe_generate, MODEL_ID, GEN_CONFIG
+from src.utils.helpers import (
+    safe_generate, safe_generate_stream, asafe_generate, is_cacheable_response,
+    estimate_tokens, MODEL_ID, GEN_CONFIG, COALESCE_ENABLED
+)
+from src.utils.backends import ModelBackend
+from src.utils.model_registry import get_model_registry
+from src.utils.cache import ResponseCache, get_response_cache, make_cache_key
+from src.utils.metrics import AGENT_REQUESTS, AGENT_IN_FLIGHT, CACHE_LOOKUPS, COALESCED_REQUESTS
+from src.utils.singleflight import SingleFlight, get_single_flight
+from src.utils.history import InteractionHistory, spill_path_for
 
 
 class BaseAgent:
     """Base class for all specialized agents."""
+
+    # Whether responses from this agent may be served from the response cache
+    cache_enabled = True
     
-    def __init__(self, name: str, system_prompt: str, model_id: str = MODEL_ID):
+    def __init__(self, name: str, system_prompt: str, model_id: str = MODEL_ID,
+                 cache: Optional[ResponseCache] = None, flight: Optional[SingleFlight] = None,
+                 backend: Optional[ModelBackend] = None):
         self.name = name
         self.system_prompt = system_prompt
-        try:
-            self.model = genai.GenerativeModel(model_id, generation_config=GEN_CONFIG)
-        except TypeError:
-            self.model = genai.GenerativeModel(model_id)
-        self.history: List[Dict[str, Any]] = []
+        self.model_id = model_id
+        self.cache = cache if cache is not None else (get_response_cache() if self.cache_enabled else None)
+        self.model = backend if backend is not None else get_model_registry().get(model_id, GEN_CONFIG)
+        self.history = InteractionHistory(name, spill_path=spill_path_for(name))
+        self.flight = flight if flight is not None else (get_single_flight() if COALESCE_ENABLED else None)
 
     def build_prompt(self, user_prompt: str, context: str = "") -> str:
         """Build the prompt for the agent."""
@@ -32,21 +46,124 @@ USER:
 
 Provide a concise helpful response."""
 
-    def generate_response(self, user_prompt: str, context: str = "") -> str:
+    def generate_response(self, user_prompt: str, context: str = "",
+                          metrics: Optional[Dict[str, Any]] = None) -> str:
         """Generate a response from the agent."""
+        with self._in_flight():
+            prompt, key, cached = self._begin_call("generate", user_prompt, context, metrics)
+            if cached is not None:
+                self.log_interaction(user_prompt, cached)
+                return cached
+            if self.flight is None:
+                result, shared = safe_generate(self.model, prompt, metrics), False
+            else:
+                result, shared = self.flight.do(key, lambda: safe_generate(self.model, prompt, metrics))
+            if shared:
+                self._note_coalesced("generate", metrics)
+            else:
+                self._cache_store(key, result)
+            self.log_interaction(user_prompt, result)
+            return result
+
+    def stream_response(self, user_prompt: str, context: str = "",
+                        metrics: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """Generate a response from the agent, yielding text chunks as they arrive."""
+        with self._in_flight():
+            prompt, key, cached = self._begin_call("stream", user_prompt, context, metrics)
+            if cached is not None:
+                self.log_interaction(user_prompt, cached)
+                yield cached
+                return
+            if self.flight is None:
+                chunks, shared = safe_generate_stream(self.model, prompt, metrics), False
+            else:
+                chunks, shared = self.flight.stream(key, lambda: safe_generate_stream(self.model, prompt, metrics))
+            if shared:
+                self._note_coalesced("stream", metrics)
+            parts: List[str] = []
+            for text in chunks:
+                parts.append(text)
+                yield text
+            result = "".join(parts).strip()
+            if not shared:
+                self._cache_store(key, result)
+            self.log_interaction(user_prompt, result)
+
+    async def agenerate_response(self, user_prompt: str, context: str = "",
+                                 metrics: Optional[Dict[str, Any]] = None) -> str:
+        """Generate a response from the agent without blocking the event loop."""
+        with self._in_flight():
+            prompt, key, cached = self._begin_call("agenerate", user_prompt, context, metrics)
+            if cached is not None:
+                self.log_interaction(user_prompt, cached)
+                return cached
+            if self.flight is None:
+                result, shared = await asafe_generate(self.model, prompt, metrics), False
+            else:
+                result, shared = await self.flight.ado(key, lambda: asafe_generate(self.model, prompt, metrics))
+            if shared:
+                self._note_coalesced("agenerate", metrics)
+            else:
+                self._cache_store(key, result)
+            self.log_interaction(user_prompt, result)
+            return result
+
+    @contextmanager
+    def _in_flight(self):
+        """Count a request against this agent for as long as it runs."""
+        AGENT_REQUESTS.inc(agent=self.name)
+        AGENT_IN_FLIGHT.inc(agent=self.name)
+        try:
+            yield
+        finally:
+            AGENT_IN_FLIGHT.dec(agent=self.name)
+
+    def _begin_call(self, verb: str, user_prompt: str, context: str,
+                    metrics: Optional[Dict[str, Any]]):
+        """Build and log the prompt and consult the cache.
+
+        Returns (prompt, cache key, cached response or None).
+        """
         prompt = self.build_prompt(user_prompt, context)
-        logging.info("[%s] generate called. prompt_len=%d", self.name, len(prompt))
-        result = safe_generate(self.model, prompt)
-        self.log_interaction(user_prompt, result)
-        return result
+        logging.info("[%s] %s called. prompt_len=%d context_tokens=%d",
+                     self.name, verb, len(prompt), estimate_tokens(context))
+        key, cached = self._cache_lookup(prompt)
+        if metrics is not None:
+            metrics["cache_hit"] = cached is not None
+        return prompt, key, cached
+
+    def _cache_lookup(self, prompt: str):
+        """Return (cache key, cached response) for a built prompt.
+
+        The key also identifies identical in-flight calls for coalescing, so
+        it is computed even when this agent has no cache.
+        """
+        key = make_cache_key(self.name, self.model_id, GEN_CONFIG, prompt)
+        if self.cache is None:
+            return key, None
+        cached = self.cache.get(key)
+        CACHE_LOOKUPS.inc(cache="response", result="hit" if cached is not None else "miss")
+        if cached is not None:
+            logging.info("[%s] response cache hit", self.name)
+        return key, cached
+
+    def _cache_store(self, key: str, result: str):
+        """Cache a fresh response unless it is an error or empty fallback."""
+        if self.cache is not None and is_cacheable_response(result):
+            self.cache.set(key, result)
+
+    def _note_coalesced(self, mode: str, metrics: Optional[Dict[str, Any]]):
+        """Count a request that joined an identical in-flight call."""
+        COALESCED_REQUESTS.inc(agent=self.name, mode=mode)
+        if metrics is not None:
+            metrics["coalesced"] = True
+        logging.info("[%s] %s coalesced with an identical in-flight call", self.name, mode)
 
     def log_interaction(self, prompt: str, response: str):
         """Log the interaction for observability."""
-        entry = {
-            "timestamp": datetime.now().isoformat(),
-            "agent": self.name,
-            "prompt": prompt,
-            "response_summary": response[:400]
-        }
-        self.history.append(entry)
-        logging.info("Interaction logged for %s", self.name)
\ No newline at end of file
+        self.history.append(prompt, response, time.time())
+        logging.info("Interaction logged for %s", self.name)
+
+    def recent_interactions(self, n: int = 10) -> List[Dict[str, Any]]:
+        """Get the last n logged interactions, oldest first."""
+        return self.history.last(n)
\ No newline at end of file
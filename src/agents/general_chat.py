@@ -4,6 +4,9 @@ from .base_agent import BaseAgent
 
 class GeneralChatAgent(BaseAgent):
     """Agent for handling general conversation and non-programming queries."""
+
+    # Small talk should feel fresh, so never replay cached replies
+    cache_enabled = False
     
     def __init__(self):
         prompt = """You are GeneralChatAgent: a friendly, warm, and engaging AI assistant specialized in casual conversation and general questions. 
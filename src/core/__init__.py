@@ -1,6 +1,7 @@
 """Core components package."""
 from .session_manager import SessionManager
+from .session_store import SessionStore, get_session_store
 from .observability import ObservabilityManager
 from .orchestrator import OrchestratorAgent
 
-__all__ = ['SessionManager', 'ObservabilityManager', 'OrchestratorAgent']
\ No newline at end of file
+__all__ = ['SessionManager', 'SessionStore', 'get_session_store', 'ObservabilityManager', 'OrchestratorAgent']
\ No newline at end of file
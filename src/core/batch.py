@@ -0,0 +1,267 @@
+"""Bulk processing of many queries through the orchestrator."""
+import os
+import json
+import time
+import queue
+import hashlib
+import logging
+import contextvars
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from src.utils.scheduler import request_scope
+from src.utils.metrics import QUERIES
+
+
+def batch_item_key(query: str, code: str = "") -> str:
+    """Identity of a batch entry; entries with the same query and code are answered once."""
+    return hashlib.sha256(json.dumps([query, code]).encode("utf-8")).hexdigest()[:32]
+
+
+class BatchCheckpoint:
+    """Append-only JSONL file of finished batch entries, one {"key", "result"} per line.
+
+    A batch that crashed can be run again with the same checkpoint; entries
+    already in the file are returned from it instead of being processed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Finished results by entry key; a torn last line from a crash is ignored."""
+        done: Dict[str, Dict[str, Any]] = {}
+        if not os.path.exists(self.path):
+            return done
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    done[record["key"]] = record["result"]
+                except (ValueError, KeyError, TypeError):
+                    logging.warning("Skipping unreadable checkpoint line in %s", self.path)
+        return done
+
+    def append(self, key: str, result: Dict[str, Any]):
+        """Record a finished entry durably before it is reported."""
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps({"key": key, "result": result}, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class _Entry:
+    """One distinct (query, code) pair of a batch and the items asking it."""
+
+    __slots__ = ("key", "query", "code", "ids", "agents", "waiting", "responses", "metrics", "started")
+
+    def __init__(self, key: str, query: str, code: str):
+        self.key = key
+        self.query = query
+        self.code = code
+        self.ids: List[Any] = []
+        self.agents: List[str] = []
+        self.waiting = 0
+        self.responses: Dict[str, str] = {}
+        self.metrics: Dict[str, Any] = {"shared_calls": 0}
+        self.started = 0.0
+
+
+class _AgentCall:
+    """One distinct agent call and the entries waiting for its response."""
+
+    __slots__ = ("agent", "prompt", "waiters", "result")
+
+    def __init__(self, agent: str, prompt: str):
+        self.agent = agent
+        self.prompt = prompt
+        self.waiters: List[_Entry] = []
+        self.result: Optional[str] = None
+
+
+class BatchRun:
+    """Answer a batch of queries with deduplicated, bounded-concurrency model calls.
+
+    - Items with the same query and code are answered once.
+    - Agent calls with the same agent and prompt are made once per batch,
+      even across different entries (e.g. submissions sharing a question).
+    - Pending calls are queued per agent, and agents take turns, so one
+      agent's backlog cannot hold up the entries waiting on the others.
+    - At most ``concurrency`` model calls run at once, at "background"
+      priority so interactive users keep priority for the API quota.
+      Syntheses of otherwise finished entries go before new agent calls.
+    - Finished entries are written to the checkpoint (if any) and yielded
+      in completion order.
+
+    The coordination runs in the consuming thread between yields; workers
+    only make model calls.
+    """
+
+    def __init__(self, orchestrator, items: Iterable[Union[str, Dict[str, Any]]],
+                 concurrency: int, checkpoint: Optional[str] = None):
+        self.orchestrator = orchestrator
+        self.concurrency = max(1, concurrency)
+        self.checkpoint = BatchCheckpoint(checkpoint) if checkpoint else None
+        self.entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        for index, item in enumerate(items):
+            if isinstance(item, str):
+                item = {"query": item}
+            query, code = item["query"], item.get("code", "")
+            key = batch_item_key(query, code)
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = _Entry(key, query, code)
+            entry.ids.append(item.get("id", index))
+        self.batch_id = hashlib.sha256("".join(self.entries).encode("utf-8")).hexdigest()[:8]
+        self._calls: Dict[Tuple[str, str], _AgentCall] = {}
+        self._agent_queues: "OrderedDict[str, Deque[_AgentCall]]" = OrderedDict()
+        self._syntheses: Deque[_Entry] = deque()
+        self._finished: Deque[Tuple[_Entry, str]] = deque()
+        self._events: "queue.Queue" = queue.Queue()
+        self._running = 0
+        self._active = 0
+        self.stats = {"items": sum(len(e.ids) for e in self.entries.values()), "entries": len(self.entries),
+                      "resumed": 0, "agent_calls": 0, "shared_calls": 0, "syntheses": 0}
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self.run()
+
+    def run(self) -> Iterator[Dict[str, Any]]:
+        """Process the batch, yielding one result per input item as entries finish."""
+        start = time.time()
+        pending: Deque[_Entry] = deque()
+        done = self.checkpoint.load() if self.checkpoint else {}
+        for entry in self.entries.values():
+            if entry.key in done:
+                self.stats["resumed"] += 1
+                yield from self._results(entry, done[entry.key], resumed=True)
+            else:
+                pending.append(entry)
+        if pending:
+            logging.info("Batch %s started | items=%d | entries=%d | resumed=%d | concurrency=%d",
+                         self.batch_id, self.stats["items"], len(self.entries),
+                         self.stats["resumed"], self.concurrency)
+
+        ctx, _ = self.orchestrator.context_builder.build(self.orchestrator.session_manager.get_context())
+        pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="phoenix-batch")
+        try:
+            while pending or self._active:
+                # Keep a few entries' worth of calls queued beyond what is running
+                while pending and self._active < self.concurrency * 2:
+                    self._admit(pending.popleft())
+                while self._finished:
+                    yield from self._finish(*self._finished.popleft())
+                self._dispatch(pool, ctx)
+                if not self._running:
+                    continue
+                kind, subject, result = self._events.get()
+                self._running -= 1
+                if kind == "agent":
+                    self._agent_done(subject, result)
+                else:
+                    self._finished.append((subject, result))
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+            if self.checkpoint:
+                self.checkpoint.close()
+        logging.info("Batch %s done | entries=%d | agent_calls=%d | shared_calls=%d | time=%.2fs",
+                     self.batch_id, len(self.entries), self.stats["agent_calls"],
+                     self.stats["shared_calls"], time.time() - start)
+
+    def _admit(self, entry: _Entry):
+        """Route an entry and queue the agent calls it needs that nobody has asked for yet."""
+        self._active += 1
+        entry.started = time.time()
+        QUERIES.inc(mode="batch")
+        entry.agents = self.orchestrator.decide_agents(entry.query, has_code=bool(entry.code.strip()))
+        for name in entry.agents:
+            prompt = self.orchestrator.agent_prompt(name, entry.query, entry.code)
+            call = self._calls.get((name, prompt))
+            if call is None:
+                call = self._calls[(name, prompt)] = _AgentCall(name, prompt)
+                self._agent_queues.setdefault(name, deque()).append(call)
+                self.stats["agent_calls"] += 1
+            else:
+                entry.metrics["shared_calls"] += 1
+                self.stats["shared_calls"] += 1
+            if call.result is not None:
+                entry.responses[name] = call.result
+            else:
+                call.waiters.append(entry)
+                entry.waiting += 1
+        if not entry.waiting:
+            self._entry_ready(entry)
+
+    def _dispatch(self, pool: ThreadPoolExecutor, ctx: str):
+        """Start queued work while fewer than concurrency calls are running."""
+        while self._running < self.concurrency:
+            if self._syntheses:
+                entry = self._syntheses.popleft()
+                self.stats["syntheses"] += 1
+                job = ("synthesis", entry, self.orchestrator.synthesize,
+                       entry.query, entry.code, ctx, entry.responses, entry.metrics, "background")
+            elif self._agent_queues:
+                name, calls = self._agent_queues.popitem(last=False)
+                call = calls.popleft()
+                if calls:
+                    self._agent_queues[name] = calls  # back of the round robin
+                job = ("agent", call, self.orchestrator.call_agent, call.agent, call.prompt, ctx)
+            else:
+                return
+            self._running += 1
+            pool.submit(contextvars.copy_context().run, self._execute, *job)
+
+    def _execute(self, kind: str, subject, fn, *args):
+        """Run one call on a worker and report its result to the coordinator."""
+        with request_scope(f"batch-{self.batch_id}", "background"):
+            try:
+                result = fn(*args)
+            except Exception as e:
+                logging.error("Batch %s call failed: %s", kind, e)
+                result = f"[{getattr(subject, 'agent', 'Batch')} ERROR] {e}"
+        self._events.put((kind, subject, result))
+
+    def _agent_done(self, call: _AgentCall, result: str):
+        """Hand a finished call to the entries waiting for it."""
+        call.result = result
+        for entry in call.waiters:
+            entry.responses[call.agent] = result
+            entry.waiting -= 1
+            if not entry.waiting:
+                self._entry_ready(entry)
+        call.waiters = []
+
+    def _entry_ready(self, entry: _Entry):
+        """All agents answered: finish the entry, or queue its synthesis."""
+        entry.responses = {name: entry.responses[name] for name in entry.agents}
+        if len(entry.agents) > 1:
+            self._syntheses.append(entry)
+        else:
+            self._finished.append((entry, next(iter(entry.responses.values()))))
+
+    def _finish(self, entry: _Entry, final: str) -> Iterator[Dict[str, Any]]:
+        """Record a finished entry and yield a result for each item that asked it."""
+        self._active -= 1
+        result = {
+            "final_response": final,
+            "agent_responses": entry.responses,
+            "agents_consulted": entry.agents,
+            "metrics": dict(entry.metrics, latency=time.time() - entry.started)
+        }
+        self.orchestrator.observability.log(entry.query, entry.responses, final, result["metrics"])
+        if self.checkpoint:
+            self.checkpoint.append(entry.key, result)
+        yield from self._results(entry, result, resumed=False)
+
+    @staticmethod
+    def _results(entry: _Entry, result: Dict[str, Any], resumed: bool) -> Iterator[Dict[str, Any]]:
+        for item_id in entry.ids:
+            yield {"id": item_id, "query": entry.query, "result": result, "resumed": resumed}
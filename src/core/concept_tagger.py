@@ -0,0 +1,107 @@
+"""Tag text with programming concepts from a taxonomy of phrases."""
+import os
+import re
+import json
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from src.utils.matcher import PhraseMatcher, tokenize
+
+DEFAULT_TAXONOMY_PATH = os.path.join(os.path.dirname(__file__), "concept_taxonomy.json")
+
+# Trailing characters that may be the first half of a token split across chunks
+_PARTIAL_TOKEN_RE = re.compile(r"[A-Za-z0-9_+#'’]+$")
+
+
+class ConceptTagger:
+    """Find taxonomy concepts mentioned in text.
+
+    The taxonomy maps each concept to the phrases that indicate it. All
+    phrases are compiled into one PhraseMatcher, so tagging is a single pass
+    over the words of the text however many concepts the taxonomy holds.
+    """
+
+    def __init__(self, taxonomy: Dict[str, List[str]]):
+        self.concepts = list(taxonomy)
+        self.matcher = PhraseMatcher()
+        for concept, phrases in taxonomy.items():
+            for phrase in phrases:
+                self.matcher.add(phrase, concept)
+        self.matcher.compile()
+        logging.info("Concept tagger compiled | concepts=%d | states=%d", len(self.concepts), len(self.matcher))
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None) -> "ConceptTagger":
+        """Load a taxonomy from a JSON file."""
+        with open(path or DEFAULT_TAXONOMY_PATH, encoding="utf-8") as f:
+            return cls(json.load(f)["concepts"])
+
+    def tag(self, texts: Iterable[str]) -> List[str]:
+        """Concepts found in any of texts, in order of first mention."""
+        scanner = self.scanner()
+        for text in texts:
+            scanner.feed(text)
+            scanner.end_text()
+        return scanner.finish()
+
+    def scanner(self) -> "ConceptScanner":
+        """Start an incremental scan, e.g. over streamed chunks."""
+        return ConceptScanner(self.matcher)
+
+
+class ConceptScanner:
+    """Incremental tagging over text that arrives in chunks.
+
+    A token cut off at the end of a chunk is held back until the next chunk
+    completes it, and the automaton state is carried over, so phrases that
+    straddle chunk boundaries are still found.
+    """
+
+    def __init__(self, matcher: PhraseMatcher):
+        self.matcher = matcher
+        self._state = 0
+        self._partial = ""
+        self._found: Dict[str, None] = {}
+
+    def feed(self, chunk: str):
+        """Scan the next piece of a text."""
+        text = self._partial + chunk
+        held = _PARTIAL_TOKEN_RE.search(text)
+        if held:
+            text, self._partial = text[:held.start()], held.group()
+        else:
+            self._partial = ""
+        self._scan(text)
+
+    def end_text(self):
+        """Mark the end of one text so phrases never span two of them."""
+        self._scan(self._partial)
+        self._partial = ""
+        self._state = 0
+
+    def finish(self) -> List[str]:
+        """Flush any held-back token and return the concepts found so far."""
+        self._scan(self._partial)
+        self._partial = ""
+        return list(self._found)
+
+    def _scan(self, text: str):
+        if not text:
+            return
+        self._state, hits = self.matcher.feed(tokenize(text), self._state)
+        for concept, _ in hits:
+            self._found[concept] = None
+
+
+_default_tagger: Optional[ConceptTagger] = None
+_default_tagger_lock = threading.Lock()
+
+
+def get_concept_tagger() -> ConceptTagger:
+    """Get the process-wide tagger compiled from the bundled taxonomy."""
+    global _default_tagger
+    with _default_tagger_lock:
+        if _default_tagger is None:
+            _default_tagger = ConceptTagger.from_file()
+        return _default_tagger
@@ -0,0 +1,70 @@
+"""Budgeted serialization of session context for agent prompts."""
+import json
+from typing import Dict, Any, Tuple
+
+from src.utils.helpers import CONTEXT_TOKEN_BUDGET, CONTEXT_RECENT_ITEMS, estimate_tokens
+
+# Fields that identify the session but tell the model nothing useful
+OMITTED_FIELDS = ("session_id", "created_at")
+
+# Lists whose items are short enough to keep a wider window of (at full budget)
+FIELD_WINDOWS = {"concepts_covered": 30}
+
+
+class ContextBuilder:
+    """Turn a session context dict into a compact string within a token budget.
+
+    Scalar fields are kept as they are. Lists keep their most recent items
+    verbatim; anything older is rolled into a count. If the result is still
+    over budget, fewer recent items are kept and long strings are shortened
+    until it fits.
+    """
+
+    def __init__(self, token_budget: int = CONTEXT_TOKEN_BUDGET, recent_items: int = CONTEXT_RECENT_ITEMS):
+        self.token_budget = token_budget
+        self.recent_items = recent_items
+
+    def build(self, context: Dict[str, Any]) -> Tuple[str, int]:
+        """Serialize context; returns the text and its estimated token count."""
+        recent = self.recent_items
+        max_str = None
+        while True:
+            text = json.dumps(self._summarize(context, recent, max_str),
+                              separators=(",", ":"), ensure_ascii=False)
+            tokens = estimate_tokens(text)
+            if tokens <= self.token_budget:
+                return text, tokens
+            if recent > 0:
+                recent //= 2
+            elif max_str is None or max_str > 16:
+                max_str = 80 if max_str is None else max_str // 2
+            else:
+                cut = max(0, self.token_budget * 4 - 3)
+                return text[:cut] + "...", estimate_tokens(cut + 3)
+
+    def _summarize(self, context: Dict[str, Any], recent: int, max_str) -> Dict[str, Any]:
+        """Apply the recent-item window and string limit to every field."""
+        summary: Dict[str, Any] = {}
+        for key, value in context.items():
+            if key in OMITTED_FIELDS:
+                continue
+            if isinstance(value, list):
+                window = FIELD_WINDOWS.get(key, self.recent_items) * recent // max(1, self.recent_items)
+                items = [self._shorten(item, max_str) for item in value[-window:]] if window else []
+                if len(value) <= window:
+                    summary[key] = items
+                else:
+                    summary[key] = {"total": len(value), "recent": items}
+            else:
+                summary[key] = self._shorten(value, max_str)
+        return summary
+
+    def _shorten(self, value: Any, max_str) -> Any:
+        """Truncate strings (including those nested in dicts) to max_str characters."""
+        if max_str is None:
+            return value
+        if isinstance(value, str) and len(value) > max_str:
+            return value[:max_str] + "..."
+        if isinstance(value, dict):
+            return {k: self._shorten(v, max_str) for k, v in value.items()}
+        return value
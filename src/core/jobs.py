@@ -0,0 +1,211 @@
+"""Background execution of queries that callers poll and can cancel."""
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+
+from src.utils.cancellation import CancelToken, Cancelled, cancel_scope, raise_if_cancelled
+from src.utils.helpers import JOB_WORKERS, JOB_RETENTION
+from src.utils.metrics import JOBS
+
+# States a job ends in
+FINAL_STATES = ("done", "failed", "cancelled")
+
+
+class Job:
+    """A query answered in the background.
+
+    The worker fills it in as the answer streams (``agents``, partial text,
+    then ``result`` or ``error``) while pollers read it through snapshot().
+    Status goes queued -> running -> done, failed or cancelled.
+    """
+
+    def __init__(self, session_id: str, query: str, code: str = ""):
+        self.id = uuid.uuid4().hex[:16]
+        self.session_id = session_id
+        self.query = query
+        self.code = code
+        self.status = "queued"
+        self.agents: List[str] = []
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.submitted = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.token = CancelToken()
+        self._parts: List[str] = []
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINAL_STATES
+
+    def cancel(self) -> bool:
+        """Ask the job to stop; returns False if it had already finished."""
+        with self._lock:
+            if self.done:
+                return False
+            self.token.cancel()
+            return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Consistent copy of the job's progress."""
+        with self._lock:
+            end = self.finished or time.time()
+            return {
+                "id": self.id,
+                "session_id": self.session_id,
+                "query": self.query,
+                "status": self.status,
+                "cancel_requested": self.token.cancelled,
+                "agents": list(self.agents),
+                "partial": "".join(self._parts),
+                "result": self.result,
+                "error": self.error,
+                "elapsed": end - (self.started or self.submitted)
+            }
+
+    def _update(self, **fields):
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+
+    def _append(self, text: str):
+        with self._lock:
+            self._parts.append(text)
+
+
+class JobExecutor:
+    """Run queries on a bounded pool of threads so callers never wait on the model.
+
+    - Each session runs one job at a time, in submission order, so its
+      session updates happen in the order the questions were asked.
+    - Sessions take turns for free workers (round robin): a session with a
+      queue of questions, or a slow multi-agent query, only ever occupies
+      one worker.
+    - Cancelling a queued job drops it; a running job stops its model calls
+      at their next chunk or quota wait (see cancellation).
+    - Finished jobs stay available to get() for ``retention`` seconds.
+    """
+
+    def __init__(self, max_workers: int = JOB_WORKERS, retention: float = JOB_RETENTION):
+        self.max_workers = max(1, max_workers)
+        self.retention = retention
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="phoenix-job")
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._queues: "OrderedDict[str, Deque[Tuple[Job, Any]]]" = OrderedDict()
+        self._running: Set[str] = set()
+
+    def submit(self, orchestrator, query: str, code: str = "") -> Job:
+        """Queue a query for an orchestrator bound to a session; returns its job at once."""
+        job = Job(orchestrator.session_manager.session_id or "", query, code)
+        with self._lock:
+            self._purge()
+            self._jobs[job.id] = job
+            self._queues.setdefault(job.session_id, deque()).append((job, orchestrator))
+            self._dispatch()
+        JOBS.inc(outcome="submitted")
+        logging.info("Job submitted | id=%s | session=%s", job.id, job.session_id)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job; returns False if it is unknown or already finished."""
+        job = self.get(job_id)
+        if job is None or not job.cancel():
+            return False
+        with self._lock:
+            queue = self._queues.get(job.session_id)
+            entry = next((e for e in queue or () if e[0] is job), None)
+            if entry is not None:
+                queue.remove(entry)
+                if not queue:
+                    del self._queues[job.session_id]
+                self._finish(job, "cancelled")
+        logging.info("Job cancel requested | id=%s | status=%s", job.id, job.status)
+        return True
+
+    def jobs(self, session_id: str) -> List[Job]:
+        """The session's known jobs, oldest first."""
+        with self._lock:
+            return [job for job in self._jobs.values() if job.session_id == session_id]
+
+    def _dispatch(self):
+        """Start the next job of each idle session while workers are free (lock held)."""
+        while len(self._running) < self.max_workers:
+            session_id = next((s for s in self._queues if s not in self._running), None)
+            if session_id is None:
+                return
+            queue = self._queues.pop(session_id)
+            job, orchestrator = queue.popleft()
+            if queue:
+                self._queues[session_id] = queue  # back of the round robin
+            self._running.add(session_id)
+            job._update(status="running", started=time.time())
+            self._pool.submit(self._run, job, orchestrator)
+
+    def _run(self, job: Job, orchestrator):
+        """Worker: answer the job's query, then start the next queued job."""
+        try:
+            self._execute(job, orchestrator)
+        finally:
+            with self._lock:
+                self._running.discard(job.session_id)
+                self._dispatch()
+
+    def _execute(self, job: Job, orchestrator):
+        outcome = "done"
+        with cancel_scope(job.token):
+            events = orchestrator.stream_query(job.query, job.code)
+            try:
+                for event in events:
+                    raise_if_cancelled()
+                    if event["type"] == "chunk":
+                        job._append(event["text"])
+                    elif event["type"] == "routed":
+                        job._update(agents=event["agents"])
+                    elif event["type"] == "done":
+                        job._update(result=event["result"])
+            except Cancelled:
+                outcome = "cancelled"
+            except Exception as e:
+                logging.exception("Job failed | id=%s", job.id)
+                job._update(error=str(e))
+                outcome = "failed"
+            finally:
+                events.close()
+        with self._lock:
+            self._finish(job, outcome)
+
+    def _finish(self, job: Job, outcome: str):
+        """Mark a job finished (lock held)."""
+        job._update(status=outcome, finished=time.time())
+        JOBS.inc(outcome=outcome)
+        logging.info("Job %s | id=%s | session=%s | time=%.2fs",
+                     outcome, job.id, job.session_id, job.finished - (job.started or job.submitted))
+
+    def _purge(self):
+        """Forget jobs that finished more than retention seconds ago (lock held)."""
+        cutoff = time.time() - self.retention
+        for job_id in [j.id for j in self._jobs.values() if j.done and j.finished < cutoff]:
+            del self._jobs[job_id]
+
+
+_default_executor: Optional[JobExecutor] = None
+_default_executor_lock = threading.Lock()
+
+
+def get_job_executor() -> JobExecutor:
+    """Get the process-wide executor shared by every session."""
+    global _default_executor
+    with _default_executor_lock:
+        if _default_executor is None:
+            _default_executor = JobExecutor()
+        return _default_executor
@@ -1,37 +1,90 @@
 """Observability manager for tracking system interactions."""
 import logging
+import threading
+from collections import deque
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Deque, Dict, Any, Optional
+
+from src.utils.helpers import OBSERVABILITY_BUFFER_SIZE, is_error_response
+from src.utils.histogram import LatencyHistogram
+from src.utils.metrics import AGENT_RESPONSES, QUERY_LATENCY
 
 
 class ObservabilityManager:
-    """Manages observability and logging of system interactions."""
+    """Manages observability and logging of system interactions.
+
+    Recent interaction records are kept in a fixed-size ring buffer; usage
+    counts and latency histograms are aggregated incrementally as records
+    arrive, so memory stays constant and stats are cheap regardless of uptime.
+    """
     
-    def __init__(self):
-        self.interactions: List[Dict[str, Any]] = []
+    def __init__(self, buffer_size: int = OBSERVABILITY_BUFFER_SIZE):
+        self.interactions: Deque[Dict[str, Any]] = deque(maxlen=buffer_size)
+        self.total_interactions = 0
+        self.agent_calls: Dict[str, int] = {}
+        self.agent_errors: Dict[str, int] = {}
+        self.model_latency: Dict[str, LatencyHistogram] = {}
+        self.query_latency = LatencyHistogram()
+        self._lock = threading.Lock()
 
-    def log(self, query: str, agent_responses: Dict[str, str], final_response: str):
-        """Log an interaction with all agent responses."""
+    def log(self, query: str, agent_responses: Dict[str, str], final_response: str,
+            metrics: Optional[Dict[str, Any]] = None):
+        """Log an interaction with all agent responses and its timing metrics."""
         rec = {
             "time": datetime.now().isoformat(),
             "query": query,
             "agent_responses": {k: v[:400] for k, v in agent_responses.items()},
-            "final_response": final_response[:800]
+            "final_response": final_response[:800],
+            "metrics": dict(metrics or {})
         }
-        self.interactions.append(rec)
+        with self._lock:
+            self.interactions.append(rec)
+            self.total_interactions += 1
+            for agent, text in agent_responses.items():
+                self.agent_calls[agent] = self.agent_calls.get(agent, 0) + 1
+                failed = is_error_response(text, agent)
+                if failed:
+                    self.agent_errors[agent] = self.agent_errors.get(agent, 0) + 1
+                AGENT_RESPONSES.inc(agent=agent, status="error" if failed else "ok")
+            if metrics and "latency" in metrics:
+                self.query_latency.observe(metrics["latency"])
+                QUERY_LATENCY.observe(metrics["latency"])
         logging.info("Observability log appended: query=%s", query)
 
+    def record_model_call(self, agent: str, latency: float):
+        """Record the latency of one model call made on behalf of an agent."""
+        with self._lock:
+            hist = self.model_latency.get(agent)
+            if hist is None:
+                hist = self.model_latency[agent] = LatencyHistogram()
+            hist.observe(latency)
+
     def report(self) -> Dict[str, Any]:
         """Generate a report of recent interactions."""
+        with self._lock:
+            recent = list(self.interactions)[-10:]
         return {
-            "total_interactions": len(self.interactions),
-            "recent": self.interactions[-10:] if self.interactions else []
+            "total_interactions": self.total_interactions,
+            "recent": recent,
+            "agent_usage": self.get_agent_usage_stats(),
+            "agent_errors": self.get_agent_error_stats(),
+            "latency": self.get_latency_stats()
         }
 
     def get_agent_usage_stats(self) -> Dict[str, int]:
         """Get statistics on agent usage."""
-        stats = {}
-        for interaction in self.interactions:
-            for agent in interaction["agent_responses"].keys():
-                stats[agent] = stats.get(agent, 0) + 1
-        return stats
\ No newline at end of file
+        with self._lock:
+            return dict(self.agent_calls)
+
+    def get_agent_error_stats(self) -> Dict[str, int]:
+        """Get error counts per agent."""
+        with self._lock:
+            return dict(self.agent_errors)
+
+    def get_latency_stats(self) -> Dict[str, Any]:
+        """Get p50/p95/p99 latency for end-to-end queries and per-agent model calls."""
+        with self._lock:
+            return {
+                "query": self.query_latency.summary(),
+                "model": {agent: hist.summary() for agent, hist in self.model_latency.items()}
+            }
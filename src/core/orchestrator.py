@@ -1,12 +1,33 @@
 """Orchestrator agent for routing queries to specialized agents."""
-import json
+import copy
+import time
+import asyncio
 import logging
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Union
 
 from src.agents.base_agent import BaseAgent
+from src.utils.helpers import (
+    MAX_AGENT_WORKERS, JOB_WORKERS, AGENT_TIMEOUT, SYNTHESIS_STRATEGY, COMPACT_SYNTHESIS_CHARS, BATCH_CONCURRENCY,
+    get_model_policy, is_cacheable_response, is_error_response, estimate_tokens
+)
+from src.utils.similarity_cache import get_similarity_cache
+from src.utils.tracing import get_tracer, current_span
+from src.utils.scheduler import request_scope, scoped_iter
+from src.utils.cancellation import Cancelled, ChildCancelToken, cancel_scope, current_token
+from src.utils.metrics import QUERIES, QUERIES_IN_FLIGHT, CACHE_LOOKUPS
 from src.core.session_manager import SessionManager
 from src.core.observability import ObservabilityManager
+from src.core.router import get_default_router
+from src.core.context_builder import ContextBuilder
+from src.core.concept_tagger import get_concept_tagger
+from src.core.batch import BatchRun
+from src.core.synthesis import (
+    SYNTHESIS_STRATEGIES, full_synthesis_prompt, compact_synthesis_prompt, merge_responses
+)
 
 
 class OrchestratorAgent(BaseAgent):
@@ -18,143 +39,549 @@ class OrchestratorAgent(BaseAgent):
         self.session_manager = session_manager
         self.observability = observability
         self.agents: Dict[str, BaseAgent] = {}
+        self.agent_timeout = AGENT_TIMEOUT
+        self.similarity_cache = get_similarity_cache()
+        self.router = get_default_router()
+        self.concept_tagger = get_concept_tagger()
+        self.context_builder = ContextBuilder()
+        self.tracer = get_tracer()
+        if SYNTHESIS_STRATEGY not in SYNTHESIS_STRATEGIES:
+            raise ValueError(f"Unknown synthesis strategy '{SYNTHESIS_STRATEGY}', "
+                             f"expected one of {SYNTHESIS_STRATEGIES}")
+        self.synthesis_strategy = SYNTHESIS_STRATEGY
+        self.compact_max_chars = COMPACT_SYNTHESIS_CHARS
+        # The pool is shared by every session bound to this orchestrator: by
+        # default it fits the widest fan-out of every job worker at once, and
+        # never has fewer workers than one query can fan out to
+        fan_out = self.router.max_fan_out
+        agent_workers = max(MAX_AGENT_WORKERS or JOB_WORKERS * fan_out, fan_out)
+        self.executor = ThreadPoolExecutor(
+            max_workers=agent_workers,
+            thread_name_prefix="phoenix-agent"
+        )
+        # every agent worker and job worker (synthesis) may be in a hedged call
+        get_model_policy().reserve_hedge_workers(agent_workers + JOB_WORKERS)
 
     def register_agent(self, name: str, agent: BaseAgent):
         """Register a specialized agent."""
         self.agents[name] = agent
         logging.info("Registered agent: %s", name)
 
+    def bind_session(self, session_manager: SessionManager,
+                     observability: Optional[ObservabilityManager] = None) -> "OrchestratorAgent":
+        """Get an orchestrator for another session that shares this one's agents.
+
+        Agents, caches, router and worker pool are shared, so this costs a
+        shallow copy instead of building a new orchestrator per session.
+        """
+        bound = copy.copy(self)
+        bound.session_manager = session_manager
+        if observability is not None:
+            bound.observability = observability
+        return bound
+
     def decide_agents(self, user_query: str, has_code: bool = False) -> List[str]:
         """Decide which agents should handle the query."""
-        q = user_query.lower().strip()
-        selected: List[str] = []
-
-        # General chat and casual conversation - check this FIRST
-        general_chat_patterns = [
-            "hello", "hi", "hey", "how are you", "what's up", "whats up",
-            "good morning", "good evening", "good night", "good afternoon",
-            "who are you", "what can you do", "how's it going", "hows it going",
-            "tell me a joke", "how do you feel", "what do you think about",
-            "thanks", "thank you", "appreciate it", "bye", "goodbye", "see you",
-            "how old are you", "where are you from", "what's your name", "whats your name",
-            "nice to meet you", "pleasure to meet you", "how have you been",
-            "what's new", "whats new", "how's your day", "hows your day"
-        ]
-        
-        # Check if the query is primarily general chat
-        is_general_chat = any(pattern in q for pattern in general_chat_patterns)
-        
-        # For very short messages, prioritize general chat
-        if len(q.split()) <= 3 and any(word in q for word in ["hi", "hello", "hey", "bye", "thanks"]):
-            is_general_chat = True
-
-        if is_general_chat:
-            selected.append("GeneralChatAgent")
-            # For pure general chat, don't add other agents
-            return selected
-
-        # Programming-specific queries (only if not general chat)
-        if any(word in q for word in ["explain", "what is", "why", "how does", "define", "meaning of", "tell me about"]):
-            selected.append("ConceptExplainer")
-
-        if has_code or any(word in q for word in ["review", "optimize", "refactor", "improve code", "code quality", "check my code"]):
-            selected.append("CodeReviewer")
-
-        if any(word in q for word in ["error", "bug", "traceback", "exception", "fix", "not working", "broken", "debug"]):
-            selected.append("DebuggingAgent")
-
-        if any(word in q for word in ["exercise", "practice", "problem", "quiz", "challenge", "task", "question"]):
-            selected.append("PracticeGenerator")
-
-        if any(word in q for word in ["generate", "create", "write", "full program", "complete code", "code snippet", "make a", "give me"]):
-            selected.append("CodeGenerator")
-
-        # If no specific agent selected, use ConceptExplainer as default for programming questions
-        if not selected and len(q.split()) > 2:  # More than 2 words suggests substantive query
-            selected.append("ConceptExplainer")
-        elif not selected:
-            # Very short, ambiguous queries go to GeneralChat
-            selected.append("GeneralChatAgent")
-
+        selected = self.router.route(user_query, has_code=has_code)["agents"]
         logging.info("Decide agents for query: '%s' -> %s", user_query, selected)
         return selected
 
     def process_query(self, user_query: str, user_code: str = "") -> Dict[str, Any]:
         """Process a user query by routing to appropriate agents."""
-        ctx = json.dumps(self.session_manager.get_context(), indent=2)
-        has_code = bool(user_code and user_code.strip())
-        agent_names = self.decide_agents(user_query, has_code=has_code)
-        responses: Dict[str, str] = {}
+        start = time.time()
+        with self._query_in_flight("sync"), self._request_scope(), \
+                self.tracer.start_span("process_query", {"query_len": len(user_query)}):
+            ctx, agent_names, metrics = self._prepare_query(user_query, user_code)
+            cached = self._similar_lookup(user_query, user_code, agent_names)
+            if cached is not None:
+                return self._finish_cached(user_query, agent_names, cached, start, metrics)
+            responses = self._run_agents(agent_names, user_query, user_code, ctx)
+
+            # Synthesize final response
+            if len(agent_names) == 1:
+                final = list(responses.values())[0]
+            else:
+                final = self.synthesize(user_query, user_code, ctx, responses, metrics)
+
+            metrics["latency"] = time.time() - start
+            result = self._finish_query(user_query, agent_names, responses, final, metrics)
+            self._similar_store(user_query, user_code, result)
+            return result
+
+    def stream_query(self, user_query: str, user_code: str = "") -> Iterator[Dict[str, Any]]:
+        """Process a user query, yielding the answer as it is generated.
 
-        # Get responses from each selected agent
-        for name in agent_names:
-            agent = self.agents.get(name)
-            if not agent:
-                responses[name] = f"[{name} not registered]"
-                continue
+        Yields event dicts: one ``routed`` event with the selected agents, then
+        ``chunk`` events carrying text, and finally a ``done`` event whose
+        ``result`` matches what process_query returns. Single-agent answers are
+        streamed straight from the agent; multi-agent answers stream the
+        synthesis once every agent has responded.
+        """
+        start = time.time()
+        # The root span is only made current around non-yielding sections, so
+        # tracing state never leaks into the consumer between chunks.
+        root = self.tracer.start_span("stream_query", {"query_len": len(user_query)})
+        QUERIES.inc(mode="stream")
+        QUERIES_IN_FLIGHT.inc()
+        try:
+            with self.tracer.use_span(root):
+                ctx, agent_names, metrics = self._prepare_query(user_query, user_code)
+                cached = self._similar_lookup(user_query, user_code, agent_names)
+            yield {"type": "routed", "agents": agent_names}
 
-            if name in ["CodeReviewer", "DebuggingAgent"] and has_code:
-                prompt_for_agent = f"User Query: {user_query}\n\nCode to analyze:\n{user_code}"
+            if cached is not None:
+                with self.tracer.use_span(root):
+                    result = self._finish_cached(user_query, agent_names, cached, start, metrics)
+                yield {"type": "chunk", "text": result["final_response"]}
+                yield {"type": "done", "result": result}
+                return
+
+            ttft = None
+            parts: List[str] = []
+            scanner = None
+            if len(agent_names) == 1:
+                scanner = self.concept_tagger.scanner()
+                name = agent_names[0]
+                responses: Dict[str, str] = {}
+                chunks = self._stream_agent(name, self.agent_prompt(name, user_query, user_code), ctx, root)
             else:
-                prompt_for_agent = user_query
+                with self.tracer.use_span(root), self._request_scope():
+                    responses = self._run_agents(agent_names, user_query, user_code, ctx)
+                chunks = self._stream_synthesis(user_query, user_code, ctx, responses, metrics, root)
+            chunks = scoped_iter(chunks, self.session_manager.session_id, "interactive")
 
-            try:
-                res = agent.generate_response(prompt_for_agent, ctx)
-            except Exception as e:
-                logging.error("Agent %s error: %s", name, str(e))
-                res = f"[{name} ERROR] {str(e)}"
-            responses[name] = res
+            for text in chunks:
+                if ttft is None:
+                    ttft = time.time() - start
+                parts.append(text)
+                if scanner is not None:
+                    scanner.feed(text)
+                yield {"type": "chunk", "text": text}
+
+            final = "".join(parts).strip()
+            concepts = None
+            if len(agent_names) == 1:
+                responses[agent_names[0]] = final
+                if not is_error_response(final, agent_names[0]):
+                    concepts = scanner.finish()
+
+            latency = time.time() - start
+            logging.info("Query streamed | agents=%s | ttft=%.2fs | time=%.2fs",
+                         agent_names, ttft if ttft is not None else latency, latency)
+            metrics["ttft"] = ttft if ttft is not None else latency
+            metrics["latency"] = latency
+            root.set_attribute("ttft_ms", round(metrics["ttft"] * 1000, 1))
+            with self.tracer.use_span(root):
+                result = self._finish_query(user_query, agent_names, responses, final, metrics, concepts)
+                self._similar_store(user_query, user_code, result)
+            yield {"type": "done", "result": result}
+        finally:
+            QUERIES_IN_FLIGHT.dec()
+            root.end()
+
+    async def aprocess_query(self, user_query: str, user_code: str = "") -> Dict[str, Any]:
+        """Async variant of process_query; agents run as concurrent tasks on the event loop."""
+        start = time.time()
+        with self._query_in_flight("async"), self._request_scope(), \
+                self.tracer.start_span("aprocess_query", {"query_len": len(user_query)}):
+            ctx, agent_names, metrics = self._prepare_query(user_query, user_code)
+            cached = self._similar_lookup(user_query, user_code, agent_names)
+            if cached is not None:
+                return self._finish_cached(user_query, agent_names, cached, start, metrics)
+            responses = await self._arun_agents(agent_names, user_query, user_code, ctx)
+
+            if len(agent_names) == 1:
+                final = list(responses.values())[0]
+            else:
+                final = await self.asynthesize(user_query, user_code, ctx, responses, metrics)
+
+            metrics["latency"] = time.time() - start
+            result = self._finish_query(user_query, agent_names, responses, final, metrics)
+            self._similar_store(user_query, user_code, result)
+            return result
+
+    def process_batch(self, queries: Iterable[Union[str, Dict[str, Any]]],
+                      concurrency: int = BATCH_CONCURRENCY,
+                      checkpoint: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Answer many queries, yielding results as they finish.
+
+        Each query is a string or a dict with ``query`` and optional ``code``
+        and ``id`` (default: its position). Yields {"id", "query", "result",
+        "resumed"} per query, where result has the shape of process_query's.
+        Duplicate queries and agent calls are made once, at most concurrency
+        model calls run at a time, and with a checkpoint path a crashed batch
+        resumes where it stopped. Batch answers do not update the session.
+        """
+        return iter(BatchRun(self, queries, concurrency, checkpoint))
+
+    @contextmanager
+    def _query_in_flight(self, mode: str):
+        """Count a query for as long as it is being processed."""
+        QUERIES.inc(mode=mode)
+        QUERIES_IN_FLIGHT.inc()
+        try:
+            yield
+        finally:
+            QUERIES_IN_FLIGHT.dec()
+
+    def _request_scope(self):
+        """Attribute model calls to the current session as interactive work."""
+        return request_scope(self.session_manager.session_id, "interactive")
+
+    def _prepare_query(self, user_query: str, user_code: str):
+        """Serialize the session context and pick the agents for a query.
+
+        Returns the context string, the selected agent names and a fresh
+        metrics dict already holding the context size.
+        """
+        with self.tracer.start_span("context") as span:
+            ctx, ctx_tokens = self.context_builder.build(self.session_manager.get_context())
+            span.set_attribute("context_tokens", ctx_tokens)
+        with self.tracer.start_span("routing") as span:
+            has_code = bool(user_code and user_code.strip())
+            agent_names = self.decide_agents(user_query, has_code=has_code)
+            span.set_attribute("agents", ",".join(agent_names))
+        current_span().set_attribute("agents", ",".join(agent_names))
+        metrics: Dict[str, Any] = {"context_tokens": ctx_tokens}
+        return ctx, agent_names, metrics
+
+    def _synthesis_prompt(self, user_query: str, user_code: str, ctx: str,
+                          responses: Dict[str, str]):
+        """Return the (prompt, context) pair for the model-backed synthesis strategies."""
+        if self.synthesis_strategy == "compact":
+            return compact_synthesis_prompt(user_query, responses, self.compact_max_chars), ""
+        return full_synthesis_prompt(user_query, user_code, ctx, responses), ctx
+
+    def synthesize(self, user_query: str, user_code: str, ctx: str,
+                   responses: Dict[str, str], metrics: Dict[str, Any],
+                   priority: str = "synthesis") -> str:
+        """Combine several agent responses using the configured strategy.
+
+        The model call is scheduled at priority; callers doing bulk work
+        (see batch) pass "background" so it never outranks interactive calls.
+        """
+        usable = self._usable_responses(responses)
+        if len(usable) <= 1:
+            return self._skip_synthesis(responses, usable, metrics)
+        responses = usable
+        start = time.time()
+        with self.tracer.start_span("synthesis") as span:
+            call_metrics: Dict[str, Any] = {}
+            if self.synthesis_strategy == "merge":
+                final, prompt_chars = merge_responses(responses), 0
+            else:
+                prompt, context = self._synthesis_prompt(user_query, user_code, ctx, responses)
+                prompt_chars = len(self.build_prompt(prompt, context))
+                with request_scope(priority=priority):
+                    final = self.generate_response(prompt, context, call_metrics)
+            self._record_synthesis(metrics, start, prompt_chars, span, final, call_metrics)
+        return final
+
+    def _stream_synthesis(self, user_query: str, user_code: str, ctx: str,
+                          responses: Dict[str, str], metrics: Dict[str, Any],
+                          parent_span=None) -> Iterator[str]:
+        """Streaming counterpart of synthesize."""
+        usable = self._usable_responses(responses)
+        if len(usable) <= 1:
+            yield self._skip_synthesis(responses, usable, metrics)
+            return
+        responses = usable
+        start = time.time()
+        span = self.tracer.start_span("synthesis", parent=parent_span)
+        call_metrics: Dict[str, Any] = {}
+        parts: List[str] = []
+        try:
+            if self.synthesis_strategy == "merge":
+                prompt_chars = 0
+                parts.append(merge_responses(responses))
+                yield parts[0]
+            else:
+                prompt, context = self._synthesis_prompt(user_query, user_code, ctx, responses)
+                prompt_chars = len(self.build_prompt(prompt, context))
+                for text in scoped_iter(self.stream_response(prompt, context, call_metrics),
+                                        priority="synthesis"):
+                    parts.append(text)
+                    yield text
+            self._record_synthesis(metrics, start, prompt_chars, span, "".join(parts), call_metrics)
+        finally:
+            span.end()
 
-        # Synthesize final response
-        if len(agent_names) == 1:
-            final = list(responses.values())[0]
-        else:
-            integration_prompt = f"""
-            USER QUERY:
-            {user_query}
+    async def asynthesize(self, user_query: str, user_code: str, ctx: str,
+                          responses: Dict[str, str], metrics: Dict[str, Any],
+                          priority: str = "synthesis") -> str:
+        """Async counterpart of synthesize."""
+        usable = self._usable_responses(responses)
+        if len(usable) <= 1:
+            return self._skip_synthesis(responses, usable, metrics)
+        responses = usable
+        start = time.time()
+        with self.tracer.start_span("synthesis") as span:
+            call_metrics: Dict[str, Any] = {}
+            if self.synthesis_strategy == "merge":
+                final, prompt_chars = merge_responses(responses), 0
+            else:
+                prompt, context = self._synthesis_prompt(user_query, user_code, ctx, responses)
+                prompt_chars = len(self.build_prompt(prompt, context))
+                with request_scope(priority=priority):
+                    final = await self.agenerate_response(prompt, context, call_metrics)
+            self._record_synthesis(metrics, start, prompt_chars, span, final, call_metrics)
+        return final
 
-            {'USER CODE:' + user_code if has_code else 'NO CODE PROVIDED'}
+    @staticmethod
+    def _usable_responses(responses: Dict[str, str]) -> Dict[str, str]:
+        """Agent responses that are real answers rather than error markers."""
+        return {name: text for name, text in responses.items() if not is_error_response(text, name)}
 
-            SESSION CONTEXT:
-            {ctx}
+    @staticmethod
+    def _skip_synthesis(responses: Dict[str, str], usable: Dict[str, str],
+                        metrics: Dict[str, Any]) -> str:
+        """Final answer when at most one agent succeeded, so there is nothing to combine."""
+        metrics["synthesis_strategy"] = "skipped"
+        metrics["failed_agents"] = [name for name in responses if name not in usable]
+        logging.warning("Synthesis skipped | usable=%d | failed=%s", len(usable), metrics["failed_agents"])
+        return next(iter(usable.values())) if usable else next(iter(responses.values()))
 
-            SPECIALIZED AGENT RESPONSES:
-            {json.dumps(responses, indent=2)}
+    def _record_synthesis(self, metrics: Dict[str, Any], start: float, prompt_chars: int,
+                          span, final: str, call_metrics: Dict[str, Any]):
+        """Store synthesis cost figures in the query metrics and its span."""
+        span.set_attribute("strategy", self.synthesis_strategy)
+        span.set_attribute("prompt_len", prompt_chars)
+        span.set_attribute("response_len", len(final))
+        span.set_attribute("cache_hit", call_metrics.get("cache_hit"))
+        metrics["synthesis_strategy"] = self.synthesis_strategy
+        metrics["synthesis_latency"] = time.time() - start
+        if prompt_chars:
+            self.observability.record_model_call(self.name, metrics["synthesis_latency"])
+        metrics["synthesis_prompt_chars"] = prompt_chars
+        metrics["synthesis_prompt_tokens"] = estimate_tokens(prompt_chars)
+        logging.info("Synthesis done | strategy=%s | time=%.2fs | prompt_len=%d",
+                     self.synthesis_strategy, metrics["synthesis_latency"], prompt_chars)
 
-            Please synthesize these responses into a coherent, helpful final answer.
-            Start by listing which specialized agents were consulted, then provide an integrated answer.
-            """
-            final = self.generate_response(integration_prompt, ctx)
+    def _finish_query(self, user_query: str, agent_names: List[str],
+                      responses: Dict[str, str], final: str, metrics: Dict[str, Any],
+                      response_concepts: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Record the interaction and build the query result.
 
-        self._update_session_from_responses(responses, user_query)
-        self.observability.log(user_query, responses, final)
+        response_concepts are concepts already tagged while the responses
+        streamed; when omitted the responses are tagged here.
+        """
+        with self.tracer.start_span("session_update"):
+            self._update_session_from_responses(responses, user_query, response_concepts)
+        self.observability.log(user_query, responses, final, metrics)
 
         return {
             "final_response": final,
             "agent_responses": responses,
-            "agents_consulted": agent_names
+            "agents_consulted": agent_names,
+            "metrics": metrics
         }
 
-    def _update_session_from_responses(self, responses: Dict[str, str], user_query: str):
-        """Update session based on agent responses."""
+    def _similar_lookup(self, user_query: str, user_code: str,
+                        agent_names: List[str]) -> Optional[Dict[str, Any]]:
+        """Find a stored answer for a near-duplicate query routed to the same agents at this skill level."""
+        if not self._similarity_eligible(user_code, agent_names):
+            return None
+        with self.tracer.start_span("similarity_lookup") as span:
+            cached = self.similarity_cache.lookup(user_query, agent_names, self.session_manager.skill_level)
+            span.set_attribute("cache_hit", cached is not None)
+        CACHE_LOOKUPS.inc(cache="similarity", result="hit" if cached is not None else "miss")
+        if cached is not None:
+            logging.info("Similarity cache hit | similarity=%.2f | query='%s'", cached["similarity"], user_query)
+        return cached
+
+    def _similar_store(self, user_query: str, user_code: str, result: Dict[str, Any]):
+        """Remember a freshly generated answer for future near-duplicate queries."""
+        agent_names = result["agents_consulted"]
+        if not self._similarity_eligible(user_code, agent_names):
+            return
+        responses = result["agent_responses"]
+        if not is_cacheable_response(result["final_response"]) or \
+           any(is_error_response(text, name) for name, text in responses.items()):
+            return
+        self.similarity_cache.store(user_query, agent_names, {
+            "final_response": result["final_response"],
+            "agent_responses": dict(responses)
+        }, self.session_manager.skill_level)
+
+    def _similarity_eligible(self, user_code: str, agent_names: List[str]) -> bool:
+        """Only code-free queries routed to cacheable agents share answers."""
+        if self.similarity_cache is None or (user_code and user_code.strip()):
+            return False
+        return all(name in self.agents and self.agents[name].cache_enabled for name in agent_names)
+
+    def _finish_cached(self, user_query: str, agent_names: List[str], cached: Dict[str, Any],
+                       start: float, metrics: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the query result from a similarity cache hit."""
+        metrics["similarity"] = cached["similarity"]
+        metrics["latency"] = time.time() - start
+        return self._finish_query(user_query, agent_names, dict(cached["agent_responses"]),
+                                  cached["final_response"], metrics)
+
+    def agent_prompt(self, name: str, user_query: str, user_code: str) -> str:
+        """Build the user prompt sent to a specific agent."""
+        if name in ["CodeReviewer", "DebuggingAgent"] and user_code and user_code.strip():
+            return f"User Query: {user_query}\n\nCode to analyze:\n{user_code}"
+        return user_query
+
+    def call_agent(self, name: str, prompt: str, ctx: str) -> str:
+        """Call a single agent, turning failures into an error string."""
+        agent = self.agents.get(name)
+        if not agent:
+            return f"[{name} not registered]"
+        start = time.time()
+        with self.tracer.start_span(f"agent.{name}", {"agent": name, "prompt_len": len(prompt)}) as span:
+            call_metrics: Dict[str, Any] = {}
+            try:
+                res = agent.generate_response(prompt, ctx, call_metrics)
+            except Cancelled:
+                raise
+            except Exception as e:
+                logging.error("Agent %s error: %s", name, str(e))
+                res = f"[{name} ERROR] {str(e)}"
+            self.observability.record_model_call(name, time.time() - start)
+            self._annotate_agent_span(span, name, res, call_metrics)
+        return res
+
+    def _stream_agent(self, name: str, prompt: str, ctx: str, parent_span=None) -> Iterator[str]:
+        """Stream a single agent, turning failures into an error string."""
+        agent = self.agents.get(name)
+        if not agent:
+            yield f"[{name} not registered]"
+            return
+        start = time.time()
+        span = self.tracer.start_span(f"agent.{name}", {"agent": name, "prompt_len": len(prompt)},
+                                      parent=parent_span)
+        call_metrics: Dict[str, Any] = {}
+        parts: List[str] = []
+        try:
+            for text in agent.stream_response(prompt, ctx, call_metrics):
+                parts.append(text)
+                yield text
+        except Cancelled:
+            raise
+        except Exception as e:
+            logging.error("Agent %s error: %s", name, str(e))
+            parts.append(f"[{name} ERROR] {str(e)}")
+            yield parts[-1]
+        finally:
+            self.observability.record_model_call(name, time.time() - start)
+            self._annotate_agent_span(span, name, "".join(parts), call_metrics)
+            span.end()
+
+    async def acall_agent(self, name: str, prompt: str, ctx: str) -> str:
+        """Async counterpart of call_agent."""
+        agent = self.agents.get(name)
+        if not agent:
+            return f"[{name} not registered]"
+        start = time.time()
+        with self.tracer.start_span(f"agent.{name}", {"agent": name, "prompt_len": len(prompt)}) as span:
+            call_metrics: Dict[str, Any] = {}
+            try:
+                res = await asyncio.wait_for(agent.agenerate_response(prompt, ctx, call_metrics),
+                                             self.agent_timeout)
+            except asyncio.TimeoutError:
+                logging.error("Agent %s timed out after %.0fs", name, self.agent_timeout)
+                res = f"[{name} TIMEOUT] no response within {self.agent_timeout:.0f}s"
+            except Cancelled:
+                raise
+            except Exception as e:
+                logging.error("Agent %s error: %s", name, str(e))
+                res = f"[{name} ERROR] {str(e)}"
+            self.observability.record_model_call(name, time.time() - start)
+            self._annotate_agent_span(span, name, res, call_metrics)
+        return res
+
+    @staticmethod
+    def _annotate_agent_span(span, name: str, response: str, call_metrics: Dict[str, Any]):
+        """Attach response size, cache and error details to an agent span."""
+        span.set_attribute("response_len", len(response))
+        span.set_attribute("cache_hit", call_metrics.get("cache_hit"))
+        span.set_attribute("ttft_ms", round(call_metrics["ttft"] * 1000, 1) if "ttft" in call_metrics else None)
+        if is_error_response(response, name):
+            span.record_error(response[:200])
+
+    def _run_agents(self, agent_names: List[str], user_query: str,
+                    user_code: str, ctx: str) -> Dict[str, str]:
+        """Fan out to the selected agents concurrently, keeping their order."""
+        start = time.time()
+        started: Dict[str, float] = {}
+        tokens = {name: ChildCancelToken(current_token()) for name in agent_names}
+
+        def run(name: str, prompt: str) -> str:
+            started[name] = time.time()
+            with cancel_scope(tokens[name]):
+                return self.call_agent(name, prompt, ctx)
+
+        with self.tracer.start_span("agents", {"count": len(agent_names)}):
+            # Each worker runs in a copy of this context so its span nests under "agents"
+            futures = [
+                (name, self.executor.submit(
+                    contextvars.copy_context().run,
+                    run, name, self.agent_prompt(name, user_query, user_code)
+                ))
+                for name in agent_names
+            ]
+            responses = self._collect_agents(futures, start, started, tokens)
+
+        logging.info("Agent fan-out done | agents=%s | time=%.2fs", agent_names, time.time() - start)
+        return responses
+
+    def _collect_agents(self, futures, submitted: float, started: Dict[str, float],
+                        tokens: Dict[str, ChildCancelToken]) -> Dict[str, str]:
+        """Wait for fan-out futures in order, each against its own deadline.
+
+        An agent gets agent_timeout seconds from when it starts running; one
+        still waiting for a worker agent_timeout seconds after submission
+        times out too. A timed-out agent is cancelled, so its model call
+        stops at the next cancellation point and gives its worker back.
+        """
+        responses: Dict[str, str] = {}
+        for name, future in futures:
+            while name not in responses:
+                deadline = started.get(name, submitted) + self.agent_timeout
+                try:
+                    responses[name] = future.result(timeout=max(0.0, deadline - time.time()))
+                except FutureTimeout:
+                    if started.get(name, submitted) + self.agent_timeout > time.time():
+                        continue  # started while we waited; its own deadline applies
+                    future.cancel()
+                    tokens[name].cancel()
+                    logging.error("Agent %s timed out after %.0fs", name, self.agent_timeout)
+                    responses[name] = f"[{name} TIMEOUT] no response within {self.agent_timeout:.0f}s"
+        return responses
+
+    async def _arun_agents(self, agent_names: List[str], user_query: str,
+                           user_code: str, ctx: str) -> Dict[str, str]:
+        """Fan out to the selected agents as asyncio tasks, keeping their order."""
+        start = time.time()
+        with self.tracer.start_span("agents", {"count": len(agent_names)}):
+            results = await asyncio.gather(*[
+                self.acall_agent(name, self.agent_prompt(name, user_query, user_code), ctx)
+                for name in agent_names
+            ])
+        logging.info("Agent fan-out done | agents=%s | time=%.2fs", agent_names, time.time() - start)
+        return dict(zip(agent_names, results))
+
+    def _update_session_from_responses(self, responses: Dict[str, str], user_query: str,
+                                       response_concepts: Optional[List[str]] = None):
+        """Update session based on agent responses.
+
+        Raises SessionNotFound if the session was forgotten meanwhile.
+        """
+        if self.session_manager.session_id is None:
+            return  # Not bound to a session (e.g. the shared process-wide orchestrator)
         # Only update session for programming-related interactions
         if "GeneralChatAgent" in responses and len(responses) == 1:
             return  # Skip session updates for pure general chat
 
-        join_text = " ".join(responses.values()).lower()
-        user_query_lower = user_query.lower()
-
-        concepts = [
-            "function", "loop", "class", "list", "dictionary", "recursion",
-            "generator", "decorator", "context manager", "exception", "module",
-            "inheritance", "polymorphism", "encapsulation", "abstraction"
-        ]
-
-        for concept in concepts:
-            if (concept in join_text or concept in user_query_lower) and \
-               concept not in self.session_manager.get_context().get("concepts_covered", []):
-                self.session_manager.append_concept(concept)
-                self.session_manager.add_progress(5)
+        concepts = self.concept_tagger.tag([user_query])
+        if response_concepts is None:
+            response_concepts = self.concept_tagger.tag(
+                text for name, text in responses.items() if not is_error_response(text, name)
+            )
+        added = self.session_manager.add_concepts(concepts + response_concepts)
+        if added:
+            self.session_manager.add_progress(5 * len(added))
 
         if "PracticeGenerator" in responses:
             self.session_manager.add_exercise(user_query)
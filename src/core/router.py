@@ -0,0 +1,100 @@
+"""Data-driven query router compiled into a single phrase automaton."""
+import os
+import json
+import logging
+from typing import Dict, Any, List, Optional
+
+from src.utils.matcher import PhraseMatcher, tokenize
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(__file__), "routing_rules.json")
+
+
+class QueryRouter:
+    """Route queries to agents using a table of keyword rules.
+
+    Every pattern of every rule is compiled once into one PhraseMatcher, so a
+    query is routed in a single pass over its words no matter how many
+    keywords the table holds. Rule fields:
+
+    - ``agent``: agent selected when the rule matches
+    - ``patterns``: words or phrases, matched on word boundaries
+    - ``weight``: score added per matched pattern
+    - ``exclusive``: when matched, route to this agent alone
+    - ``when_code``: also match whenever the user supplied code
+    """
+
+    def __init__(self, table: Dict[str, Any]):
+        self.rules: List[Dict[str, Any]] = table["rules"]
+        self.default_agent = table["default_agent"]
+        self.default_min_words = table.get("default_min_words", 3)
+        self.fallback_agent = table["fallback_agent"]
+        self.matcher = PhraseMatcher()
+        for index, rule in enumerate(self.rules):
+            for pattern in rule["patterns"]:
+                self.matcher.add(pattern, (index, pattern))
+        self.matcher.compile()
+        logging.info("Router compiled | rules=%d | states=%d", len(self.rules), len(self.matcher))
+
+    @property
+    def max_fan_out(self) -> int:
+        """Most agents a single query can be routed to."""
+        return max(1, len({rule["agent"] for rule in self.rules}))
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None) -> "QueryRouter":
+        """Load a routing table from a JSON file."""
+        with open(path or DEFAULT_RULES_PATH, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def route(self, user_query: str, has_code: bool = False) -> Dict[str, Any]:
+        """Route a query.
+
+        Returns a dict with the selected ``agents`` (in table order), the
+        ``matches`` that fired and the accumulated ``scores`` per agent.
+        """
+        tokens = tokenize(user_query)
+        _, hits = self.matcher.feed(tokens)
+
+        matches: List[Dict[str, Any]] = []
+        scores: Dict[str, float] = {}
+        matched_rules = set()
+        for (index, pattern), _ in hits:
+            rule = self.rules[index]
+            matched_rules.add(index)
+            scores[rule["agent"]] = scores.get(rule["agent"], 0.0) + rule.get("weight", 1.0)
+            matches.append({"rule": rule["id"], "agent": rule["agent"], "pattern": pattern,
+                            "score": rule.get("weight", 1.0)})
+        if has_code:
+            for index, rule in enumerate(self.rules):
+                if rule.get("when_code") and index not in matched_rules:
+                    matched_rules.add(index)
+                    scores[rule["agent"]] = scores.get(rule["agent"], 0.0) + rule.get("weight", 1.0)
+                    matches.append({"rule": rule["id"], "agent": rule["agent"], "pattern": None,
+                                    "score": rule.get("weight", 1.0)})
+
+        agents: List[str] = []
+        for index, rule in enumerate(self.rules):
+            if index in matched_rules and rule.get("exclusive"):
+                agents = [rule["agent"]]
+                break
+        else:
+            for index, rule in enumerate(self.rules):
+                if index in matched_rules and rule["agent"] not in agents:
+                    agents.append(rule["agent"])
+
+        if not agents:
+            words = len(user_query.split())
+            agents.append(self.default_agent if words >= self.default_min_words else self.fallback_agent)
+
+        return {"agents": agents, "matches": matches, "scores": scores}
+
+
+_default_router: Optional[QueryRouter] = None
+
+
+def get_default_router() -> QueryRouter:
+    """Get the router for the bundled rules table, compiling it on first use."""
+    global _default_router
+    if _default_router is None:
+        _default_router = QueryRouter.from_file()
+    return _default_router
@@ -1,19 +1,45 @@
 """Session management for tracking user progress."""
+import uuid
 import logging
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List, Optional, Set
+
+from src.core.session_store import SessionStore
 
 
 class SessionManager:
-    """Manages user sessions and progress tracking."""
-    
-    def __init__(self):
-        self.context: Dict[str, Any] = {}
+    """Manages user sessions and progress tracking.
+
+    Session data lives in a SessionStore; a manager is a handle on one session
+    in it. Managers sharing a store can serve many learners from one process.
+    """
+
+    def __init__(self, store: Optional[SessionStore] = None, session_id: Optional[str] = None):
+        self.store = store if store is not None else SessionStore()
+        self.session_id = session_id
+        # Set mirror of concepts_covered for O(1) membership checks; the list is
+        # append-only, so a length mismatch means another handle added to it
+        self._covered: Set[str] = set()
+
+    @property
+    def context(self) -> Dict[str, Any]:
+        """The current session context."""
+        return self.get_context()
+
+    @property
+    def skill_level(self) -> str:
+        """The learner's skill level, or "" without a session."""
+        context = self.store.get(self.session_id) if self.session_id is not None else None
+        return (context or {}).get("skill_level", "")
+
+    def for_session(self, session_id: str) -> "SessionManager":
+        """Get a manager bound to another session in the same store."""
+        return SessionManager(self.store, session_id)
 
     def create_session(self, user_id: str, skill_level: str = "beginner"):
         """Create a new user session."""
-        session_id = f"session_{user_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-        self.context = {
+        session_id = f"session_{user_id}_{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        self.store.put(session_id, {
             "session_id": session_id,
             "user_id": user_id,
             "skill_level": skill_level,
@@ -22,27 +48,49 @@ class SessionManager:
             "exercises_completed": [],
             "code_reviews": [],
             "created_at": datetime.now().isoformat()
-        }
+        })
+        self.session_id = session_id
+        self._covered = set()
         logging.info("Created session %s for user %s", session_id, user_id)
         return session_id
 
     def get_context(self) -> Dict[str, Any]:
         """Get the current session context."""
-        return self.context
+        if self.session_id is None:
+            return {}
+        return self.store.snapshot(self.session_id) or {}
 
     def append_concept(self, concept: str):
         """Add a concept to the covered concepts list."""
-        if concept not in self.context["concepts_covered"]:
-            self.context["concepts_covered"].append(concept)
+        self.add_concepts([concept])
+
+    def add_concepts(self, concepts: Iterable[str]) -> List[str]:
+        """Add several concepts; returns the ones that were not covered yet."""
+        def add(context):
+            covered = context["concepts_covered"]
+            known = self._covered if len(self._covered) == len(covered) else set(covered)
+            added = []
+            for concept in concepts:
+                if concept not in known and concept not in added:
+                    added.append(concept)
+            covered.extend(added)
+            return known, added
+        # the mirror only changes once the store has taken the write
+        known, added = self.store.update(self.session_id, add)
+        known.update(added)
+        self._covered = known
+        return added
 
     def add_progress(self, amount: int = 5):
         """Add progress points to the session."""
-        self.context["progress_score"] += amount
+        def add(context):
+            context["progress_score"] += amount
+        self.store.update(self.session_id, add)
 
     def add_exercise(self, exercise: str):
         """Add a completed exercise to the session."""
-        self.context["exercises_completed"].append(exercise)
+        self.store.update(self.session_id, lambda context: context["exercises_completed"].append(exercise))
 
     def add_code_review(self, review: Dict[str, str]):
         """Add a code review to the session."""
-        self.context["code_reviews"].append(review)
\ No newline at end of file
+        self.store.update(self.session_id, lambda context: context["code_reviews"].append(review))
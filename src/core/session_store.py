@@ -0,0 +1,289 @@
+"""Sharded multi-session store with LRU eviction to SQLite."""
+import json
+import time
+import atexit
+import logging
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.utils.helpers import (
+    SESSION_DB_PATH, SESSION_SHARDS, SESSION_MAX_RESIDENT, SESSION_SHARED, SESSION_IDLE_TTL
+)
+
+
+class SessionNotFound(KeyError):
+    """The session does not exist, e.g. it was forgotten after being idle."""
+
+
+class SQLiteSessionBackend:
+    """Persist session contexts as JSON rows in an SQLite database in WAL mode."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Read a session, or None if it was never stored."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_many(self, items: List[Tuple[str, Dict[str, Any]]]):
+        """Write several sessions in one transaction."""
+        if not items:
+            return
+        now = time.time()
+        rows = [(sid, json.dumps(ctx, separators=(",", ":")), now) for sid, ctx in items]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def update(self, session_id: str, fn: Callable[[Dict[str, Any]], Any]) -> Any:
+        """Read, modify and write a session in one write transaction.
+
+        The transaction takes SQLite's write lock up front, so concurrent
+        updates from other processes sharing the file are serialized.
+        Raises SessionNotFound if the session does not exist.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT data FROM sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                if row is None:
+                    raise SessionNotFound(session_id)
+                context = json.loads(row[0])
+                result = fn(context)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?)",
+                    (session_id, json.dumps(context, separators=(",", ":")), time.time())
+                )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+        return result
+
+    def delete(self, session_id: str):
+        """Remove a session."""
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def count(self) -> int:
+        """Number of stored sessions."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+class _Shard:
+    """One lock stripe: resident sessions in LRU order plus their dirty flags and last use."""
+
+    __slots__ = ("lock", "sessions", "dirty", "touched")
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.dirty = set()
+        self.touched: Dict[str, float] = {}
+
+
+class SessionStore:
+    """Session contexts keyed by session ID.
+
+    Sessions are spread over lock-striped shards so concurrent requests for
+    different learners rarely contend. Each shard keeps at most its share of
+    ``max_resident`` sessions in memory; the least recently used ones are
+    written to the backend in batches and dropped, then loaded again the next time they
+    are touched. Without a backend only sessions idle for ``idle_ttl`` seconds
+    are forgotten, so active learners are never dropped; a shard may then hold
+    more than its share until its sessions go idle.
+
+    With ``shared`` set, several processes (e.g. server workers) use the same
+    backend file: nothing is kept in memory, reads go to the backend and
+    every change is written through in its own transaction.
+    """
+
+    def __init__(self, backend: Optional[SQLiteSessionBackend] = None,
+                 num_shards: int = SESSION_SHARDS, max_resident: int = SESSION_MAX_RESIDENT,
+                 shared: bool = False, idle_ttl: float = SESSION_IDLE_TTL):
+        if shared and backend is None:
+            raise ValueError("a shared session store needs a backend")
+        self.backend = backend
+        self.shared = shared
+        self.idle_ttl = idle_ttl
+        self._shards = [_Shard() for _ in range(num_shards)]
+        self._shard_capacity = max(1, max_resident // num_shards)
+        # evict down to this so write-backs happen in batches, not one per insert
+        self._shard_low_water = max(1, self._shard_capacity * 9 // 10)
+
+    def _shard(self, session_id: str) -> _Shard:
+        return self._shards[zlib.crc32(session_id.encode("utf-8")) % len(self._shards)]
+
+    def put(self, session_id: str, context: Dict[str, Any]):
+        """Insert or replace a session."""
+        if self.shared:
+            self.backend.save_many([(session_id, context)])
+            return
+        shard = self._shard(session_id)
+        with shard.lock:
+            shard.sessions[session_id] = context
+            shard.sessions.move_to_end(session_id)
+            shard.touched[session_id] = time.monotonic()
+            shard.dirty.add(session_id)
+            self._evict(shard)
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return a session's context, loading it from the backend if it was evicted."""
+        shard = self._shard(session_id)
+        with shard.lock:
+            return self._resident(shard, session_id)
+
+    def snapshot(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Copy of a session's context that is safe to read without the shard lock."""
+        shard = self._shard(session_id)
+        with shard.lock:
+            context = self._resident(shard, session_id)
+            if context is None:
+                return None
+            return {k: list(v) if isinstance(v, list) else v for k, v in context.items()}
+
+    def update(self, session_id: str, fn: Callable[[Dict[str, Any]], Any]) -> Any:
+        """Apply fn to a session's context under its shard lock and mark it dirty.
+
+        Raises SessionNotFound if the session does not exist.
+        """
+        if self.shared:
+            return self.backend.update(session_id, fn)
+        shard = self._shard(session_id)
+        with shard.lock:
+            context = self._resident(shard, session_id)
+            if context is None:
+                raise SessionNotFound(session_id)
+            result = fn(context)
+            shard.dirty.add(session_id)
+            return result
+
+    def delete(self, session_id: str):
+        """Forget a session everywhere."""
+        shard = self._shard(session_id)
+        with shard.lock:
+            shard.sessions.pop(session_id, None)
+            shard.touched.pop(session_id, None)
+            shard.dirty.discard(session_id)
+            if self.backend is not None:
+                self.backend.delete(session_id)
+
+    def flush(self):
+        """Write every modified resident session to the backend."""
+        if self.backend is None or self.shared:
+            return
+        for shard in self._shards:
+            with shard.lock:
+                items = [(sid, shard.sessions[sid]) for sid in shard.dirty if sid in shard.sessions]
+                self.backend.save_many(items)
+                shard.dirty.clear()
+
+    def resident_count(self) -> int:
+        """Number of sessions currently held in memory."""
+        return sum(len(shard.sessions) for shard in self._shards)
+
+    def _resident(self, shard: _Shard, session_id: str) -> Optional[Dict[str, Any]]:
+        """Get a session from memory or the backend (shard lock held)."""
+        if self.shared:
+            return self.backend.load(session_id)
+        context = shard.sessions.get(session_id)
+        if context is not None:
+            shard.sessions.move_to_end(session_id)
+            shard.touched[session_id] = time.monotonic()
+            return context
+        if self.backend is None:
+            return None
+        context = self.backend.load(session_id)
+        if context is not None:
+            shard.sessions[session_id] = context
+            shard.touched[session_id] = time.monotonic()
+            self._evict(shard)
+        return context
+
+    def _evict(self, shard: _Shard):
+        """Drop least recently used sessions beyond the shard's share.
+
+        With a backend they are written back first; without one only
+        sessions idle for idle_ttl are dropped, as they cannot be reloaded.
+        """
+        if len(shard.sessions) <= self._shard_capacity:
+            return
+        if self.backend is None:
+            idle_before = time.monotonic() - self.idle_ttl
+            dropped = 0
+            while len(shard.sessions) > self._shard_low_water:
+                sid = next(iter(shard.sessions))
+                if shard.touched.get(sid, 0.0) > idle_before:
+                    break  # LRU order: every remaining session is active
+                del shard.sessions[sid]
+                shard.touched.pop(sid, None)
+                shard.dirty.discard(sid)
+                dropped += 1
+            if dropped:
+                logging.info("Forgot %d sessions idle for over %.0fs (no session backend)", dropped, self.idle_ttl)
+            return
+        victims = []
+        dropped = 0
+        while len(shard.sessions) > self._shard_low_water:
+            sid, context = shard.sessions.popitem(last=False)
+            shard.touched.pop(sid, None)
+            dropped += 1
+            if sid in shard.dirty:
+                shard.dirty.discard(sid)
+                victims.append((sid, context))
+        self.backend.save_many(victims)
+        logging.debug("Evicted %d idle sessions", dropped)
+
+
+_default_store: Optional[SessionStore] = None
+_default_store_lock = threading.Lock()
+
+
+def _open_store(path: str, shared: bool) -> SessionStore:
+    if not path:
+        return SessionStore()
+    store = SessionStore(SQLiteSessionBackend(path), shared=shared)
+    atexit.register(store.flush)
+    logging.info("Session store persisted to %s | shared=%s", path, shared)
+    return store
+
+
+def get_session_store() -> SessionStore:
+    """Get the process-wide session store, persisted when PHOENIX_SESSION_DB is set."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = _open_store(SESSION_DB_PATH, SESSION_SHARED)
+        return _default_store
+
+
+def configure_session_store(path: str, shared: bool = False) -> SessionStore:
+    """Set up the process-wide session store on an SQLite file before first use."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is not None:
+            raise RuntimeError("the session store is already in use")
+        _default_store = _open_store(path, shared)
+        return _default_store
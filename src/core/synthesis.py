@@ -0,0 +1,127 @@
+"""Strategies for combining several agent responses into one answer."""
+import re
+import json
+from typing import Dict, List, Tuple
+
+SYNTHESIS_STRATEGIES = ("full", "compact", "merge")
+
+AGENT_TITLES = {
+    "ConceptExplainer": "📚 Concept Explanation",
+    "CodeReviewer": "🔍 Code Review",
+    "DebuggingAgent": "🐛 Debugging",
+    "PracticeGenerator": "💪 Practice",
+    "CodeGenerator": "💻 Code",
+    "GeneralChatAgent": "💬 Chat"
+}
+
+_CODE_BLOCK_RE = re.compile(r"```[^\n]*\n.*?```", re.DOTALL)
+
+
+def _split_code(text: str) -> List[Tuple[bool, str]]:
+    """Split markdown into (is_code, segment) pieces."""
+    pieces: List[Tuple[bool, str]] = []
+    pos = 0
+    for match in _CODE_BLOCK_RE.finditer(text):
+        if match.start() > pos:
+            pieces.append((False, text[pos:match.start()]))
+        pieces.append((True, match.group(0)))
+        pos = match.end()
+    if pos < len(text):
+        pieces.append((False, text[pos:]))
+    return pieces
+
+
+def _code_fingerprint(block: str) -> str:
+    """Identify a fenced code block by its whitespace-insensitive body."""
+    body = block.split("\n", 1)[1] if "\n" in block else block
+    return " ".join(body.rstrip("`").split())
+
+
+def dedupe_responses(responses: Dict[str, str]) -> Dict[str, str]:
+    """Drop code blocks and paragraphs that an earlier agent already produced."""
+    seen_code: Dict[str, str] = {}
+    seen_paragraphs = set()
+    result: Dict[str, str] = {}
+    for name, text in responses.items():
+        out: List[str] = []
+        for is_code, segment in _split_code(text):
+            if is_code:
+                key = _code_fingerprint(segment)
+                if key in seen_code:
+                    out.append(f"_(same code as in the {seen_code[key]} section)_")
+                else:
+                    seen_code[key] = AGENT_TITLES.get(name, name)
+                    out.append(segment)
+                continue
+            # keep the original separators: a dropped paragraph takes the
+            # one before it but leaves its own line breaks, so neighbouring
+            # text never ends up on a code fence's line
+            pieces = re.split(r"(\n\s*\n)", segment)
+            for i in range(0, len(pieces), 2):
+                paragraph = pieces[i]
+                key = " ".join(paragraph.lower().split())
+                if key and key in seen_paragraphs:
+                    out.append(paragraph[:len(paragraph) - len(paragraph.lstrip())]
+                               + paragraph[len(paragraph.rstrip()):])
+                    continue
+                seen_paragraphs.add(key)
+                out.append(pieces[i - 1] + paragraph if i else paragraph)
+        result[name] = "".join(out).strip()
+    return result
+
+
+def _trim(text: str, max_chars: int) -> str:
+    """Cut text to max_chars at a line boundary, closing any open code fence."""
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    if "\n" in cut:
+        cut = cut[:cut.rindex("\n")]
+    if cut.count("```") % 2:
+        cut += "\n```"
+    return cut + "\n[...]"
+
+
+def full_synthesis_prompt(user_query: str, user_code: str, ctx: str, responses: Dict[str, str]) -> str:
+    """Prompt that re-embeds the session context and every agent response verbatim."""
+    has_code = bool(user_code and user_code.strip())
+    return f"""
+            USER QUERY:
+            {user_query}
+
+            {'USER CODE:' + user_code if has_code else 'NO CODE PROVIDED'}
+
+            SESSION CONTEXT:
+            {ctx}
+
+            SPECIALIZED AGENT RESPONSES:
+            {json.dumps(responses, indent=2)}
+
+            Please synthesize these responses into a coherent, helpful final answer.
+            Start by listing which specialized agents were consulted, then provide an integrated answer.
+            """
+
+
+def compact_synthesis_prompt(user_query: str, responses: Dict[str, str], max_chars: int) -> str:
+    """Prompt with de-duplicated, trimmed agent outputs and no session context."""
+    sections = [
+        f"[{name}]\n{_trim(text, max_chars)}"
+        for name, text in dedupe_responses(responses).items()
+    ]
+    return (
+        f"USER QUERY: {user_query}\n\n"
+        "AGENT RESPONSES:\n" + "\n\n".join(sections) + "\n\n"
+        "Merge these into one concise answer. Name the agents consulted first, "
+        "keep each code example once, and do not repeat explanations."
+    )
+
+
+def merge_responses(responses: Dict[str, str]) -> str:
+    """Combine agent responses locally into one sectioned answer, without a model call."""
+    deduped = dedupe_responses(responses)
+    consulted = ", ".join(AGENT_TITLES.get(name, name) for name in deduped)
+    sections = [f"**Agents consulted:** {consulted}"]
+    for name, text in deduped.items():
+        if text:
+            sections.append(f"### {AGENT_TITLES.get(name, name)}\n\n{text}")
+    return "\n\n".join(sections)
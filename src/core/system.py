@@ -0,0 +1,74 @@
+"""Process-wide Phoenix system: one orchestrator shared by every session."""
+import time
+import logging
+import threading
+from typing import Optional
+
+from src.core.session_manager import SessionManager
+from src.core.session_store import get_session_store
+from src.core.observability import ObservabilityManager
+from src.core.orchestrator import OrchestratorAgent
+from src.utils.helpers import METRICS_PORT, METRICS_ADDR, WARMUP_ENABLED, configure
+from src.utils.model_registry import get_model_registry
+from src.utils.metrics import start_metrics_server
+from src.agents import (
+    ConceptExplainerAgent, CodeReviewerAgent, DebuggingAgent,
+    PracticeGeneratorAgent, CodeGeneratorAgent, GeneralChatAgent
+)
+
+
+def build_orchestrator(session_manager: Optional[SessionManager] = None,
+                       observability: Optional[ObservabilityManager] = None) -> OrchestratorAgent:
+    """Build an orchestrator with all specialized agents registered."""
+    orchestrator = OrchestratorAgent(
+        session_manager if session_manager is not None else SessionManager(get_session_store()),
+        observability if observability is not None else ObservabilityManager()
+    )
+    orchestrator.register_agent("ConceptExplainer", ConceptExplainerAgent())
+    orchestrator.register_agent("CodeReviewer", CodeReviewerAgent())
+    orchestrator.register_agent("DebuggingAgent", DebuggingAgent())
+    orchestrator.register_agent("PracticeGenerator", PracticeGeneratorAgent())
+    orchestrator.register_agent("CodeGenerator", CodeGeneratorAgent())
+    orchestrator.register_agent("GeneralChatAgent", GeneralChatAgent())
+    return orchestrator
+
+
+_orchestrator: Optional[OrchestratorAgent] = None
+_orchestrator_lock = threading.Lock()
+
+
+def get_orchestrator() -> OrchestratorAgent:
+    """Get the process-wide orchestrator, starting the system on first use.
+
+    The first call configures the SDK and logging, starts the metrics
+    endpoint and model warm-up (when enabled) and builds the agents. The
+    returned orchestrator is not bound to a session; use new_session().
+    """
+    global _orchestrator
+    with _orchestrator_lock:
+        if _orchestrator is None:
+            start = time.time()
+            configure()
+            if METRICS_PORT:
+                start_metrics_server(METRICS_PORT, METRICS_ADDR)
+            if WARMUP_ENABLED:
+                get_model_registry().warm_up()
+            _orchestrator = build_orchestrator()
+            logging.info("System initialized | agents=%d | time=%.3fs",
+                         len(_orchestrator.agents), time.time() - start)
+        return _orchestrator
+
+
+def new_session(user_id: str = "user", skill_level: str = "beginner") -> OrchestratorAgent:
+    """Create a session and get an orchestrator bound to it."""
+    session_mgr = SessionManager(get_session_store())
+    session_mgr.create_session(user_id, skill_level)
+    return get_orchestrator().bind_session(session_mgr)
+
+
+def open_session(session_id: str) -> Optional[OrchestratorAgent]:
+    """Get an orchestrator bound to an existing session, or None if there is no such session."""
+    store = get_session_store()
+    if store.get(session_id) is None:
+        return None
+    return get_orchestrator().bind_session(SessionManager(store, session_id))
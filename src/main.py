@@ -2,31 +2,21 @@
 import streamlit as st
 from datetime import datetime
 import os
+from typing import Any, Dict, Optional
 
-from src.core.session_manager import SessionManager
-from src.core.observability import ObservabilityManager
-from src.core.orchestrator import OrchestratorAgent
-from src.agents import (
-    ConceptExplainerAgent, CodeReviewerAgent, DebuggingAgent,
-    PracticeGeneratorAgent, CodeGeneratorAgent, GeneralChatAgent
-)
+from src.core.jobs import FINAL_STATES, get_job_executor
+from src.core.system import new_session
+from src.utils.helpers import CHAT_WINDOW, CHAT_STREAM_REFRESH
 
 
 def initialize_system():
-    """Initialize the system."""
-    session_mgr = SessionManager()
-    session_mgr.create_session("user", "beginner")
-    observ = ObservabilityManager()
-    orchestrator = OrchestratorAgent(session_mgr, observ)
-    
-    orchestrator.register_agent("ConceptExplainer", ConceptExplainerAgent())
-    orchestrator.register_agent("CodeReviewer", CodeReviewerAgent())
-    orchestrator.register_agent("DebuggingAgent", DebuggingAgent())
-    orchestrator.register_agent("PracticeGenerator", PracticeGeneratorAgent())
-    orchestrator.register_agent("CodeGenerator", CodeGeneratorAgent())
-    orchestrator.register_agent("GeneralChatAgent", GeneralChatAgent())
+    """Initialize the system for a new browser session.
 
-    return session_mgr, observ, orchestrator
+    Agents and caches are built once per process; each call only creates a
+    session and binds the shared orchestrator to it.
+    """
+    orchestrator = new_session("user", "beginner")
+    return orchestrator.session_manager, orchestrator.observability, orchestrator
 
 
 def setup_page_config():
@@ -461,6 +451,148 @@ def render_header_with_logo():
     """, unsafe_allow_html=True)
 
 
+def user_message_html(content: str) -> str:
+    """HTML block for a user message."""
+    return f"""
+    <div class="message-container user-container">
+        <div class="user-message">
+            {content}
+        </div>
+    </div>
+    """
+
+
+def assistant_message_html(content: str) -> str:
+    """HTML block for an assistant message."""
+    return f"""
+    <div class="message-container assistant-container">
+        <div class="assistant-message">
+            {content}
+    
+    """
+
+
+def message_html(message: Dict[str, Any]) -> str:
+    """Rendered HTML of a chat message, built once and kept on the message."""
+    if "html" not in message:
+        render = user_message_html if message["role"] == "user" else assistant_message_html
+        message["html"] = render(message["content"])
+    return message["html"]
+
+
+def show_earlier_messages():
+    """Extend the chat window by one page of older messages."""
+    st.session_state.chat_window += CHAT_WINDOW
+
+
+def thinking_html(label: str) -> str:
+    """HTML block for an answer that has no text yet."""
+    return f"""
+    <div class="message-container assistant-container">
+        <div class="thinking-message">
+            {label}
+        </div>
+    </div>
+    """
+
+
+def render_chat_history():
+    """Render recent messages up to the live part of the chat, with a button to load older ones."""
+    messages = st.session_state.messages
+    hidden = max(0, len(messages) - st.session_state.chat_window)
+    if hidden:
+        st.button(f"Show earlier messages ({hidden})", on_click=show_earlier_messages)
+    for message in messages[hidden:st.session_state.live_from]:
+        st.markdown(message_html(message), unsafe_allow_html=True)
+
+
+def submit_query(user_input: str):
+    """Queue a question as a background job; its answer is followed by follow_live_messages."""
+    job = get_job_executor().submit(st.session_state.orchestrator, user_input, "")
+    st.session_state.messages.append({
+        "role": "user",
+        "content": user_input,
+        "timestamp": datetime.now().isoformat(),
+        "job": job.id
+    })
+
+
+def cancel_job(job_id: str):
+    """Stop button callback."""
+    get_job_executor().cancel(job_id)
+
+
+def job_answer(snapshot: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Assistant message for a finished job."""
+    metrics = {}
+    if snapshot is None:
+        content = "This answer is no longer available."
+    elif snapshot["status"] == "done":
+        content = snapshot["result"].get("final_response") or "No response generated."
+        metrics = snapshot["result"].get("metrics", {})
+    elif snapshot["status"] == "cancelled":
+        content = f"{snapshot['partial']}\n\n*(stopped)*" if snapshot["partial"].strip() else "*(stopped)*"
+    else:
+        content = f"Something went wrong: {snapshot['error']}"
+    return {
+        "role": "assistant",
+        "content": content,
+        "timestamp": datetime.now().isoformat(),
+        "metrics": metrics
+    }
+
+
+def render_job_progress(snapshot: Dict[str, Any]):
+    """Show the text generated so far for a running job, with a Stop button."""
+    if snapshot["cancel_requested"]:
+        st.markdown(thinking_html("🔥 Stopping..."), unsafe_allow_html=True)
+        return
+    if snapshot["partial"]:
+        st.markdown(assistant_message_html(snapshot["partial"] + "▌"), unsafe_allow_html=True)
+    else:
+        st.markdown(thinking_html("🔥 Thinking..."), unsafe_allow_html=True)
+    st.button("Stop", key=f"stop-{snapshot['id']}", on_click=cancel_job, args=(snapshot["id"],))
+
+
+def render_live_messages() -> bool:
+    """Render the messages after the history; returns whether an answer is still being generated.
+
+    A finished answer is added to the transcript right after its question.
+    """
+    messages = st.session_state.messages
+    executor = get_job_executor()
+    index = st.session_state.live_from
+    running = False
+    while index < len(messages):
+        message = messages[index]
+        st.markdown(message_html(message), unsafe_allow_html=True)
+        job_id = message.get("job")
+        if job_id is not None:
+            job = executor.get(job_id)
+            snapshot = job.snapshot() if job is not None else None
+            if snapshot is None or snapshot["status"] in FINAL_STATES:
+                del message["job"]
+                messages.insert(index + 1, job_answer(snapshot))
+            else:
+                render_job_progress(snapshot)
+                running = True
+        index += 1
+    return running
+
+
+@st.fragment(run_every=CHAT_STREAM_REFRESH)
+def follow_live_messages():
+    """Keep the live messages up to date while answers are being generated.
+
+    Reruns on its own every CHAT_STREAM_REFRESH seconds without rerunning
+    the app, so the rest of the page stays as it is. Once every answer is
+    done it reruns the app once, which renders the chat statically and so
+    stops the polling.
+    """
+    if not render_live_messages():
+        st.rerun()
+
+
 def run_streamlit_app():
     """Run the Phoenix AI Buddy chat app."""
     setup_page_config()
@@ -476,58 +608,23 @@ def run_streamlit_app():
     # Chat messages
     if "messages" not in st.session_state:
         st.session_state.messages = []
+    if "chat_window" not in st.session_state:
+        st.session_state.chat_window = CHAT_WINDOW
     
-    # Display messages with flexible width
-    for message in st.session_state.messages:
-        if message["role"] == "user":
-            st.markdown(f"""
-            <div class="message-container user-container">
-                <div class="user-message">
-                    {message["content"]}
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            st.markdown(f"""
-            <div class="message-container assistant-container">
-                <div class="assistant-message">
-                    {message["content"]}
-            
-            """, unsafe_allow_html=True)
-    
-    # Chat input - positioned very high with flexible width
+    # Chat input - positioned very high with flexible width; the question is
+    # answered in the background, so the app stays responsive meanwhile
     user_input = st.chat_input("Ask your AI Buddy...")
-    
     if user_input:
-        # Add user message
-        st.session_state.messages.append({
-            "role": "user",
-            "content": user_input,
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        # Show thinking indicator on the left
-        st.markdown("""
-        <div class="message-container assistant-container">
-            <div class="thinking-message">
-                🔥 Thinking...
-            </div>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Process with orchestrator
-        result = st.session_state.orchestrator.process_query(user_input, "")
-        final_response = result.get("final_response", "No response generated.")
-        
-        # Add assistant response
-        st.session_state.messages.append({
-            "role": "assistant", 
-            "content": final_response,
-            "timestamp": datetime.now().isoformat()
-        })
-        
-        # Use st.rerun() instead of st.experimental_rerun()
-        st.rerun()
+        submit_query(user_input)
+    
+    # Display the latest messages with flexible width; from the first
+    # question still being answered on, they are kept up to date by a
+    # polling fragment, which only runs while such a question exists
+    messages = st.session_state.messages
+    st.session_state.live_from = next((i for i, m in enumerate(messages) if "job" in m), len(messages))
+    render_chat_history()
+    if st.session_state.live_from < len(messages):
+        follow_live_messages()
 
 
 if __name__ == "__main__":
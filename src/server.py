@@ -0,0 +1,332 @@
+"""Headless HTTP API for the orchestrator, with server-sent-event streaming."""
+import os
+import hmac
+import json
+import time
+import signal
+import socket
+import logging
+import argparse
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Deque, Dict, List, Optional
+
+from src.core.session_store import SessionNotFound, configure_session_store, get_session_store
+from src.core.system import get_orchestrator, new_session, open_session
+from src.utils.helpers import (
+    SERVER_HOST, SERVER_PORT, SERVER_WORKERS, SERVER_API_TOKEN, SERVER_RESTART_LIMIT,
+    SERVER_RESTART_WINDOW, SESSION_DB_PATH, configure
+)
+from src.utils.metrics import REGISTRY
+
+# Largest request body accepted (bytes)
+MAX_BODY_BYTES = 1024 * 1024
+# Session file used when several workers need a shared store and none is configured
+DEFAULT_SHARED_SESSION_DB = "phoenix_sessions.db"
+
+
+class ApiError(Exception):
+    """A request failure reported to the client as {"error": message}."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class PhoenixRequestHandler(BaseHTTPRequestHandler):
+    """JSON API over the process-wide orchestrator.
+
+    - ``POST /sessions`` {"user_id", "skill_level"}: create a session
+    - ``GET /sessions/<id>``: the session's context
+    - ``POST /sessions/<id>/query`` {"query", "code"}: answer as process_query does
+    - ``POST /sessions/<id>/stream`` {"query", "code"}: answer as server-sent
+      events (``routed``, ``chunk``..., ``done``), one per stream_query event
+    - ``GET /healthz``: liveness, no auth
+    - ``GET /metrics``: Prometheus metrics of the worker that answers
+    """
+
+    protocol_version = "HTTP/1.1"
+    server_version = "Phoenix"
+    api_token = SERVER_API_TOKEN
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def _handle(self, method: str):
+        parts = [p for p in self.path.split("?", 1)[0].split("/") if p]
+        try:
+            if parts == ["healthz"]:
+                self._send_json(200, {"status": "ok", "pid": os.getpid()})
+                return
+            self._authorize()
+            if parts == ["metrics"] and method == "GET":
+                self._send(200, REGISTRY.render().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+            elif parts == ["sessions"] and method == "POST":
+                body = self._read_json()
+                orchestrator = new_session(str(body.get("user_id", "user")), str(body.get("skill_level", "beginner")))
+                self._send_json(201, {"session_id": orchestrator.session_manager.session_id,
+                                      "context": orchestrator.session_manager.get_context()})
+            elif len(parts) in (2, 3) and parts[0] == "sessions":
+                self._handle_session(method, parts)
+            else:
+                raise ApiError(404, "not found")
+        except ApiError as e:
+            self._send_json(e.status, {"error": e.message})
+        except Exception as e:
+            logging.exception("Request failed | %s %s", method, self.path)
+            self._send_json(500, {"error": f"internal error: {e}"})
+
+    def _handle_session(self, method: str, parts: List[str]):
+        action = parts[2] if len(parts) == 3 else None
+        if (method, action) not in (("GET", None), ("POST", "query"), ("POST", "stream")):
+            raise ApiError(404, "not found")
+        body = self._read_json() if method == "POST" else {}
+        orchestrator = open_session(parts[1])
+        if orchestrator is None:
+            raise ApiError(404, f"unknown session '{parts[1]}'")
+        if action is None:
+            self._send_json(200, orchestrator.session_manager.get_context())
+            return
+        query, code = body.get("query"), body.get("code", "")
+        if not isinstance(query, str) or not query.strip():
+            raise ApiError(400, "'query' must be a non-empty string")
+        if not isinstance(code, str):
+            raise ApiError(400, "'code' must be a string")
+        if action == "query":
+            try:
+                result = orchestrator.process_query(query, code)
+            except SessionNotFound:
+                raise ApiError(410, f"session '{parts[1]}' expired; create a new one")
+            self._send_json(200, result)
+        else:
+            self._stream(orchestrator, query, code)
+
+    def _stream(self, orchestrator, query: str, code: str):
+        """Send stream_query events as server-sent events until done or the client leaves."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("X-Accel-Buffering", "no")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        events = orchestrator.stream_query(query, code)
+        try:
+            for event in events:
+                self._send_event(event["type"], event)
+        except (BrokenPipeError, ConnectionResetError):
+            logging.info("Stream client disconnected | session=%s", orchestrator.session_manager.session_id)
+        except Exception as e:
+            logging.exception("Stream failed | session=%s", orchestrator.session_manager.session_id)
+            try:
+                self._send_event("error", {"type": "error", "error": str(e)})
+            except OSError:
+                pass
+        finally:
+            events.close()
+
+    def _send_event(self, name: str, data: Dict[str, Any]):
+        self.wfile.write(f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def _authorize(self):
+        if not self.api_token:
+            return
+        supplied = self.headers.get("Authorization", "")
+        if not hmac.compare_digest(supplied.encode("utf-8"), f"Bearer {self.api_token}".encode("utf-8")):
+            raise ApiError(401, "missing or invalid bearer token")
+
+    def _read_json(self) -> Dict[str, Any]:
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            raise ApiError(400, "invalid Content-Length")
+        if length > MAX_BODY_BYTES:
+            raise ApiError(413, f"request body over {MAX_BODY_BYTES} bytes")
+        raw = self.rfile.read(length) if length else b""
+        if not raw.strip():
+            return {}
+        try:
+            body = json.loads(raw)
+        except ValueError:
+            raise ApiError(400, "request body is not valid JSON")
+        if not isinstance(body, dict):
+            raise ApiError(400, "request body must be a JSON object")
+        return body
+
+    def _send_json(self, status: int, payload: Any):
+        self._send(status, json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json")
+
+    def _send(self, status: int, body: bytes, content_type: str):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        if status >= 400:
+            # the request body may not have been read; don't reuse the connection
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logging.info("HTTP %s | " + format, self.address_string(), *args)
+
+
+class PhoenixHTTPServer(ThreadingHTTPServer):
+    """Threaded HTTP server, optionally sharing its port with sibling processes (SO_REUSEPORT)."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, handler=PhoenixRequestHandler, reuse_port: bool = False):
+        self.reuse_port = reuse_port
+        super().__init__(address, handler)
+
+    def server_bind(self):
+        if self.reuse_port:
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+
+def _serve_worker(server: PhoenixHTTPServer, session_db: str, shared: bool, worker: int):
+    """Run one worker: open the session store, start the system and serve until told to stop."""
+    configure_session_store(session_db, shared=shared)
+    get_orchestrator()
+
+    def stop(signum, frame):
+        threading.Thread(target=server.shutdown, daemon=True).start()
+    signal.signal(signal.SIGTERM, stop)
+
+    host, port = server.server_address[:2]
+    logging.info("Worker %d serving on http://%s:%d | pid=%d", worker, host, port, os.getpid())
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        get_session_store().flush()
+        logging.info("Worker %d stopped | pid=%d", worker, os.getpid())
+
+
+def serve(host: str = SERVER_HOST, port: int = SERVER_PORT, workers: int = SERVER_WORKERS,
+          session_db: Optional[str] = SESSION_DB_PATH, restart_limit: int = SERVER_RESTART_LIMIT,
+          restart_window: float = SERVER_RESTART_WINDOW):
+    """Serve the API, forking workers processes when workers > 1.
+
+    Workers share sessions through an SQLite file (session_db, or
+    phoenix_sessions.db if unset) and each accept connections on the same
+    port: with SO_REUSEPORT the kernel balances connections between them,
+    otherwise they accept from one socket bound before forking. A worker
+    that exits cleanly is restarted at once; crashed workers are restarted
+    after a delay that doubles with each recent crash; a worker crashing
+    more than restart_limit times within
+    restart_window seconds stops the server with exit status 1. SIGTERM or
+    Ctrl+C stops them all.
+    """
+    configure()
+    if workers > 1 and not hasattr(os, "fork"):
+        logging.warning("Multiple workers need os.fork; serving with one worker")
+        workers = 1
+    if workers <= 1:
+        _serve_worker(PhoenixHTTPServer((host, port)), session_db, False, 0)
+        return
+
+    session_db = session_db or DEFAULT_SHARED_SESSION_DB
+    reuse_port = hasattr(socket, "SO_REUSEPORT")
+    listener = None if reuse_port else PhoenixHTTPServer((host, port))
+    children: Dict[int, int] = {}
+    crashes: Dict[int, Deque[float]] = {}
+    stopping = False
+    failed = False
+
+    def spawn(worker: int):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent stops workers on Ctrl+C
+                server = PhoenixHTTPServer((host, port), reuse_port=True) if reuse_port else listener
+                _serve_worker(server, session_db, True, worker)
+            except BaseException:
+                logging.exception("Worker %d crashed", worker)
+                code = 1
+            finally:
+                os._exit(code)
+        children[pid] = worker
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for worker in range(workers):
+        spawn(worker)
+    logging.info("Serving on http://%s:%d with %d workers | sessions=%s | reuse_port=%s",
+                 host, port, workers, session_db, reuse_port)
+
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        worker = children.pop(pid, None)
+        if worker is None or stopping:
+            continue
+        code = os.waitstatus_to_exitcode(status)
+        if code == 0:
+            logging.info("Worker %d exited cleanly; restarting", worker)
+            spawn(worker)
+            continue
+        now = time.monotonic()
+        recent = crashes.setdefault(worker, deque())
+        recent.append(now)
+        while recent[0] < now - restart_window:
+            recent.popleft()
+        if len(recent) > restart_limit:
+            logging.error("Worker %d exited %d times in %.0fs; stopping the server",
+                          worker, len(recent), restart_window)
+            failed = True
+            stop(None, None)
+            continue
+        delay = min(30.0, 2.0 ** (len(recent) - 1))
+        if code < 0:
+            logging.error("Worker %d killed by signal %d; restarting in %.0fs", worker, -code, delay)
+        else:
+            logging.error("Worker %d exited with code %d; restarting in %.0fs", worker, code, delay)
+        time.sleep(delay)
+        if not stopping:
+            spawn(worker)
+    if listener is not None:
+        listener.server_close()
+    if failed:
+        raise SystemExit(1)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point: python phoenix.py serve [--host H] [--port P] [--workers N]."""
+    parser = argparse.ArgumentParser(prog="phoenix.py serve", description="Serve the Phoenix API over HTTP.")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    parser.add_argument("--session-db", default=SESSION_DB_PATH,
+                        help="SQLite file for sessions (required to share them between workers)")
+    args = parser.parse_args(argv)
+    serve(args.host, args.port, args.workers, args.session_db)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""Model backends: the interface safe_generate uses to reach a model."""
+import math
+import time
+import random
+import asyncio
+import hashlib
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, Optional
+
+# Draws a delay in seconds from a random.Random
+LatencyFn = Callable[[random.Random], float]
+
+
+class ModelBackend:
+    """A model that streams text for a prompt.
+
+    Backends only produce text chunks and raise on failure; retries, quotas,
+    metrics and error strings are handled by safe_generate and friends.
+    """
+
+    model_name = "unknown"
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        """Yield the response to prompt as text chunks."""
+        raise NotImplementedError
+
+    def astream(self, prompt: str) -> AsyncIterator[str]:
+        """Async counterpart of stream (implemented as an async generator)."""
+        raise NotImplementedError
+
+    def count_tokens(self, text: str) -> Any:
+        """Count the tokens of text (also used to warm up the connection)."""
+        raise NotImplementedError
+
+
+class GeminiBackend(ModelBackend):
+    """Google Gemini through the google.generativeai SDK."""
+
+    def __init__(self, model):
+        self.model = model
+        self.model_name = getattr(model, "model_name", "gemini")
+
+    @classmethod
+    def create(cls, model_id: str, gen_config: Optional[Dict[str, Any]] = None) -> "GeminiBackend":
+        """Configure the SDK if needed and create a model handle."""
+        from src.utils.helpers import configure
+        configure()
+        import google.generativeai as genai
+        try:
+            model = genai.GenerativeModel(model_id, generation_config=gen_config)
+        except TypeError:
+            model = genai.GenerativeModel(model_id)
+        return cls(model)
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        for chunk in self.model.generate_content(prompt, stream=True):
+            text = chunk.text if hasattr(chunk, "text") else ""
+            if text:
+                yield text
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        response = await self.model.generate_content_async(prompt, stream=True)
+        async for chunk in response:
+            text = chunk.text if hasattr(chunk, "text") else ""
+            if text:
+                yield text
+
+    def count_tokens(self, text: str) -> Any:
+        return self.model.count_tokens(text)
+
+
+def as_backend(model) -> ModelBackend:
+    """Return model as a ModelBackend, wrapping a bare SDK model if needed."""
+    return model if isinstance(model, ModelBackend) else GeminiBackend(model)
+
+
+def parse_latency(spec: str) -> LatencyFn:
+    """Parse a latency distribution such as "lognormal:0.8,0.35".
+
+    Supported (all values in seconds):
+    - ``constant:S``
+    - ``uniform:LOW,HIGH``
+    - ``exponential:MEAN``
+    - ``lognormal:MEDIAN,SIGMA`` - the usual long-tailed shape of model latency
+    """
+    kind, _, args = spec.partition(":")
+    try:
+        values = [float(v) for v in args.split(",")] if args else []
+        if kind == "constant" and len(values) == 1:
+            return lambda rng: values[0]
+        if kind == "uniform" and len(values) == 2:
+            return lambda rng: rng.uniform(values[0], values[1])
+        if kind == "exponential" and len(values) == 1:
+            return lambda rng: rng.expovariate(1.0 / values[0]) if values[0] > 0 else 0.0
+        if kind == "lognormal" and len(values) == 2:
+            return lambda rng: rng.lognormvariate(math.log(values[0]), values[1]) if values[0] > 0 else 0.0
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid latency distribution '{spec}', expected e.g. "
+                     f"constant:0.2, uniform:0.1,0.5, exponential:0.3 or lognormal:0.8,0.35")
+
+
+class SimulatedBackendError(Exception):
+    """An injected model failure; ``code`` is the HTTP status it imitates."""
+
+    def __init__(self, code: int):
+        super().__init__(f"simulated model error {code}")
+        self.code = code
+
+
+class SimulatedBackend(ModelBackend):
+    """Offline stand-in for a model, for load tests and benchmarks.
+
+    The response text depends only on the seed and the prompt, so identical
+    prompts always get identical answers. Time to first chunk and the delay
+    between chunks are drawn from latency distributions (see parse_latency),
+    and a share of calls fails before the first chunk with an error that
+    the retry policy treats like the real thing (503 or 429).
+    """
+
+    VOCABULARY = (
+        "the", "a", "you", "can", "use", "this", "to", "when", "your", "code", "is", "each",
+        "value", "then", "we", "call", "it", "with", "here", "example", "note", "that", "python"
+    )
+
+    def __init__(self, model_name: str = "simulated", ttft: str = "lognormal:0.8,0.35",
+                 chunk_delay: str = "constant:0.02", output_words: int = 150,
+                 chunk_words: int = 8, error_rate: float = 0.0, seed: int = 0):
+        self.model_name = model_name
+        self.ttft = parse_latency(ttft)
+        self.chunk_delay = parse_latency(chunk_delay)
+        self.output_words = output_words
+        self.chunk_words = max(1, chunk_words)
+        self.error_rate = error_rate
+        self.seed = seed
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def respond(self, prompt: str) -> str:
+        """The full (deterministic) response to prompt."""
+        digest = hashlib.sha256(f"{self.seed}:{prompt}".encode("utf-8")).digest()
+        rng = random.Random(digest)
+        # echo words of the question so downstream tagging has real work to do
+        prompt_words = [w for w in prompt.split()[-60:] if w.isalpha()] or list(self.VOCABULARY)
+        count = max(1, int(self.output_words * rng.uniform(0.5, 1.5)))
+        words = [rng.choice(prompt_words) if rng.random() < 0.25 else rng.choice(self.VOCABULARY)
+                 for _ in range(count)]
+        return f"[simulated {digest.hex()[:8]}] " + " ".join(words) + "."
+
+    def _plan(self, prompt: str):
+        """Draw this call's delays and fate; returns (ttft, chunk delays, chunks, error)."""
+        text = self.respond(prompt)
+        words = text.split(" ")
+        chunks = [" ".join(words[i:i + self.chunk_words]) + (" " if i + self.chunk_words < len(words) else "")
+                  for i in range(0, len(words), self.chunk_words)]
+        with self._lock:
+            self.calls += 1
+            ttft = max(0.0, self.ttft(self._rng))
+            delays = [max(0.0, self.chunk_delay(self._rng)) for _ in chunks[1:]]
+            error = None
+            if self._rng.random() < self.error_rate:
+                error = SimulatedBackendError(429 if self._rng.random() < 0.3 else 503)
+        return ttft, delays, chunks, error
+
+    def stream(self, prompt: str) -> Iterator[str]:
+        ttft, delays, chunks, error = self._plan(prompt)
+        time.sleep(ttft)
+        if error is not None:
+            raise error
+        for i, chunk in enumerate(chunks):
+            if i:
+                time.sleep(delays[i - 1])
+            yield chunk
+
+    async def astream(self, prompt: str) -> AsyncIterator[str]:
+        ttft, delays, chunks, error = self._plan(prompt)
+        await asyncio.sleep(ttft)
+        if error is not None:
+            raise error
+        for i, chunk in enumerate(chunks):
+            if i:
+                await asyncio.sleep(delays[i - 1])
+            yield chunk
+
+    def count_tokens(self, text: str) -> Dict[str, int]:
+        return {"total_tokens": (len(text) + 3) // 4}
@@ -0,0 +1,209 @@
+"""Exact-match response cache for agent model calls."""
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from src.utils.helpers import (
+    CACHE_ENABLED, CACHE_TTL, CACHE_MAX_ENTRIES, CACHE_MAX_BYTES,
+    CACHE_DB_PATH, CACHE_DB_MAX_BYTES
+)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Collapse whitespace so formatting-only differences share a cache entry."""
+    return " ".join(prompt.split())
+
+
+def make_cache_key(agent_name: str, model_id: str, gen_config: Dict[str, Any], prompt: str) -> str:
+    """Build a stable cache key for one model call.
+
+    The key covers the fully built prompt, session context included, so an
+    answer personalized for one learner is never served to another.
+    """
+    payload = json.dumps(
+        [agent_name, model_id, gen_config, normalize_prompt(prompt)],
+        sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Two-tier response cache: an in-memory LRU with TTL, backed by optional SQLite.
+
+    The memory tier is bounded both by entry count and by total text size. The
+    disk tier survives restarts and is trimmed by least-recent access once it
+    grows past ``db_max_bytes``. It has its own lock, so memory hits never
+    wait on disk I/O.
+    """
+
+    _TRIM_EVERY = 64
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, max_bytes: int = CACHE_MAX_BYTES,
+                 ttl: float = CACHE_TTL, db_path: Optional[str] = None,
+                 db_max_bytes: int = CACHE_DB_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.db_max_bytes = db_max_bytes
+        self._memory: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._writes_since_trim = 0
+        self.counters = {
+            "hits_memory": 0,
+            "hits_disk": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0
+        }
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at)")
+            self._db.commit()
+            logging.info("Response cache disk tier at %s", db_path)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.counters["hits_memory"] += 1
+                    return value
+                self._drop(key)
+
+        row = self._db_get(key, now) if self._db is not None else None
+        with self._lock:
+            if row is not None:
+                self._remember(key, row[0], row[1])
+                self.counters["hits_disk"] += 1
+                return row[0]
+            self.counters["misses"] += 1
+            return None
+
+    def set(self, key: str, value: str):
+        """Store a response in every configured tier."""
+        now = time.time()
+        expires_at = now + self.ttl
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self.counters["sets"] += 1
+        if self._db is None:
+            return
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), expires_at, now)
+            )
+            self._writes_since_trim += 1
+            evicted = self._trim_disk(now) if self._writes_since_trim >= self._TRIM_EVERY else 0
+            self._db.commit()
+        if evicted:
+            with self._lock:
+                self.counters["evictions"] += evicted
+
+    def clear(self):
+        """Drop every cached response from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and current memory usage."""
+        with self._lock:
+            hits = self.counters["hits_memory"] + self.counters["hits_disk"]
+            lookups = hits + self.counters["misses"]
+            return {
+                **self.counters,
+                "entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "hit_rate": hits / lookups if lookups else 0.0
+            }
+
+    def _remember(self, key: str, value: str, expires_at: float):
+        """Insert into the memory tier and evict until within bounds."""
+        if key in self._memory:
+            self._drop(key)
+        self._memory[key] = (expires_at, value)
+        self._memory_bytes += len(value)
+        while self._memory and (len(self._memory) > self.max_entries
+                                or self._memory_bytes > self.max_bytes):
+            oldest = next(iter(self._memory))
+            self._drop(oldest)
+            self.counters["evictions"] += 1
+
+    def _drop(self, key: str):
+        """Remove a key from the memory tier."""
+        _, value = self._memory.pop(key)
+        self._memory_bytes -= len(value)
+
+    def _db_get(self, key: str, now: float) -> Optional[Tuple[str, float]]:
+        """Read an unexpired (value, expires_at) row from the disk tier, touching it."""
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and row[1] > now:
+                self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                self._db.commit()
+                return row
+            if row:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+            return None
+
+    def _trim_disk(self, now: float) -> int:
+        """Delete expired rows, then least recently used ones beyond the size budget (db lock held).
+
+        Returns the number of rows evicted for size.
+        """
+        self._writes_since_trim = 0
+        self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.db_max_bytes:
+            return 0
+        excess = total - self.db_max_bytes
+        freed = 0
+        victims = []
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self._db.executemany("DELETE FROM responses WHERE key = ?", victims)
+        return len(victims)
+
+
+_default_cache: Optional[ResponseCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[ResponseCache]:
+    """Get the process-wide response cache, or None when caching is disabled."""
+    global _default_cache
+    if not CACHE_ENABLED:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache(db_path=CACHE_DB_PATH or None)
+        return _default_cache
@@ -0,0 +1,93 @@
+"""Cooperative cancellation of model calls made on behalf of a job."""
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import List, Optional
+
+from src.utils.resilience import LocalRejection
+
+# Seconds between cancellation checks while blocked (waiting for quota or
+# for a shared call); streams are also checked between chunks
+POLL_INTERVAL = 0.1
+
+
+class Cancelled(LocalRejection):
+    """Raised at a cancellation point once the work it belongs to was cancelled."""
+
+
+class CancelToken:
+    """Set once to ask the work started under it to stop."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+
+class ChildCancelToken(CancelToken):
+    """Token for part of some work: cancelled on its own or together with its parent."""
+
+    def __init__(self, parent: Optional[CancelToken] = None):
+        super().__init__()
+        self.parent = parent
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set() or (self.parent is not None and self.parent.cancelled)
+
+
+class SharedCancelToken:
+    """Token of a call shared by several callers: cancelled once all of them are.
+
+    A caller without a token cannot be cancelled, so neither can the call.
+    """
+
+    def __init__(self):
+        self._tokens: List[CancelToken] = []
+        self._uncancellable = False
+        self._lock = threading.Lock()
+
+    def join(self, token: Optional[CancelToken]):
+        """Add a caller's token (None for a caller that cannot be cancelled)."""
+        with self._lock:
+            if token is None:
+                self._uncancellable = True
+            else:
+                self._tokens.append(token)
+
+    @property
+    def cancelled(self) -> bool:
+        with self._lock:
+            return not self._uncancellable and bool(self._tokens) and all(t.cancelled for t in self._tokens)
+
+
+# Token of the work the current model calls are made for. Set by the job
+# executor; copied into worker threads together with the rest of the context.
+cancel_context: contextvars.ContextVar = contextvars.ContextVar("phoenix_cancel_token", default=None)
+
+
+def current_token():
+    """The token governing the current context, or None if it cannot be cancelled."""
+    return cancel_context.get()
+
+
+@contextmanager
+def cancel_scope(token):
+    """Make model calls inside the block stop at their next cancellation point once token is cancelled."""
+    reset = cancel_context.set(token)
+    try:
+        yield
+    finally:
+        cancel_context.reset(reset)
+
+
+def raise_if_cancelled():
+    """Cancellation point: raise Cancelled if the current work was cancelled."""
+    token = cancel_context.get()
+    if token is not None and token.cancelled:
+        raise Cancelled("cancelled")
@@ -2,18 +2,20 @@
 import os
 import time
 import logging
+import threading
 import traceback
-from dotenv import load_dotenv
+from typing import Dict, Iterator, List, Optional
 
-import google.generativeai as genai
+from src.utils.backends import as_backend
+from src.utils.metrics import MODEL_REQUESTS, MODEL_IN_FLIGHT, MODEL_LATENCY, MODEL_TTFT
+from src.utils.resilience import ResiliencePolicy, LocalRejection
+from src.utils.scheduler import RequestScheduler
+from src.utils.cancellation import Cancelled, raise_if_cancelled
 
-# Configuration
-load_dotenv()
-API_KEY = os.getenv("GOOGLE_API_KEY")
-if not API_KEY:
-    raise ValueError("GOOGLE_API_KEY not found in environment or .env file")
-
-genai.configure(api_key=API_KEY)
+# Configuration: the settings below are read from the environment; phoenix.py
+# loads .env into it before importing anything. Importing this module has no
+# side effects: .env, the API key check, SDK setup and logging happen in
+# configure(), and the model policy and scheduler are built on first use.
 
 MODEL_ID = "models/gemini-2.5-flash"
 GEN_CONFIG = {
@@ -22,42 +24,445 @@ GEN_CONFIG = {
     "max_output_tokens": 4096
 }
 
+# Model backend: "gemini" (Google AI, needs GOOGLE_API_KEY) or "simulated"
+# (offline, deterministic answers for load tests). The simulated backend's
+# latencies are distributions as understood by backends.parse_latency.
+MODEL_BACKEND = os.getenv("PHOENIX_BACKEND", "gemini")
+SIM_TTFT = os.getenv("PHOENIX_SIM_TTFT", "lognormal:0.8,0.35")
+SIM_CHUNK_DELAY = os.getenv("PHOENIX_SIM_CHUNK_DELAY", "constant:0.02")
+SIM_OUTPUT_WORDS = int(os.getenv("PHOENIX_SIM_OUTPUT_WORDS", "150"))
+SIM_ERROR_RATE = float(os.getenv("PHOENIX_SIM_ERROR_RATE", "0"))
+SIM_SEED = int(os.getenv("PHOENIX_SIM_SEED", "0"))
+
+# Open the model connection at startup, and re-ping it every this many
+# seconds so it is not dropped as idle (0 pings once)
+WARMUP_ENABLED = os.getenv("PHOENIX_WARMUP", "1") != "0"
+WARMUP_INTERVAL = float(os.getenv("PHOENIX_WARMUP_INTERVAL", "240"))
+
+# Agent fan-out: worker pool shared by every session (0 sizes it for
+# JOB_WORKERS concurrent queries at the widest fan-out) and per-agent
+# timeout (seconds)
+MAX_AGENT_WORKERS = int(os.getenv("PHOENIX_MAX_AGENT_WORKERS", "0"))
+AGENT_TIMEOUT = float(os.getenv("PHOENIX_AGENT_TIMEOUT", "90"))
+
+# Model call resilience: retries with jittered exponential backoff, hedged
+# duplicate requests past a latency percentile (0 disables), and a per-model
+# circuit breaker that opens after consecutive failures (0 disables)
+MODEL_MAX_RETRIES = int(os.getenv("PHOENIX_MODEL_MAX_RETRIES", "2"))
+RETRY_BASE_DELAY = float(os.getenv("PHOENIX_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = float(os.getenv("PHOENIX_RETRY_MAX_DELAY", "8"))
+HEDGE_PERCENTILE = float(os.getenv("PHOENIX_HEDGE_PERCENTILE", "0.95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("PHOENIX_HEDGE_MIN_SAMPLES", "20"))
+HEDGE_MIN_DELAY = float(os.getenv("PHOENIX_HEDGE_MIN_DELAY", "1.0"))
+BREAKER_FAILURES = int(os.getenv("PHOENIX_BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.getenv("PHOENIX_BREAKER_RESET", "30"))
+
+# Shared API quota: requests and tokens per minute across all agents (0 means
+# unlimited), burst share, longest wait for quota, and the output tokens
+# assumed for a call until its real size is known
+SCHEDULER_RPM = float(os.getenv("PHOENIX_RPM_LIMIT", "1000"))
+SCHEDULER_TPM = float(os.getenv("PHOENIX_TPM_LIMIT", "1000000"))
+SCHEDULER_BURST = float(os.getenv("PHOENIX_QUOTA_BURST", "0.1"))
+SCHEDULER_MAX_WAIT = float(os.getenv("PHOENIX_QUOTA_MAX_WAIT", "60"))
+SCHEDULER_OUTPUT_TOKENS = int(os.getenv("PHOENIX_QUOTA_OUTPUT_TOKENS", "1000"))
+
+# Response cache: in-memory LRU with TTL plus an optional SQLite file
+CACHE_ENABLED = os.getenv("PHOENIX_CACHE", "1") != "0"
+CACHE_TTL = float(os.getenv("PHOENIX_CACHE_TTL", str(24 * 3600)))
+CACHE_MAX_ENTRIES = int(os.getenv("PHOENIX_CACHE_MAX_ENTRIES", "1024"))
+CACHE_MAX_BYTES = int(os.getenv("PHOENIX_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+CACHE_DB_PATH = os.getenv("PHOENIX_CACHE_DB", "")
+CACHE_DB_MAX_BYTES = int(os.getenv("PHOENIX_CACHE_DB_MAX_BYTES", str(256 * 1024 * 1024)))
+
+# Share one model call between concurrent identical agent requests
+COALESCE_ENABLED = os.getenv("PHOENIX_COALESCE", "1") != "0"
+
+# Near-duplicate query cache in front of the orchestrator
+SIMILARITY_CACHE_ENABLED = os.getenv("PHOENIX_SIMILARITY_CACHE", "1") != "0"
+SIMILARITY_THRESHOLD = float(os.getenv("PHOENIX_SIMILARITY_THRESHOLD", "0.75"))
+SIMILARITY_MAX_ENTRIES = int(os.getenv("PHOENIX_SIMILARITY_MAX_ENTRIES", "100000"))
+SIMILARITY_TTL = float(os.getenv("PHOENIX_SIMILARITY_TTL", str(24 * 3600)))
+
+# How multi-agent answers are combined: "full", "compact" or "merge" (no model call)
+SYNTHESIS_STRATEGY = os.getenv("PHOENIX_SYNTHESIS", "full")
+COMPACT_SYNTHESIS_CHARS = int(os.getenv("PHOENIX_COMPACT_SYNTHESIS_CHARS", "1500"))
+
+# Session context sent with each prompt: token budget and verbatim recent items per list
+CONTEXT_TOKEN_BUDGET = int(os.getenv("PHOENIX_CONTEXT_TOKEN_BUDGET", "400"))
+CONTEXT_RECENT_ITEMS = int(os.getenv("PHOENIX_CONTEXT_RECENT_ITEMS", "5"))
+
+# Number of recent interaction records kept by ObservabilityManager
+OBSERVABILITY_BUFFER_SIZE = int(os.getenv("PHOENIX_OBSERVABILITY_BUFFER", "500"))
+
+# Tracing: sampled traces are written as OTLP/JSON lines to a size-rotated file
+SERVICE_NAME = os.getenv("PHOENIX_SERVICE_NAME", "phoenix-ai-buddy")
+TRACE_FILE = os.getenv("PHOENIX_TRACE_FILE", "phoenix_traces.jsonl")
+TRACE_SAMPLE_RATE = float(os.getenv("PHOENIX_TRACE_SAMPLE_RATE", "1.0"))
+TRACE_MAX_BYTES = int(os.getenv("PHOENIX_TRACE_MAX_BYTES", str(10 * 1024 * 1024)))
+TRACE_BACKUP_COUNT = int(os.getenv("PHOENIX_TRACE_BACKUP_COUNT", "5"))
+
+# Local port for the Prometheus metrics endpoint (0 disables it)
+METRICS_PORT = int(os.getenv("PHOENIX_METRICS_PORT", "0"))
+METRICS_ADDR = os.getenv("PHOENIX_METRICS_ADDR", "127.0.0.1")
+
+# Per-agent interaction history: records kept in memory, prompt excerpt length,
+# and an optional directory where older records are spilled as gzip JSONL
+HISTORY_CAPACITY = int(os.getenv("PHOENIX_HISTORY_CAPACITY", "200"))
+HISTORY_EXCERPT_CHARS = int(os.getenv("PHOENIX_HISTORY_EXCERPT_CHARS", "120"))
+HISTORY_SPILL_DIR = os.getenv("PHOENIX_HISTORY_SPILL_DIR", "")
+
+# Session store: lock stripes, sessions kept in memory, how long a session
+# must be idle before a store without a file may forget it, and the SQLite
+# file idle sessions are written to (empty keeps sessions in memory). A
+# shared store keeps nothing in memory so several processes can use the file.
+SESSION_SHARDS = int(os.getenv("PHOENIX_SESSION_SHARDS", "16"))
+SESSION_MAX_RESIDENT = int(os.getenv("PHOENIX_SESSION_MAX_RESIDENT", "10000"))
+SESSION_IDLE_TTL = float(os.getenv("PHOENIX_SESSION_IDLE_TTL", "3600"))
+SESSION_DB_PATH = os.getenv("PHOENIX_SESSION_DB", "")
+SESSION_SHARED = os.getenv("PHOENIX_SESSION_SHARED", "0") == "1"
+
+# Headless HTTP server (python phoenix.py serve): bind address, worker
+# processes, and the bearer token clients must send (empty disables auth)
+SERVER_HOST = os.getenv("PHOENIX_SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("PHOENIX_SERVER_PORT", "8080"))
+SERVER_WORKERS = int(os.getenv("PHOENIX_SERVER_WORKERS", "1"))
+SERVER_API_TOKEN = os.getenv("PHOENIX_API_TOKEN", "")
+
+# Multi-worker server: a worker crashing more than this many times within
+# the window (seconds) stops the server instead of being restarted again
+SERVER_RESTART_LIMIT = int(os.getenv("PHOENIX_SERVER_RESTART_LIMIT", "5"))
+SERVER_RESTART_WINDOW = float(os.getenv("PHOENIX_SERVER_RESTART_WINDOW", "60"))
+
+# Batch processing: model calls a batch runs at once
+BATCH_CONCURRENCY = int(os.getenv("PHOENIX_BATCH_CONCURRENCY", "8"))
+
+# Background jobs (the chat UI's queries): worker threads shared by all
+# sessions, and seconds a finished job stays available for polling
+JOB_WORKERS = int(os.getenv("PHOENIX_JOB_WORKERS", "8"))
+JOB_RETENTION = float(os.getenv("PHOENIX_JOB_RETENTION", "600"))
+
+# Chat UI: messages rendered per page of history, and seconds between
+# refreshes of answers that are still being generated
+CHAT_WINDOW = int(os.getenv("PHOENIX_CHAT_WINDOW", "40"))
+CHAT_STREAM_REFRESH = float(os.getenv("PHOENIX_CHAT_STREAM_REFRESH", "0.25"))
+
+NO_RESPONSE_TEXT = "Sorry, no response generated. Please try with more details."
+
 LOG_FILE = "phoenix_agent.log"
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format="%(asctime)s %(levelname)s %(message)s"
-)
 
+_configured = False
+_configure_lock = threading.Lock()
+
+
+def configure(api_key: Optional[str] = None, log_file: Optional[str] = LOG_FILE):
+    """Set up logging and the Gemini SDK; call once at startup, repeat calls do nothing.
+
+    Raises ValueError when the gemini backend is used and no API key is
+    passed or found in GOOGLE_API_KEY.
+    """
+    global _configured
+    with _configure_lock:
+        if _configured:
+            return
+        # .env never overrides variables that are already set
+        from dotenv import load_dotenv
+        load_dotenv()
+        if log_file:
+            logging.basicConfig(
+                filename=log_file,
+                level=logging.INFO,
+                format="%(asctime)s %(levelname)s %(message)s"
+            )
+        if MODEL_BACKEND == "gemini":
+            key = api_key or os.getenv("GOOGLE_API_KEY")
+            if not key:
+                raise ValueError("GOOGLE_API_KEY not found in environment or .env file")
+            # The SDK pulls in gRPC and protobuf, so it is only imported once needed
+            import google.generativeai as genai
+            genai.configure(api_key=key)
+        _configured = True
+
+
+_model_policy: Optional[ResiliencePolicy] = None
+_model_scheduler: Optional[RequestScheduler] = None
+_model_lock = threading.Lock()
+
+
+def get_model_policy() -> ResiliencePolicy:
+    """Get the process-wide retry, hedging and circuit breaker policy for model calls."""
+    global _model_policy
+    if _model_policy is not None:
+        return _model_policy
+    with _model_lock:
+        if _model_policy is None:
+            _model_policy = ResiliencePolicy(
+                max_retries=MODEL_MAX_RETRIES,
+                base_delay=RETRY_BASE_DELAY,
+                max_delay=RETRY_MAX_DELAY,
+                hedge_percentile=HEDGE_PERCENTILE,
+                hedge_min_samples=HEDGE_MIN_SAMPLES,
+                hedge_min_delay=HEDGE_MIN_DELAY,
+                breaker_failures=BREAKER_FAILURES,
+                breaker_reset=BREAKER_RESET
+            )
+        return _model_policy
+
+
+def get_model_scheduler() -> RequestScheduler:
+    """Get the process-wide rate limit scheduler for model calls."""
+    global _model_scheduler
+    if _model_scheduler is not None:
+        return _model_scheduler
+    with _model_lock:
+        if _model_scheduler is None:
+            _model_scheduler = RequestScheduler(SCHEDULER_RPM, SCHEDULER_TPM, SCHEDULER_BURST, SCHEDULER_MAX_WAIT)
+        return _model_scheduler
+
+
+def _finish_generation(model_obj, prompt: str, full_text: str, start: float,
+                       ttft: Optional[float] = None,
+                       metrics: Optional[Dict[str, float]] = None) -> str:
+    """Log a completed model call and normalize its text."""
+    elapsed = time.time() - start
+    logging.info(
+        "Model call OK | model=%s | time=%.2fs | ttft=%.2fs | prompt_len=%d | response_len=%d",
+        getattr(model_obj, "model_name", MODEL_ID),
+        elapsed,
+        ttft if ttft is not None else elapsed,
+        len(prompt),
+        len(full_text)
+    )
+    model_name = getattr(model_obj, "model_name", MODEL_ID)
+    MODEL_REQUESTS.inc(model=model_name, outcome="ok")
+    MODEL_LATENCY.observe(elapsed, model=model_name)
+    MODEL_TTFT.observe(ttft if ttft is not None else elapsed, model=model_name)
+    if metrics is not None:
+        metrics["latency"] = elapsed
+        metrics["ttft"] = ttft if ttft is not None else elapsed
+
+    if not full_text.strip():
+        return NO_RESPONSE_TEXT
+
+    return full_text.strip()
+
+
+def estimate_tokens(text) -> int:
+    """Rough token count (about four characters per token) for text or a length."""
+    length = text if isinstance(text, int) else len(text)
+    return (length + 3) // 4
+
+
+def is_cacheable_response(text: str) -> bool:
+    """Whether a model result is a real answer rather than an error or fallback."""
+    return bool(text) and text != NO_RESPONSE_TEXT and not text.startswith("[Agent ERROR]")
 
-def safe_generate(model_obj, prompt: str) -> str:
-    """Safely generate content with error handling and logging."""
+
+def is_error_response(text: str, agent_name: Optional[str] = None) -> bool:
+    """Whether text is a failure marker rather than an answer.
+
+    Covers model errors and empty fallbacks from safe_generate as well as the
+    orchestrator's "[<agent> ERROR]", "[<agent> TIMEOUT]" and "not registered" markers.
+    """
+    if not is_cacheable_response(text):
+        return True
+    return bool(agent_name) and text.startswith(f"[{agent_name} ")
+
+
+def _generation_error(model_obj, e: Exception, start: float) -> str:
+    """Log a failed model call and build the agent error string."""
+    elapsed = time.time() - start
+    model_name = getattr(model_obj, "model_name", MODEL_ID)
+    if isinstance(e, LocalRejection):
+        MODEL_REQUESTS.inc(model=model_name, outcome="rejected")
+        logging.error("Model call REJECTED | model=%s | err=%s", model_name, str(e))
+        return f"[Agent ERROR] {str(e)}"
+    MODEL_REQUESTS.inc(model=model_name, outcome="error")
+    MODEL_LATENCY.observe(elapsed, model=model_name)
+    logging.error("Model call ERROR | time=%.2fs | err=%s", elapsed, str(e))
+    logging.error(traceback.format_exc())
+    return f"[Agent ERROR] {str(e)}"
+
+
+def _generation_cancelled(model_obj, start: float):
+    """Log a model call abandoned because its job was cancelled."""
+    model_name = getattr(model_obj, "model_name", MODEL_ID)
+    MODEL_REQUESTS.inc(model=model_name, outcome="cancelled")
+    logging.info("Model call CANCELLED | model=%s | time=%.2fs", model_name, time.time() - start)
+
+
+def _quota_estimate(prompt: str) -> int:
+    """Tokens reserved with the scheduler for one call on prompt."""
+    return estimate_tokens(prompt) + SCHEDULER_OUTPUT_TOKENS
+
+
+def _admit(prompt: str, wait: bool = True) -> Optional[int]:
+    """Reserve scheduler quota for one call on prompt.
+
+    Returns the reserved estimate, to be settled by the call, or None when
+    wait is False and the quota is not free right now.
+    """
+    estimate = _quota_estimate(prompt)
+    scheduler = get_model_scheduler()
+    if wait:
+        scheduler.acquire(estimate)
+    elif not scheduler.try_acquire(estimate):
+        return None
+    return estimate
+
+
+async def _aadmit(prompt: str, wait: bool = True) -> Optional[int]:
+    """Async counterpart of _admit."""
+    estimate = _quota_estimate(prompt)
+    scheduler = get_model_scheduler()
+    if wait:
+        await scheduler.aacquire(estimate)
+    elif not scheduler.try_acquire(estimate):
+        return None
+    return estimate
+
+
+def _generate_once(model_obj, prompt: str, start: float, estimate: int):
+    """One streamed model call on quota reserved by _admit; returns the text and the time to its first chunk."""
+    ttft = None
+    parts: List[str] = []
+    try:
+        for text in as_backend(model_obj).stream(prompt):
+            raise_if_cancelled()
+            if ttft is None:
+                ttft = time.time() - start
+            parts.append(text)
+    finally:
+        get_model_scheduler().settle(estimate, estimate_tokens(len(prompt) + sum(map(len, parts))))
+    return "".join(parts), ttft
+
+
+async def _agenerate_once(model_obj, prompt: str, start: float, estimate: int):
+    """Async counterpart of _generate_once."""
+    ttft = None
+    parts: List[str] = []
+    try:
+        async for text in as_backend(model_obj).astream(prompt):
+            raise_if_cancelled()
+            if ttft is None:
+                ttft = time.time() - start
+            parts.append(text)
+    finally:
+        get_model_scheduler().settle(estimate, estimate_tokens(len(prompt) + sum(map(len, parts))))
+    return "".join(parts), ttft
+
+
+def safe_generate(model_obj, prompt: str, metrics: Optional[Dict[str, float]] = None) -> str:
+    """Safely generate content with error handling and logging.
+
+    Calls go through the model policy, so transient failures are retried, slow
+    calls are hedged and a failing model is short-circuited.
+    """
     start = time.time()
-    full_text = ""
+    model_name = getattr(model_obj, "model_name", MODEL_ID)
+    MODEL_IN_FLIGHT.inc(model=model_name)
 
     try:
-        response = model_obj.generate_content(prompt, stream=True)
+        text, ttft = get_model_policy().call(model_name,
+                                             lambda estimate: _generate_once(model_obj, prompt, start, estimate),
+                                             admit=lambda wait: _admit(prompt, wait))
+        return _finish_generation(model_obj, prompt, text, start, ttft, metrics)
+
+    except Cancelled:
+        _generation_cancelled(model_obj, start)
+        raise
+
+    except Exception as e:
+        return _generation_error(model_obj, e, start)
 
-        for chunk in response:
-            if hasattr(chunk, "text"):
-                full_text += chunk.text
+    finally:
+        MODEL_IN_FLIGHT.dec(model=model_name)
 
-        elapsed = time.time() - start
-        logging.info(
-            "Model call OK | model=%s | time=%.2fs | prompt_len=%d | response_len=%d",
-            getattr(model_obj, "model_name", MODEL_ID),
-            elapsed,
-            len(prompt),
-            len(full_text)
-        )
 
-        if not full_text.strip():
-            return "Sorry, no response generated. Please try with more details."
+def safe_generate_stream(model_obj, prompt: str,
+                         metrics: Optional[Dict[str, float]] = None) -> Iterator[str]:
+    """Like safe_generate, but yield text chunks as soon as the model sends them.
 
-        return full_text.strip()
+    Failures and empty responses are yielded as the same text safe_generate
+    would have returned, so consumers only ever see strings. Retries and the
+    circuit breaker apply until the first chunk has been yielded; streams are
+    never hedged, since two streams cannot be shown at once. A cancelled
+    call (see cancellation.cancel_scope) stops between chunks and raises
+    Cancelled instead.
+    """
+    start = time.time()
+    ttft = None
+    parts: List[str] = []
+    model_name = getattr(model_obj, "model_name", MODEL_ID)
+    policy, scheduler = get_model_policy(), get_model_scheduler()
+    MODEL_IN_FLIGHT.inc(model=model_name)
+
+    try:
+        attempt = 0
+        while True:
+            attempt_start = time.monotonic()
+            estimate = _quota_estimate(prompt)
+            raise_if_cancelled()
+            probe = policy.before_attempt(model_name)
+            try:
+                scheduler.acquire(estimate)
+            except BaseException:
+                policy.after_attempt(model_name, probe)
+                raise
+            # quota was taken: settle it however the attempt ends, including
+            # when the consumer closes the stream mid-answer
+            try:
+                for text in as_backend(model_obj).stream(prompt):
+                    raise_if_cancelled()
+                    if ttft is None:
+                        ttft = time.time() - start
+                    parts.append(text)
+                    yield text
+            except Exception as e:
+                # once text has been shown the call can no longer be retried
+                delay = policy.on_failure(model_name, e, attempt, can_retry=not parts)
+                if delay is None:
+                    raise
+            else:
+                policy.on_success(model_name, time.monotonic() - attempt_start)
+                break
+            finally:
+                scheduler.settle(estimate, estimate_tokens(len(prompt) + sum(map(len, parts))))
+                policy.after_attempt(model_name, probe)
+            attempt += 1
+            time.sleep(delay)
+        final = _finish_generation(model_obj, prompt, "".join(parts), start, ttft, metrics)
+        if final == NO_RESPONSE_TEXT:
+            yield final
+
+    except Cancelled:
+        _generation_cancelled(model_obj, start)
+        raise
 
     except Exception as e:
-        elapsed = time.time() - start
-        logging.error("Model call ERROR | time=%.2fs | err=%s", elapsed, str(e))
-        logging.error(traceback.format_exc())
-        return f"[Agent ERROR] {str(e)}"
\ No newline at end of file
+        yield _generation_error(model_obj, e, start)
+
+    finally:
+        MODEL_IN_FLIGHT.dec(model=model_name)
+
+
+async def asafe_generate(model_obj, prompt: str, metrics: Optional[Dict[str, float]] = None) -> str:
+    """Async variant of safe_generate built on the backend's async stream."""
+    start = time.time()
+    model_name = getattr(model_obj, "model_name", MODEL_ID)
+    MODEL_IN_FLIGHT.inc(model=model_name)
+
+    try:
+        text, ttft = await get_model_policy().acall(
+            model_name, lambda estimate: _agenerate_once(model_obj, prompt, start, estimate),
+            admit=lambda wait: _aadmit(prompt, wait))
+        return _finish_generation(model_obj, prompt, text, start, ttft, metrics)
+
+    except Cancelled:
+        _generation_cancelled(model_obj, start)
+        raise
+
+    except Exception as e:
+        return _generation_error(model_obj, e, start)
+
+    finally:
+        MODEL_IN_FLIGHT.dec(model=model_name)
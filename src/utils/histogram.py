@@ -0,0 +1,58 @@
+"""Constant-memory latency histogram."""
+import math
+from bisect import bisect_left
+from typing import Dict, List
+
+
+class LatencyHistogram:
+    """Histogram over log-spaced buckets with percentile estimates.
+
+    Memory and percentile cost depend only on the bucket count, never on how
+    many values were observed. Percentiles are accurate to one bucket width
+    (``growth`` - 1, i.e. 10% by default).
+    """
+
+    def __init__(self, min_value: float = 0.001, max_value: float = 600.0, growth: float = 1.1):
+        bounds: List[float] = []
+        value = min_value
+        while value < max_value:
+            bounds.append(value)
+            value *= growth
+        bounds.append(max_value)
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        """Record one value (seconds)."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, p: float) -> float:
+        """Estimate the p-th quantile (0 < p <= 1) as the upper bound of its bucket."""
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(p * self.count))
+        cumulative = 0
+        for index, n in enumerate(self.counts):
+            cumulative += n
+            if cumulative >= target:
+                upper = self.bounds[index] if index < len(self.bounds) else self.max
+                return min(upper, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """Count, mean, max and p50/p95/p99 in seconds."""
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": self.max
+        }
@@ -0,0 +1,125 @@
+"""Fixed-capacity interaction history for agents."""
+import os
+import gzip
+import atexit
+import json
+import hashlib
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Deque, Dict, Any, Iterator, List, Optional
+
+from src.utils.helpers import HISTORY_CAPACITY, HISTORY_EXCERPT_CHARS, HISTORY_SPILL_DIR
+
+
+class InteractionRecord:
+    """One agent interaction with the prompt reduced to a hash and an excerpt."""
+
+    __slots__ = ("timestamp", "agent", "prompt_hash", "prompt_len", "prompt_excerpt", "response_summary")
+
+    def __init__(self, timestamp: float, agent: str, prompt_hash: str, prompt_len: int,
+                 prompt_excerpt: str, response_summary: str):
+        self.timestamp = timestamp
+        self.agent = agent
+        self.prompt_hash = prompt_hash
+        self.prompt_len = prompt_len
+        self.prompt_excerpt = prompt_excerpt
+        self.response_summary = response_summary
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Plain-dict form, as stored in spill files."""
+        return {
+            "timestamp": datetime.fromtimestamp(self.timestamp).isoformat(),
+            "agent": self.agent,
+            "prompt_hash": self.prompt_hash,
+            "prompt_len": self.prompt_len,
+            "prompt_excerpt": self.prompt_excerpt,
+            "response_summary": self.response_summary
+        }
+
+
+class InteractionHistory:
+    """Ring buffer of recent InteractionRecords.
+
+    Once full, the oldest records are dropped, or, when ``spill_path`` is set,
+    appended in batches to a gzip-compressed JSONL file so nothing is lost.
+    A partial batch is written by close(), which also runs at interpreter
+    exit.
+    """
+
+    SPILL_BATCH = 64
+
+    def __init__(self, agent: str, capacity: int = HISTORY_CAPACITY,
+                 excerpt_chars: int = HISTORY_EXCERPT_CHARS, response_chars: int = 400,
+                 spill_path: Optional[str] = None):
+        self.agent = agent
+        self.excerpt_chars = excerpt_chars
+        self.response_chars = response_chars
+        self.spill_path = spill_path
+        self._records: Deque[InteractionRecord] = deque(maxlen=capacity)
+        self._pending_spill: List[InteractionRecord] = []
+        self._lock = threading.Lock()
+        # serializes spill writes so batches reach the file in eviction order
+        self._spill_lock = threading.Lock()
+        self.total = 0
+        if spill_path:
+            atexit.register(self.close)
+
+    def append(self, prompt: str, response: str, timestamp: float):
+        """Record an interaction."""
+        record = InteractionRecord(
+            timestamp,
+            self.agent,
+            hashlib.sha1(prompt.encode("utf-8")).hexdigest(),
+            len(prompt),
+            prompt[:self.excerpt_chars],
+            response[:self.response_chars]
+        )
+        with self._lock:
+            if self.spill_path and len(self._records) == self._records.maxlen:
+                self._pending_spill.append(self._records[0])
+            self._records.append(record)
+            self.total += 1
+            spill = len(self._pending_spill) >= self.SPILL_BATCH
+        if spill:
+            self.flush()
+
+    def last(self, n: int = 10) -> List[Dict[str, Any]]:
+        """The n most recent interactions, oldest first."""
+        with self._lock:
+            records = list(self._records)[-n:] if n > 0 else []
+        return [r.to_dict() for r in records]
+
+    def flush(self):
+        """Write any evicted records still waiting to be spilled.
+
+        The file is written without holding the history's lock, so appends
+        and readers never wait on it.
+        """
+        with self._spill_lock:
+            with self._lock:
+                pending, self._pending_spill = self._pending_spill, []
+            if not pending:
+                return
+            lines = "".join(json.dumps(r.to_dict()) + "\n" for r in pending)
+            with gzip.open(self.spill_path, "at", encoding="utf-8") as f:
+                f.write(lines)
+
+    def close(self):
+        """Spill what is pending; call when the history is no longer used."""
+        if self.spill_path:
+            self.flush()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return iter(self.last(len(self._records)))
+
+
+def spill_path_for(agent: str) -> Optional[str]:
+    """Spill file for an agent under PHOENIX_HISTORY_SPILL_DIR, or None when spilling is off."""
+    if not HISTORY_SPILL_DIR:
+        return None
+    os.makedirs(HISTORY_SPILL_DIR, exist_ok=True)
+    return os.path.join(HISTORY_SPILL_DIR, f"{agent}_history.jsonl.gz")
@@ -0,0 +1,100 @@
+"""Multi-pattern phrase matching over word tokens."""
+import re
+from collections import deque
+from typing import Any, Dict, Iterable, List, Tuple
+
+_TOKEN_RE = re.compile(r"[a-z0-9_+#]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase text and split it into word tokens.
+
+    Apostrophes are dropped rather than treated as separators, so "what's"
+    and "whats" produce the same token.
+    """
+    return _TOKEN_RE.findall(text.lower().replace("'", "").replace("’", ""))
+
+
+class PhraseMatcher:
+    """Aho-Corasick automaton whose alphabet is word tokens.
+
+    Phrases only match on whole tokens, which gives word-boundary semantics
+    for free ("hi" never matches inside "this"). Matching is a single pass
+    over the tokens regardless of how many phrases were added, and can be
+    resumed across calls by carrying the returned state.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # phrases ending at each state, and (once compiled) those plus the
+        # ones reachable through failure links
+        self._own: List[List[Tuple[int, Any]]] = [[]]
+        self._out: List[List[Tuple[int, Any]]] = [[]]
+        self._compiled = False
+
+    def add(self, phrase: str, payload: Any):
+        """Register a phrase; payload is reported whenever it matches."""
+        tokens = tokenize(phrase)
+        if not tokens:
+            return
+        state = 0
+        for token in tokens:
+            nxt = self._goto[state].get(token)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][token] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._own.append([])
+            state = nxt
+        self._own[state].append((len(tokens), payload))
+        self._compiled = False
+
+    def compile(self) -> "PhraseMatcher":
+        """Build failure links; called automatically before the first match.
+
+        Outputs are rebuilt from each state's own phrases, so compiling again
+        (e.g. after add) never reports a match twice.
+        """
+        self._out = [list(own) for own in self._own]
+        queue = deque(self._goto[0].values())
+        for state in queue:
+            self._fail[state] = 0
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(token, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] += self._out[self._fail[nxt]]
+                queue.append(nxt)
+        self._compiled = True
+        return self
+
+    def feed(self, tokens: Iterable[str], state: int = 0) -> Tuple[int, List[Tuple[Any, int]]]:
+        """Advance the automaton over tokens.
+
+        Returns the new state and a list of (payload, end_index) pairs, where
+        end_index is the position after the last token of the match.
+        """
+        if not self._compiled:
+            self.compile()
+        goto, fail, out = self._goto, self._fail, self._out
+        matches: List[Tuple[Any, int]] = []
+        for i, token in enumerate(tokens):
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            for _, payload in out[state]:
+                matches.append((payload, i + 1))
+        return state, matches
+
+    def find(self, text: str) -> List[Any]:
+        """Return the payload of every phrase occurring in text."""
+        return [payload for payload, _ in self.feed(tokenize(text))[1]]
+
+    def __len__(self) -> int:
+        return len(self._goto)
@@ -0,0 +1,271 @@
+"""In-process metrics registry with a Prometheus text endpoint."""
+import logging
+import threading
+from bisect import bisect_left
+from typing import Dict, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value: str) -> str:
+    """Escape a label value for the text exposition format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Render a {name="value",...} label set."""
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    """Render a sample value the way Prometheus expects."""
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Shared bookkeeping for labelled metrics.
+
+    Updates take a per-metric lock for a few dict operations; rendering copies
+    the values under that lock and formats them afterwards, so a scrape never
+    holds a lock while building its response.
+    """
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        """Turn keyword labels into a tuple ordered like labelnames."""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def render(self) -> List[str]:
+        """Exposition lines for this metric, starting with HELP and TYPE."""
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        """Add amount to the series identified by labels."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Current value of one series."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_number(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        """Subtract amount from the series identified by labels."""
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str):
+        """Replace the value of the series identified by labels."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram in the Prometheus sense."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        """Record one observation."""
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # per-bucket counts, then the +Inf bucket, sum and count
+                series = self._series[key] = [0.0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        lines: List[str] = []
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-2]):
+                cumulative += count
+                le = f'le="{_format_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_number(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_number(series[-2])}")
+            lines.append(f"{self.name}_count{labels} {_format_number(series[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric; registering the same name twice returns the existing one."""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+MODEL_REQUESTS = REGISTRY.counter(
+    "phoenix_model_requests_total", "Model calls made by safe_generate.", ("model", "outcome"))
+MODEL_IN_FLIGHT = REGISTRY.gauge(
+    "phoenix_model_in_flight", "Model calls currently in progress.", ("model",))
+MODEL_LATENCY = REGISTRY.histogram(
+    "phoenix_model_latency_seconds", "Total duration of model calls.", ("model",))
+MODEL_TTFT = REGISTRY.histogram(
+    "phoenix_model_ttft_seconds", "Time until the first streamed chunk of a model call.", ("model",))
+MODEL_RETRIES = REGISTRY.counter(
+    "phoenix_model_retries_total", "Model call attempts retried after a retryable error.", ("model",))
+MODEL_HEDGES = REGISTRY.counter(
+    "phoenix_model_hedges_total", "Hedged model requests: sent, and which request answered first.",
+    ("model", "result"))
+MODEL_CIRCUIT_OPEN = REGISTRY.gauge(
+    "phoenix_model_circuit_open", "1 while the model's circuit breaker is rejecting calls.", ("model",))
+SCHEDULER_QUEUE_DEPTH = REGISTRY.gauge(
+    "phoenix_scheduler_queue_depth", "Model calls waiting for quota, by priority class.", ("priority",))
+SCHEDULER_WAIT = REGISTRY.histogram(
+    "phoenix_scheduler_wait_seconds", "Time model calls waited for quota.", ("priority",),
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0))
+SCHEDULER_GRANTED = REGISTRY.counter(
+    "phoenix_scheduler_calls_total", "Model calls leaving the scheduler queue, by outcome.",
+    ("priority", "outcome"))
+AGENT_REQUESTS = REGISTRY.counter(
+    "phoenix_agent_requests_total", "Requests handled by each agent.", ("agent",))
+AGENT_IN_FLIGHT = REGISTRY.gauge(
+    "phoenix_agent_in_flight", "Requests currently being handled by each agent.", ("agent",))
+AGENT_RESPONSES = REGISTRY.counter(
+    "phoenix_agent_responses_total", "Agent responses recorded per query, by status.", ("agent", "status"))
+COALESCED_REQUESTS = REGISTRY.counter(
+    "phoenix_coalesced_requests_total", "Agent requests served by joining an identical in-flight model call.",
+    ("agent", "mode"))
+CACHE_LOOKUPS = REGISTRY.counter(
+    "phoenix_cache_lookups_total", "Cache lookups by cache and result.", ("cache", "result"))
+QUERIES = REGISTRY.counter(
+    "phoenix_queries_total", "Queries processed by the orchestrator.", ("mode",))
+QUERIES_IN_FLIGHT = REGISTRY.gauge(
+    "phoenix_queries_in_flight", "Queries currently being processed.")
+QUERY_LATENCY = REGISTRY.histogram(
+    "phoenix_query_latency_seconds", "End-to-end query latency.")
+JOBS = REGISTRY.counter(
+    "phoenix_jobs_total", "Background query jobs submitted, and how they ended.", ("outcome",))
+
+
+def _handler_class(registry: MetricsRegistry):
+    """Build the request handler serving registry at /metrics.
+
+    http.server (and the ssl/email modules it pulls in) is only imported
+    once an endpoint is actually started.
+    """
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logging.debug("metrics endpoint: " + format, *args)
+
+    return MetricsHandler
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int, addr: str = "127.0.0.1",
+                         registry: MetricsRegistry = REGISTRY):
+    """Serve metrics from a daemon thread; repeated calls reuse the running server.
+
+    Returns the ThreadingHTTPServer, or None if the port could not be bound.
+    """
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+        from http.server import ThreadingHTTPServer
+        try:
+            _server = ThreadingHTTPServer((addr, port), _handler_class(registry))
+        except OSError as e:
+            logging.error("Metrics endpoint not started on %s:%d: %s", addr, port, e)
+            return None
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="phoenix-metrics", daemon=True).start()
+        logging.info("Metrics endpoint listening on http://%s:%d/metrics", addr, port)
+        return _server
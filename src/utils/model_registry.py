@@ -0,0 +1,117 @@
+"""Process-wide registry of shared model handles."""
+import json
+import time
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from src.utils.backends import ModelBackend, GeminiBackend, SimulatedBackend
+from src.utils.helpers import (
+    MODEL_ID, GEN_CONFIG, WARMUP_INTERVAL, MODEL_BACKEND,
+    SIM_TTFT, SIM_CHUNK_DELAY, SIM_OUTPUT_WORDS, SIM_ERROR_RATE, SIM_SEED
+)
+
+# Creates a backend for (model ID, generation config)
+BackendFactory = Callable[[str, Dict[str, Any]], ModelBackend]
+
+
+def _simulated_backend(model_id: str, gen_config: Dict[str, Any]) -> ModelBackend:
+    return SimulatedBackend(f"simulated/{model_id.rsplit('/', 1)[-1]}", ttft=SIM_TTFT,
+                            chunk_delay=SIM_CHUNK_DELAY, output_words=SIM_OUTPUT_WORDS,
+                            error_rate=SIM_ERROR_RATE, seed=SIM_SEED)
+
+
+# Backends selectable with PHOENIX_BACKEND
+BACKENDS: Dict[str, BackendFactory] = {
+    "gemini": GeminiBackend.create,
+    "simulated": _simulated_backend
+}
+
+
+class ModelRegistry:
+    """Hand out one model backend per (model ID, generation config).
+
+    A GenerativeModel only holds its settings and a lazily created client;
+    the SDK's transport is shared and safe to use from several threads, so
+    every agent using the same model and config can share one handle.
+    """
+
+    def __init__(self, backend: str = MODEL_BACKEND):
+        self._models: Dict[Tuple[str, str], ModelBackend] = {}
+        self._lock = threading.Lock()
+        self._keepalive: Optional[threading.Thread] = None
+        self.set_backend(backend)
+
+    def set_backend(self, backend):
+        """Use another backend (a BACKENDS name or a factory) for new handles.
+
+        Handles already given out keep their backend, so switch before
+        building agents.
+        """
+        if isinstance(backend, str):
+            if backend not in BACKENDS:
+                raise ValueError(f"Unknown model backend '{backend}', expected one of {sorted(BACKENDS)}")
+            backend = BACKENDS[backend]
+        with self._lock:
+            self._factory: BackendFactory = backend
+            self._models.clear()
+
+    def get(self, model_id: str = MODEL_ID, gen_config: Optional[Dict[str, Any]] = None) -> ModelBackend:
+        """Return the shared model handle, creating it on first use."""
+        config = GEN_CONFIG if gen_config is None else gen_config
+        key = (model_id, json.dumps(config, sort_keys=True))
+        with self._lock:
+            model = self._models.get(key)
+            if model is None:
+                model = self._models[key] = self._factory(model_id, config)
+                logging.info("Model handle created | model=%s | handles=%d", model.model_name, len(self._models))
+            return model
+
+    def warm_up(self, model_id: str = MODEL_ID, interval: float = WARMUP_INTERVAL, block: bool = False):
+        """Open the model transport ahead of the first real request.
+
+        Sends a token-count request, which needs the same connection as
+        generation but costs no generation quota. With interval > 0 the
+        request is repeated that often so the connection is not closed as
+        idle. Unless block is True this runs on a daemon thread.
+        """
+        model = self.get(model_id)
+        if block:
+            self._ping(model)
+        with self._lock:
+            if self._keepalive is not None or (block and interval <= 0):
+                return
+            self._keepalive = threading.Thread(target=self._keep_alive, args=(model, interval, not block),
+                                               name="phoenix-warmup", daemon=True)
+            self._keepalive.start()
+
+    def _keep_alive(self, model, interval: float, ping_first: bool):
+        if ping_first:
+            self._ping(model)
+        while interval > 0:
+            time.sleep(interval)
+            self._ping(model)
+
+    @staticmethod
+    def _ping(model) -> bool:
+        start = time.time()
+        try:
+            model.count_tokens("ping")
+        except Exception as e:
+            logging.warning("Model warm-up failed | model=%s | err=%s", getattr(model, "model_name", ""), e)
+            return False
+        logging.info("Model warm-up OK | model=%s | time=%.2fs", getattr(model, "model_name", ""), time.time() - start)
+        return True
+
+
+_default_registry: Optional[ModelRegistry] = None
+_default_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Get the process-wide model registry."""
+    global _default_registry
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = ModelRegistry()
+        return _default_registry
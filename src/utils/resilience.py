@@ -0,0 +1,388 @@
+"""Retries, hedged requests and circuit breaking for model calls."""
+import time
+import random
+import asyncio
+import logging
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from src.utils.histogram import LatencyHistogram
+from src.utils.metrics import MODEL_RETRIES, MODEL_HEDGES, MODEL_CIRCUIT_OPEN
+
+# Exception class names (anywhere in the MRO) worth another attempt: rate
+# limits, overload and transient network failures. Matching by name keeps
+# this module free of SDK imports.
+RETRYABLE_ERRORS = frozenset({
+    "ResourceExhausted", "TooManyRequests", "ServiceUnavailable", "InternalServerError",
+    "DeadlineExceeded", "GatewayTimeout", "BadGateway", "Aborted", "Unknown",
+    "TimeoutError", "ConnectionError", "RemoteDisconnected", "ReadTimeout", "ConnectTimeout"
+})
+
+RETRYABLE_STATUS_CODES = frozenset({408, 429, 500, 502, 503, 504})
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Whether a failed call may succeed if simply tried again."""
+    if isinstance(exc, LocalRejection):
+        return False
+    if any(cls.__name__ in RETRYABLE_ERRORS for cls in type(exc).__mro__):
+        return True
+    return getattr(exc, "code", None) in RETRYABLE_STATUS_CODES
+
+
+def is_client_error(exc: BaseException) -> bool:
+    """Whether a failure was caused by the request itself (e.g. an invalid prompt)."""
+    code = getattr(exc, "code", None)
+    return isinstance(code, int) and 400 <= code < 500 and code not in RETRYABLE_STATUS_CODES
+
+
+class LocalRejection(Exception):
+    """A call refused before reaching the model; never retried or counted by breakers."""
+
+
+class CircuitOpenError(LocalRejection):
+    """Raised instead of calling a model whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` failures in a row the circuit opens and calls
+    are rejected for ``reset_timeout`` seconds. Then a single probe call is let
+    through: success closes the circuit, failure opens it again. A probe that
+    ends any other way (rejected locally, cancelled, abandoned) must give its
+    slot back with release_probe, so the next call can probe instead.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now."""
+        return self.acquire() is not None
+
+    def acquire(self) -> Optional[int]:
+        """Admit a call: None if rejected, else 0, or a probe number when the call is the half-open probe."""
+        if self.failure_threshold <= 0:
+            return 0
+        with self._lock:
+            if self.opened_at is None:
+                return 0
+            if self._probing or time.monotonic() - self.opened_at < self.reset_timeout:
+                return None
+            self._probing = True
+            self._probes += 1
+            return self._probes
+
+    def release_probe(self, probe: int):
+        """Free the probe slot if probe still holds it, leaving the circuit's state as it is."""
+        with self._lock:
+            if probe and probe == self._probes:
+                self._probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> bool:
+        """Count a failure; returns True if this opened the circuit."""
+        with self._lock:
+            self.failures += 1
+            reopened = self._probing
+            self._probing = False
+            if reopened or (self.opened_at is None and 0 < self.failure_threshold <= self.failures):
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+
+class ResiliencePolicy:
+    """Per-model retry, hedging and circuit-breaker policy for model calls.
+
+    - Retryable errors are retried up to ``max_retries`` times, sleeping a
+      random delay of up to ``base_delay * 2**attempt`` (capped at
+      ``max_delay``) in between ("full jitter" backoff).
+    - Once a model has ``hedge_min_samples`` successful calls, a call still
+      running at the ``hedge_percentile`` latency of that model gets a
+      duplicate request; whichever finishes first wins and the other is
+      cancelled. With an ``admit`` hook (quota), only the time after
+      admission counts, and a duplicate is only sent if quota is free at
+      once.
+    - Each model has a CircuitBreaker; while it is open calls fail at once
+      with CircuitOpenError instead of waiting on a failing backend.
+    """
+
+    def __init__(self, max_retries: int = 2, base_delay: float = 0.5, max_delay: float = 8.0,
+                 hedge_percentile: float = 0.95, hedge_min_samples: int = 20,
+                 hedge_min_delay: float = 1.0, breaker_failures: int = 5,
+                 breaker_reset: float = 30.0, hedge_workers: int = 32):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self.hedge_workers = hedge_workers
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._latency: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        """The circuit breaker of a model."""
+        with self._lock:
+            breaker = self._breakers.get(model)
+            if breaker is None:
+                breaker = self._breakers[model] = CircuitBreaker(self.breaker_failures, self.breaker_reset)
+            return breaker
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds after which a call to model is hedged, or None when hedging is off."""
+        if self.hedge_percentile <= 0:
+            return None
+        with self._lock:
+            histogram = self._latency.get(model)
+            if histogram is None or histogram.count < self.hedge_min_samples:
+                return None
+            return max(self.hedge_min_delay, histogram.percentile(self.hedge_percentile))
+
+    def before_attempt(self, model: str) -> int:
+        """Raise CircuitOpenError if model should not be called right now.
+
+        Returns the breaker's probe number for the attempt (0 if it is not a
+        probe); pass it to after_attempt however the attempt ends.
+        """
+        probe = self.breaker(model).acquire()
+        if probe is None:
+            raise CircuitOpenError(f"circuit open for {model}; failing fast")
+        return probe
+
+    def reserve_hedge_workers(self, calls: int):
+        """Make room in the hedging pool for calls concurrent calls (a primary and a hedge each)."""
+        with self._lock:
+            if 2 * calls <= self.hedge_workers:
+                return
+            self.hedge_workers = 2 * calls
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def after_attempt(self, model: str, probe: int):
+        """Release a probe slot that on_success/on_failure did not settle."""
+        if probe:
+            self.breaker(model).release_probe(probe)
+
+    def on_success(self, model: str, latency: float):
+        """Record a successful attempt and its latency."""
+        breaker = self.breaker(model)
+        was_open = breaker.is_open
+        breaker.record_success()
+        if was_open:
+            MODEL_CIRCUIT_OPEN.set(0, model=model)
+            logging.info("Circuit closed | model=%s", model)
+        with self._lock:
+            histogram = self._latency.get(model)
+            if histogram is None:
+                histogram = self._latency[model] = LatencyHistogram()
+            histogram.observe(latency)
+
+    def on_failure(self, model: str, exc: BaseException, attempt: int,
+                   can_retry: bool = True) -> Optional[float]:
+        """Record a failed attempt; returns the backoff delay if it should be retried."""
+        if isinstance(exc, LocalRejection):
+            return None
+        # a bad request says nothing about the backend's health
+        if not is_client_error(exc) and self.breaker(model).record_failure():
+            MODEL_CIRCUIT_OPEN.set(1, model=model)
+            logging.error("Circuit opened | model=%s | reset=%.0fs", model, self.breaker_reset)
+        if not can_retry or attempt >= self.max_retries or not is_retryable(exc):
+            return None
+        MODEL_RETRIES.inc(model=model)
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        logging.warning("Model call failed, retrying | model=%s | attempt=%d | delay=%.2fs | err=%s",
+                        model, attempt + 1, delay, exc)
+        return delay
+
+    def call(self, model: str, fn: Callable[..., Any],
+             admit: Optional[Callable[[bool], Any]] = None) -> Any:
+        """Run fn with retries, hedging and circuit breaking; re-raises the final error.
+
+        admit, if given, reserves quota for one request: admit(True) waits
+        for it and admit(False) returns None when there is none right now.
+        Its result is passed to fn, which must give the quota back.
+        """
+        attempt = 0
+        while True:
+            probe = self.before_attempt(model)
+            try:
+                if admit is None:
+                    primary, make_hedge = fn, None
+                else:
+                    ticket = admit(True)
+                    primary, make_hedge = (lambda: fn(ticket)), self._hedge_factory(fn, admit)
+                start = time.monotonic()
+                result = self._hedged(model, primary, make_hedge)
+            except Exception as e:
+                delay = self.on_failure(model, e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                time.sleep(delay)
+                continue
+            else:
+                self.on_success(model, time.monotonic() - start)
+                return result
+            finally:
+                self.after_attempt(model, probe)
+
+    async def acall(self, model: str, fn: Callable[..., Awaitable[Any]],
+                    admit: Optional[Callable[[bool], Awaitable[Any]]] = None) -> Any:
+        """Async counterpart of call; fn creates a new coroutine per attempt and admit is async."""
+        attempt = 0
+        while True:
+            probe = self.before_attempt(model)
+            try:
+                if admit is None:
+                    primary, make_hedge = fn, None
+                else:
+                    ticket = await admit(True)
+                    primary, make_hedge = (lambda: fn(ticket)), self._ahedge_factory(fn, admit)
+                start = time.monotonic()
+                result = await self._ahedged(model, primary, make_hedge)
+            except Exception as e:
+                delay = self.on_failure(model, e, attempt)
+                if delay is None:
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            else:
+                self.on_success(model, time.monotonic() - start)
+                return result
+            finally:
+                self.after_attempt(model, probe)
+
+    @staticmethod
+    def _hedge_factory(fn, admit):
+        """Build the duplicate call of a hedge on its own quota, or None while there is none free."""
+        def make_hedge():
+            extra = admit(False)
+            return None if extra is None else (lambda: fn(extra))
+        return make_hedge
+
+    @staticmethod
+    def _ahedge_factory(fn, admit):
+        """Async counterpart of _hedge_factory."""
+        async def make_hedge():
+            extra = await admit(False)
+            return None if extra is None else (lambda: fn(extra))
+        return make_hedge
+
+    def _hedged(self, model: str, fn: Callable[[], Any],
+                make_hedge: Optional[Callable[[], Optional[Callable[[], Any]]]] = None) -> Any:
+        """Run fn, starting a duplicate if it is slower than the hedge delay.
+
+        Both calls run under their own cancel token (a child of the
+        caller's), and the slower one is cancelled once the other finishes,
+        so it stops at its next cancellation point.
+        """
+        delay = self.hedge_delay(model)
+        if delay is None:
+            return fn()
+        # cancellation builds on LocalRejection from this module
+        from src.utils.cancellation import ChildCancelToken, cancel_scope, current_token
+
+        def run(token, call):
+            with cancel_scope(token):
+                return call()
+
+        executor = self._get_executor()
+        tokens: Dict[Any, Any] = {}
+
+        def start(call):
+            token = ChildCancelToken(current_token())
+            future = executor.submit(contextvars.copy_context().run, run, token, call)
+            tokens[future] = token
+            return future
+
+        primary = start(fn)
+        pending = {primary}
+        try:
+            done, _ = wait(pending, timeout=delay)
+            if done:
+                return primary.result()
+            hedge_fn = fn if make_hedge is None else make_hedge()
+            if hedge_fn is None:
+                MODEL_HEDGES.inc(model=model, result="no_quota")
+                return primary.result()
+            MODEL_HEDGES.inc(model=model, result="sent")
+            hedge = start(hedge_fn)
+            pending = {primary, hedge}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        MODEL_HEDGES.inc(model=model, result="hedge_won" if future is hedge else "primary_won")
+                        return future.result()
+                    error = future.exception()
+            raise error
+        finally:
+            for future in pending:
+                if not future.done():
+                    tokens[future].cancel()
+
+    async def _ahedged(self, model: str, fn: Callable[[], Awaitable[Any]],
+                       make_hedge: Optional[Callable[[], Awaitable[Any]]] = None) -> Any:
+        """Async counterpart of _hedged; the losing request is cancelled."""
+        delay = self.hedge_delay(model)
+        if delay is None:
+            return await fn()
+        primary = asyncio.ensure_future(fn())
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done:
+                return primary.result()
+            hedge_fn = fn if make_hedge is None else await make_hedge()
+            if hedge_fn is None:
+                MODEL_HEDGES.inc(model=model, result="no_quota")
+                return await primary
+            MODEL_HEDGES.inc(model=model, result="sent")
+            hedge = asyncio.ensure_future(hedge_fn())
+            pending = {primary, hedge}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        MODEL_HEDGES.inc(model=model, result="hedge_won" if task is hedge else "primary_won")
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.hedge_workers,
+                                                    thread_name_prefix="phoenix-hedge")
+            return self._executor
@@ -0,0 +1,296 @@
+"""Quota-aware scheduling of model calls across priorities and sessions."""
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, Optional
+
+from src.utils.metrics import SCHEDULER_QUEUE_DEPTH, SCHEDULER_WAIT, SCHEDULER_GRANTED
+from src.utils.cancellation import POLL_INTERVAL, Cancelled, current_token
+from src.utils.resilience import LocalRejection
+
+# Highest priority first
+PRIORITIES = ("interactive", "synthesis", "background")
+DEFAULT_PRIORITY = "interactive"
+
+# Who a model call is made for: {"session": ..., "priority": ...}. Set by the
+# orchestrator, read by the scheduler; copied into worker threads and tasks
+# together with the rest of the context.
+request_context: contextvars.ContextVar = contextvars.ContextVar("phoenix_request_context", default=None)
+
+
+@contextmanager
+def request_scope(session: Optional[str] = None, priority: Optional[str] = None):
+    """Attribute model calls made inside the block to a session and priority class."""
+    current = request_context.get() or {}
+    token = request_context.set({
+        "session": session if session is not None else current.get("session", ""),
+        "priority": priority or current.get("priority", DEFAULT_PRIORITY)
+    })
+    try:
+        yield
+    finally:
+        request_context.reset(token)
+
+
+def scoped_iter(iterator: Iterator, session: Optional[str] = None,
+                priority: Optional[str] = None) -> Iterator:
+    """Advance iterator inside request_scope without holding the scope across yields."""
+    while True:
+        with request_scope(session, priority):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
+
+
+class SchedulerTimeout(LocalRejection):
+    """Raised when a call waited longer than the scheduler's max_wait for quota."""
+
+
+class TokenBucket:
+    """Refilling allowance of units (requests or tokens)."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.level = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount can be taken (0 if available now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount: float):
+        """Give back (positive) or charge extra (negative) units after the fact."""
+        self.level = min(self.capacity, self.level + amount)
+
+
+class _Ticket:
+    """A call waiting for quota."""
+
+    __slots__ = ("priority", "session", "tokens", "enqueued", "granted", "future", "loop")
+
+    def __init__(self, priority: str, session: str, tokens: int):
+        self.priority = priority
+        self.session = session
+        self.tokens = tokens
+        self.enqueued = time.monotonic()
+        self.granted = False
+        self.future: Optional[asyncio.Future] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+class RequestScheduler:
+    """Admit model calls within requests-per-minute and tokens-per-minute quotas.
+
+    Calls wait in one queue per priority class and are admitted strictly by
+    priority. Within a class, sessions take turns (round robin), so a session
+    firing many calls at once cannot starve the others. Each limit is a token
+    bucket that allows a burst of ``burst`` times the limit and refills the
+    rest over the minute, so no 60-second window exceeds the limit. A limit of
+    0 disables that bucket.
+    """
+
+    def __init__(self, rpm: float, tpm: float, burst: float = 0.1, max_wait: float = 60.0):
+        self.max_wait = max_wait
+        self._buckets = [
+            TokenBucket(limit * (1 - burst) / 60.0, max(1.0, limit * burst)) if limit > 0 else None
+            for limit in (rpm, tpm)
+        ]
+        self._queues: Dict[str, "OrderedDict[str, Deque[_Ticket]]"] = {p: OrderedDict() for p in PRIORITIES}
+        self._depth: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        self._cond = threading.Condition()
+
+    @property
+    def enabled(self) -> bool:
+        return any(self._buckets)
+
+    def acquire(self, tokens: int) -> float:
+        """Block until a call estimated at tokens may run; returns the time waited.
+
+        A cancelled caller (see cancellation.cancel_scope) leaves the queue.
+        """
+        if not self.enabled:
+            return 0.0
+        ticket = self._ticket(tokens)
+        cancel = current_token()
+        with self._cond:
+            self._enqueue(ticket)
+            while True:
+                delay = self._dispatch()
+                if ticket.granted:
+                    break
+                remaining = self.max_wait - (time.monotonic() - ticket.enqueued)
+                if remaining <= 0:
+                    self._abandon(ticket, "timeout")
+                    raise SchedulerTimeout(f"no model quota within {self.max_wait:.0f}s")
+                if cancel is not None and cancel.cancelled:
+                    self._abandon(ticket, "cancelled")
+                    raise Cancelled("cancelled while waiting for model quota")
+                wait = min(remaining, delay if delay is not None else remaining)
+                self._cond.wait(min(wait, POLL_INTERVAL) if cancel is not None else wait)
+        return self._granted(ticket)
+
+    async def aacquire(self, tokens: int) -> float:
+        """Async counterpart of acquire; waits without blocking the event loop."""
+        if not self.enabled:
+            return 0.0
+        ticket = self._ticket(tokens)
+        cancel = current_token()
+        ticket.loop = asyncio.get_running_loop()
+        ticket.future = ticket.loop.create_future()
+        with self._cond:
+            self._enqueue(ticket)
+        while True:
+            with self._cond:
+                delay = self._dispatch()
+                if ticket.granted:
+                    break
+                remaining = self.max_wait - (time.monotonic() - ticket.enqueued)
+                if remaining <= 0:
+                    self._abandon(ticket, "timeout")
+                    raise SchedulerTimeout(f"no model quota within {self.max_wait:.0f}s")
+                if cancel is not None and cancel.cancelled:
+                    self._abandon(ticket, "cancelled")
+                    raise Cancelled("cancelled while waiting for model quota")
+            wait = min(remaining, delay if delay is not None else remaining)
+            try:
+                await asyncio.wait_for(asyncio.shield(ticket.future),
+                                       min(wait, POLL_INTERVAL) if cancel is not None else wait)
+            except asyncio.TimeoutError:
+                pass
+            except asyncio.CancelledError:
+                with self._cond:
+                    if not ticket.granted:
+                        self._abandon(ticket, "cancelled")
+                raise
+        return self._granted(ticket)
+
+    def try_acquire(self, tokens: int) -> bool:
+        """Admit a call only if quota is free right now and nobody is waiting for it."""
+        if not self.enabled:
+            return True
+        with self._cond:
+            if self._head() is not None:
+                return False
+            now = time.monotonic()
+            amounts = (1, tokens)
+            if any(b.wait_time(amount, now) > 0 for b, amount in zip(self._buckets, amounts) if b):
+                return False
+            for bucket, amount in zip(self._buckets, amounts):
+                if bucket:
+                    bucket.take(amount)
+        SCHEDULER_GRANTED.inc(priority=self._ticket(tokens).priority, outcome="granted")
+        return True
+
+    def settle(self, estimated: int, actual: int):
+        """Correct the token bucket once a call's real token usage is known."""
+        bucket = self._buckets[1]
+        if bucket is None or estimated == actual:
+            return
+        with self._cond:
+            bucket.adjust(estimated - actual)
+            self._dispatch()
+
+    def queue_depth(self) -> Dict[str, int]:
+        """Calls waiting per priority class."""
+        with self._cond:
+            return dict(self._depth)
+
+    def _ticket(self, tokens: int) -> _Ticket:
+        ctx = request_context.get() or {}
+        priority = ctx.get("priority", DEFAULT_PRIORITY)
+        if priority not in self._queues:
+            priority = DEFAULT_PRIORITY
+        return _Ticket(priority, ctx.get("session", ""), tokens)
+
+    def _enqueue(self, ticket: _Ticket):
+        """Queue a ticket behind its session's earlier calls (lock held)."""
+        sessions = self._queues[ticket.priority]
+        queue = sessions.get(ticket.session)
+        if queue is None:
+            queue = sessions[ticket.session] = deque()
+        queue.append(ticket)
+        self._depth[ticket.priority] += 1
+        SCHEDULER_QUEUE_DEPTH.inc(priority=ticket.priority)
+
+    def _abandon(self, ticket: _Ticket, outcome: str):
+        """Remove a ticket that gave up waiting (lock held)."""
+        sessions = self._queues[ticket.priority]
+        queue = sessions.get(ticket.session)
+        if queue is not None and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del sessions[ticket.session]
+            self._depth[ticket.priority] -= 1
+            SCHEDULER_QUEUE_DEPTH.dec(priority=ticket.priority)
+            SCHEDULER_GRANTED.inc(priority=ticket.priority, outcome=outcome)
+            logging.warning("Scheduler %s | priority=%s | session=%s", outcome, ticket.priority, ticket.session)
+
+    def _dispatch(self) -> Optional[float]:
+        """Grant queued tickets while quota allows (lock held).
+
+        Returns the seconds until the next waiting ticket could be granted, or
+        None when nothing is waiting.
+        """
+        while True:
+            head = self._head()
+            if head is None:
+                return None
+            priority, session, ticket = head
+            now = time.monotonic()
+            wait = max(b.wait_time(amount, now) for b, amount in zip(self._buckets, (1, ticket.tokens)) if b)
+            if wait > 0:
+                return wait
+            for bucket, amount in zip(self._buckets, (1, ticket.tokens)):
+                if bucket:
+                    bucket.take(amount)
+            sessions = self._queues[priority]
+            queue = sessions.pop(session)
+            queue.popleft()
+            if queue:
+                sessions[session] = queue  # back of the round robin
+            self._depth[priority] -= 1
+            SCHEDULER_QUEUE_DEPTH.dec(priority=priority)
+            ticket.granted = True
+            if ticket.future is not None:
+                ticket.loop.call_soon_threadsafe(_resolve, ticket.future)
+            self._cond.notify_all()
+
+    def _head(self):
+        """The next ticket to admit: highest priority, then the session whose turn it is."""
+        for priority in PRIORITIES:
+            sessions = self._queues[priority]
+            if sessions:
+                session, queue = next(iter(sessions.items()))
+                return priority, session, queue[0]
+        return None
+
+    @staticmethod
+    def _granted(ticket: _Ticket) -> float:
+        waited = time.monotonic() - ticket.enqueued
+        SCHEDULER_WAIT.observe(waited, priority=ticket.priority)
+        SCHEDULER_GRANTED.inc(priority=ticket.priority, outcome="granted")
+        if waited > 1.0:
+            logging.info("Scheduler wait | priority=%s | session=%s | wait=%.2fs",
+                         ticket.priority, ticket.session, waited)
+        return waited
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
@@ -0,0 +1,199 @@
+"""Near-duplicate query cache using MinHash signatures and an LSH index."""
+import re
+import time
+import hashlib
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, Any, FrozenSet, List, Optional, Sequence, Tuple
+
+from src.utils.helpers import (
+    SIMILARITY_CACHE_ENABLED, SIMILARITY_THRESHOLD, SIMILARITY_MAX_ENTRIES, SIMILARITY_TTL
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9_+#]+")
+
+# Words that carry phrasing rather than topic; routing intent is covered by the agent set.
+# "what" and "explain"-style words all ask for a definition, so they are dropped too.
+STOPWORDS = frozenset("""
+a an the and or of in on to for with about from by at as is are was were be been being
+it its this that these those i me my we you your do does did doing can could would should
+will shall may might must please what whats
+explain describe tell show give want need know understand mean meaning define definition
+s t don doesn isn aren works work use using used some any example examples
+""".split())
+
+# Question words that change what is asked about a topic ("why X" is not "what is X");
+# they are kept as tokens and a query only matches entries asking the same way.
+QUESTION_WORDS = frozenset("how why when where which who whom".split())
+
+
+def query_shingles(text: str) -> FrozenSet[str]:
+    """Normalize a query into a set of topic tokens.
+
+    Lowercases, drops stopwords and strips simple plural endings so that
+    "what's a python decorator?" and "explain decorators in python" agree,
+    while "why" and the other QUESTION_WORDS are kept.
+    """
+    tokens = set()
+    for token in _TOKEN_RE.findall(text.lower().replace("'", "")):
+        if token in STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.add(token)
+    return frozenset(tokens)
+
+
+@lru_cache(maxsize=65536)
+def _token_hashes(token: str, seed: int, num_perm: int) -> array:
+    """num_perm independent 64-bit hashes of a token, stable across processes (unlike hash())."""
+    return array("Q", hashlib.shake_128(f"{seed}:{token}".encode("utf-8")).digest(8 * num_perm))
+
+
+class SimilarityCache:
+    """Reuse final responses for queries that are near-duplicates of earlier ones.
+
+    Each query is reduced to a token set and a MinHash signature. Signatures
+    are split into bands that index an LSH table; a lookup only compares the
+    exact Jaccard similarity against the few entries sharing a band, so its
+    cost does not depend on how many entries are cached. Band keys include
+    the routed agent set, the caller's scope (the learner's skill level) and
+    the query's question words, so a hit always answers with the same agents
+    for the same kind of learner and question. Expired entries met during a
+    lookup are dropped.
+    """
+
+    def __init__(self, threshold: float = SIMILARITY_THRESHOLD, max_entries: int = SIMILARITY_MAX_ENTRIES,
+                 ttl: float = SIMILARITY_TTL, num_perm: int = 64, bands: int = 16,
+                 max_candidates: int = 64, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_candidates = max_candidates
+        self.num_perm = num_perm
+        self.seed = seed
+        self._entries: "OrderedDict[int, Tuple[float, FrozenSet[str], Tuple, Dict[str, Any]]]" = OrderedDict()
+        # plain dicts keep insertion order, which is all a bucket needs
+        self._buckets: Dict[Tuple, Dict[int, None]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "sets": 0, "evictions": 0}
+
+    def signature(self, shingles: FrozenSet[str]) -> List[int]:
+        """Compute the MinHash signature of a token set."""
+        hashes = [_token_hashes(s, self.seed, self.num_perm) for s in shingles]
+        if len(hashes) <= 1:
+            return list(hashes[0]) if hashes else [0] * self.num_perm
+        return list(map(min, *hashes))
+
+    def _band_keys(self, agents: Tuple[str, ...], scope: str, shingles: FrozenSet[str]) -> List[Tuple]:
+        """Split a query's signature into LSH band keys scoped to its agents, scope and question words."""
+        sig = self.signature(shingles)
+        prefix = (agents, scope, tuple(sorted(shingles & QUESTION_WORDS)))
+        r = self.rows
+        return [(prefix, i, tuple(sig[i * r:(i + 1) * r])) for i in range(self.bands)]
+
+    def lookup(self, query: str, agents: Sequence[str], scope: str = "") -> Optional[Dict[str, Any]]:
+        """Return a cached response for a similar query routed to the same agents within scope."""
+        shingles = query_shingles(query)
+        if not shingles:
+            return None
+        keys = self._band_keys(tuple(agents), scope, shingles)
+        now = time.time()
+
+        with self._lock:
+            best_id, best_score = None, 0.0
+            seen = set()
+            expired = set()
+            for key in keys:
+                bucket = self._buckets.get(key)
+                if not bucket:
+                    continue
+                for entry_id in reversed(bucket):
+                    if len(seen) >= self.max_candidates:
+                        break
+                    if entry_id in seen or entry_id in expired:
+                        continue
+                    expires_at, other, _, _ = self._entries[entry_id]
+                    if expires_at <= now:
+                        expired.add(entry_id)  # pruned below; takes no candidate slot
+                        continue
+                    seen.add(entry_id)
+                    score = len(shingles & other) / len(shingles | other)
+                    if score > best_score:
+                        best_id, best_score = entry_id, score
+            for entry_id in expired:
+                self._evict(entry_id)
+
+            if best_id is None or best_score < self.threshold:
+                self.counters["misses"] += 1
+                return None
+
+            self._entries.move_to_end(best_id)
+            self.counters["hits"] += 1
+            return {**self._entries[best_id][3], "similarity": best_score}
+
+    def store(self, query: str, agents: Sequence[str], value: Dict[str, Any], scope: str = ""):
+        """Remember the response for a query, its routed agents and scope."""
+        shingles = query_shingles(query)
+        if not shingles:
+            return
+        keys = self._band_keys(tuple(agents), scope, shingles)
+
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (time.time() + self.ttl, shingles, tuple(keys), value)
+            for key in keys:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    bucket = self._buckets[key] = {}
+                bucket[entry_id] = None
+            self.counters["sets"] += 1
+            while len(self._entries) > self.max_entries:
+                self._evict(next(iter(self._entries)))
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and index size."""
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "entries": len(self._entries),
+                "buckets": len(self._buckets),
+                "hit_rate": self.counters["hits"] / lookups if lookups else 0.0
+            }
+
+    def _evict(self, entry_id: int):
+        """Remove an entry and its band memberships."""
+        _, _, keys, _ = self._entries.pop(entry_id)
+        for key in keys:
+            bucket = self._buckets.get(key)
+            if bucket is not None:
+                bucket.pop(entry_id, None)
+                if not bucket:
+                    del self._buckets[key]
+        self.counters["evictions"] += 1
+
+
+_default_cache: Optional[SimilarityCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_similarity_cache() -> Optional[SimilarityCache]:
+    """Get the process-wide similarity cache, or None when it is disabled."""
+    global _default_cache
+    if not SIMILARITY_CACHE_ENABLED:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = SimilarityCache()
+            logging.info("Similarity cache enabled | threshold=%.2f", _default_cache.threshold)
+        return _default_cache
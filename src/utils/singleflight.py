@@ -0,0 +1,220 @@
+"""Coalescing of identical concurrent calls ("single flight")."""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
+from src.utils.cancellation import POLL_INTERVAL, SharedCancelToken, cancel_scope, current_token, raise_if_cancelled
+
+# Marks "no buffered chunk; fetch one from the source" in _subscribe
+_PULL = object()
+
+
+class _Call:
+    """A blocking call that other callers with the same key wait on."""
+
+    __slots__ = ("done", "result", "error", "cancel")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.cancel = SharedCancelToken()
+
+
+class _Broadcast:
+    """A chunk stream replayed to every subscriber.
+
+    Chunks are buffered, so a subscriber that joins late first catches up on
+    what was already produced. There is no producer thread: whichever
+    subscriber first needs a chunk nobody has fetched yet pulls it from the
+    source, so the stream keeps moving as long as anyone is reading.
+    """
+
+    def __init__(self, source: Iterator[Any]):
+        self.source = source
+        self.chunks: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.pulling = False
+        self.subscribers = 0
+        self.cond = threading.Condition()
+        self.cancel = SharedCancelToken()
+
+
+class SingleFlight:
+    """Run at most one call per key at a time and share its result.
+
+    Callers arriving while a call with the same key is in flight wait for it
+    instead of starting their own. Nothing is remembered once the call ends;
+    replaying finished results is the response cache's job.
+
+    A shared call runs under a token that is cancelled only once every
+    caller has been cancelled (see cancellation.cancel_scope); a cancelled
+    caller stops waiting on its own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self._tasks: Dict[Tuple[Any, Hashable], "asyncio.Task"] = {}
+        self._task_cancel: Dict[Tuple[Any, Hashable], SharedCancelToken] = {}
+        self._waiters: Dict[Tuple[Any, Hashable], int] = {}
+        self._streams: Dict[Hashable, _Broadcast] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Call fn, or wait for the in-flight call with the same key.
+
+        Returns (result, shared), where shared is True if another caller's
+        call was reused. Exceptions are shared the same way.
+        """
+        token = current_token()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            call.cancel.join(token)
+        if not leader:
+            while not call.done.wait(POLL_INTERVAL if token is not None else None):
+                raise_if_cancelled()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+        try:
+            with cancel_scope(call.cancel):
+                call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Async counterpart of do; fn creates the coroutine for the shared call.
+
+        Calls are shared within one event loop. The shared task is cancelled
+        only when every caller waiting on it has been cancelled, whether as
+        an asyncio task or through its cancel token.
+        """
+        token = current_token()
+        loop = asyncio.get_running_loop()
+        task_key = (loop, key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            leader = task is None
+            if leader:
+                cancel = self._task_cancel[task_key] = SharedCancelToken()
+                with cancel_scope(cancel):  # the task copies the current context
+                    task = self._tasks[task_key] = loop.create_task(fn())
+                task.add_done_callback(lambda _: self._forget_task(task_key, task))
+            self._task_cancel[task_key].join(token)
+            self._waiters[task_key] = self._waiters.get(task_key, 0) + 1
+        try:
+            while not task.done():
+                await asyncio.wait({task}, timeout=POLL_INTERVAL if token is not None else None)
+                raise_if_cancelled()
+            return task.result(), not leader
+        except asyncio.CancelledError:
+            with self._lock:
+                last = self._waiters.get(task_key) == 1
+            if last and not task.done():
+                task.cancel()
+            raise
+        finally:
+            with self._lock:
+                remaining = self._waiters.get(task_key, 1) - 1
+                if remaining:
+                    self._waiters[task_key] = remaining
+                else:
+                    self._waiters.pop(task_key, None)
+
+    def stream(self, key: Hashable, fn: Callable[[], Iterator[Any]]) -> Tuple[Iterator[Any], bool]:
+        """Subscribe to the in-flight stream with the same key, or start it with fn.
+
+        Returns (chunks, shared). Every subscriber receives the whole stream.
+        If all subscribers stop reading early, the source is closed.
+        """
+        with self._lock:
+            broadcast = self._streams.get(key)
+            shared = broadcast is not None
+            if not shared:
+                broadcast = self._streams[key] = _Broadcast(fn())
+            broadcast.subscribers += 1
+            broadcast.cancel.join(current_token())
+        return self._subscribe(key, broadcast), shared
+
+    def _forget_task(self, task_key, task):
+        with self._lock:
+            if self._tasks.get(task_key) is task:
+                del self._tasks[task_key]
+                del self._task_cancel[task_key]
+
+    def _subscribe(self, key: Hashable, broadcast: _Broadcast) -> Iterator[Any]:
+        index = 0
+        poll = POLL_INTERVAL if current_token() is not None else None
+        try:
+            while True:
+                raise_if_cancelled()
+                with broadcast.cond:
+                    while index >= len(broadcast.chunks) and not broadcast.done and broadcast.pulling:
+                        broadcast.cond.wait(poll)
+                        raise_if_cancelled()
+                    if index < len(broadcast.chunks):
+                        chunk = broadcast.chunks[index]
+                    elif broadcast.done:
+                        if broadcast.error is not None:
+                            raise broadcast.error
+                        return
+                    else:
+                        broadcast.pulling = True
+                        chunk = _PULL
+                if chunk is _PULL:
+                    self._pull(key, broadcast)
+                    continue
+                index += 1
+                yield chunk
+        finally:
+            with self._lock:
+                broadcast.subscribers -= 1
+                abandoned = broadcast.subscribers == 0 and not broadcast.done
+                if abandoned and self._streams.get(key) is broadcast:
+                    del self._streams[key]
+            if abandoned:
+                broadcast.source.close()
+
+    def _pull(self, key: Hashable, broadcast: _Broadcast):
+        """Fetch the next chunk from the source on behalf of all subscribers."""
+        try:
+            with cancel_scope(broadcast.cancel):
+                chunk = next(broadcast.source)
+        except BaseException as e:
+            with self._lock:
+                if self._streams.get(key) is broadcast:
+                    del self._streams[key]
+            with broadcast.cond:
+                broadcast.done = True
+                if not isinstance(e, StopIteration):
+                    broadcast.error = e
+                broadcast.pulling = False
+                broadcast.cond.notify_all()
+            return
+        with broadcast.cond:
+            broadcast.chunks.append(chunk)
+            broadcast.pulling = False
+            broadcast.cond.notify_all()
+
+
+_default_flight: Optional[SingleFlight] = None
+_default_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """Get the process-wide group used to coalesce model calls."""
+    global _default_flight
+    with _default_flight_lock:
+        if _default_flight is None:
+            _default_flight = SingleFlight()
+        return _default_flight
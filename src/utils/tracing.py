@@ -0,0 +1,231 @@
+"""Lightweight tracing with OpenTelemetry-compatible JSONL export."""
+import os
+import json
+import time
+import random
+import logging
+import threading
+import contextvars
+from logging.handlers import RotatingFileHandler
+from typing import Dict, Any, List, Optional
+
+from src.utils.helpers import (
+    TRACE_FILE, TRACE_SAMPLE_RATE, TRACE_MAX_BYTES, TRACE_BACKUP_COUNT, SERVICE_NAME
+)
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("phoenix_current_span", default=None)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    """Encode an attribute value as an OTLP AnyValue."""
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Span:
+    """One timed operation within a trace.
+
+    Use as a context manager to make it the current span (so nested spans
+    become its children) and end it on exit. Spans that cross generator
+    yields can instead be ended explicitly with end().
+    """
+
+    def __init__(self, tracer: "Tracer", trace: "_Trace", name: str,
+                 parent: Optional["Span"], attributes: Optional[Dict[str, Any]] = None):
+        self.tracer = tracer
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent else ""
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.error: Optional[str] = None
+        self._token = None
+        trace.open_spans += 1
+
+    def set_attribute(self, key: str, value: Any):
+        """Attach an attribute; None values are skipped."""
+        if value is not None:
+            self.attributes[key] = value
+
+    def record_error(self, message: str):
+        """Mark the span as failed."""
+        self.error = message
+
+    def end(self):
+        """Finish the span; the trace is exported once its last span ends."""
+        if self.end_ns:
+            return
+        self.end_ns = time.time_ns()
+        self.tracer._finish(self)
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.record_error(f"{exc_type.__name__}: {exc}")
+        self.end()
+        return False
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Encode the span in OTLP/JSON form."""
+        span = {
+            "traceId": self.trace.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in self.attributes.items()],
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1}
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    """Stand-in for spans of unsampled traces; every method does nothing.
+
+    A new one is handed out per span: each holds the token that restores the
+    previous current span, so one instance cannot be entered twice at once.
+    """
+
+    __slots__ = ("_token",)
+    name = ""
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def record_error(self, message: str):
+        pass
+
+    def end(self):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class _Trace:
+    """Spans collected for one sampled trace."""
+
+    def __init__(self):
+        self.trace_id = os.urandom(16).hex()
+        self.spans: List[Span] = []
+        self.open_spans = 0
+        self.lock = threading.Lock()
+
+
+class Tracer:
+    """Create spans, sample whole traces and export them as JSON lines.
+
+    Each finished trace is written as one OTLP/JSON ``resourceSpans`` document
+    per line, to a size-rotated file. The keep/drop decision is made when the
+    root span starts, so a trace is either recorded completely or not at all.
+    """
+
+    def __init__(self, path: Optional[str] = TRACE_FILE, sample_rate: float = TRACE_SAMPLE_RATE,
+                 max_bytes: int = TRACE_MAX_BYTES, backup_count: int = TRACE_BACKUP_COUNT):
+        self.sample_rate = sample_rate
+        self._logger: Optional[logging.Logger] = None
+        if path and sample_rate > 0:
+            self._logger = logging.getLogger(f"phoenix.traces.{id(self)}")
+            self._logger.propagate = False
+            self._logger.setLevel(logging.INFO)
+            handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._logger.addHandler(handler)
+
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None,
+                   parent: Optional[Span] = None):
+        """Start a span under parent (default: the current span).
+
+        Without a parent this starts a new trace, subject to sampling.
+        """
+        if parent is None:
+            parent = _current_span.get()
+        if isinstance(parent, _NoopSpan):
+            return _NoopSpan()
+        if parent is None:
+            if self._logger is None or random.random() >= self.sample_rate:
+                return _NoopSpan()
+            return Span(self, _Trace(), name, None, attributes)
+        return Span(self, parent.trace, name, parent, attributes)
+
+    def use_span(self, span):
+        """Make an existing span current for a with-block without ending it."""
+        return _Activation(span)
+
+    def _finish(self, span: Span):
+        """Collect a finished span and export the trace once all spans are done."""
+        trace = span.trace
+        with trace.lock:
+            trace.spans.append(span)
+            trace.open_spans -= 1
+            if trace.open_spans:
+                return
+            spans = list(trace.spans)
+        document = {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": SERVICE_NAME}}
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": "phoenix.tracing"},
+                    "spans": [s.to_otlp() for s in spans]
+                }]
+            }]
+        }
+        self._logger.info(json.dumps(document, separators=(",", ":")))
+
+
+class _Activation:
+    """Context manager that sets the current span temporarily."""
+
+    def __init__(self, span):
+        self.span = span
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        return False
+
+
+def current_span():
+    """Get the active span, or the no-op span when nothing is being traced."""
+    return _current_span.get() or NOOP_SPAN
+
+
+_default_tracer: Optional[Tracer] = None
+_default_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Get the process-wide tracer configured from the environment."""
+    global _default_tracer
+    with _default_tracer_lock:
+        if _default_tracer is None:
+            _default_tracer = Tracer()
+        return _default_tracer
@@ -0,0 +1,17 @@
+"""Shared test setup: run offline, without writing traces or logs next to the code."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
+os.environ.update({
+    "PHOENIX_TRACE_SAMPLE_RATE": "0",
+    "PHOENIX_BACKEND": "simulated",
+    "PHOENIX_SIM_TTFT": "constant:0",
+    "PHOENIX_SIM_CHUNK_DELAY": "constant:0",
+    "PHOENIX_WARMUP": "0",
+    "PHOENIX_METRICS_PORT": "0",
+    "PHOENIX_RPM_LIMIT": "0",
+    "PHOENIX_TPM_LIMIT": "0"
+})
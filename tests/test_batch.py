@@ -0,0 +1,23 @@
+from src.core.batch import BatchRun
+from src.core.system import build_orchestrator
+from src.utils.scheduler import request_context
+
+AGENTS = ["ConceptExplainer", "CodeGenerator"]
+
+
+def test_batch_synthesis_runs_at_background_priority(monkeypatch):
+    orchestrator = build_orchestrator()
+    priorities = []
+
+    def generate_response(prompt, context="", metrics=None):
+        priorities.append(request_context.get()["priority"])
+        return "combined answer"
+
+    monkeypatch.setattr(orchestrator, "decide_agents", lambda query, has_code=False: AGENTS)
+    monkeypatch.setattr(orchestrator, "call_agent", lambda name, prompt, ctx: f"{name} says hi")
+    monkeypatch.setattr(orchestrator, "generate_response", generate_response)
+
+    results = list(BatchRun(orchestrator, ["Explain recursion", "Write a loop"], concurrency=2))
+
+    assert [r["result"]["final_response"] for r in results] == ["combined answer"] * 2
+    assert priorities == ["background", "background"]
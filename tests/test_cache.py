@@ -0,0 +1,61 @@
+import json
+import threading
+
+from src.agents import GeneralChatAgent
+from src.utils.cache import ResponseCache, make_cache_key
+
+CONFIG = {"temperature": 0.2}
+
+
+def session_context(user_id: str, skill_level: str, concepts) -> str:
+    return json.dumps({"user_id": user_id, "skill_level": skill_level,
+                       "concepts_covered": concepts, "progress_score": len(concepts)})
+
+
+def key(prompt: str, context: str = "") -> str:
+    """Cache key of an agent call, built from the prompt the model is actually sent."""
+    agent = GeneralChatAgent()
+    return make_cache_key(agent.name, "model", CONFIG, agent.build_prompt(prompt, context))
+
+
+def test_cache_key_ignores_formatting_only_differences():
+    context = session_context("alice", "beginner", ["loops"])
+    assert key("Explain recursion", context) == key("Explain  recursion\n", context)
+
+
+def test_cache_key_separates_learners():
+    alice = session_context("alice", "beginner", ["loops"])
+    bob = session_context("bob", "beginner", ["recursion", "closures"])
+    assert key("Explain recursion", alice) != key("Explain recursion", bob)
+
+
+def test_cache_key_varies_by_query_and_code():
+    context = session_context("alice", "beginner", [])
+    assert key("Explain recursion", context) != key("Explain closures", context)
+    assert key("Review\n\nCode:\nx = 1", context) != key("Review\n\nCode:\nx = 2", context)
+
+
+def test_cache_key_covers_truncated_context():
+    # ContextBuilder's last-resort cut is not valid JSON; it is still keyed whole
+    assert key("Explain recursion", '{"user_id":"alice"...') != key("Explain recursion", '{"user_id":"bob"...')
+
+
+def test_disk_tier_survives_a_new_cache(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ResponseCache(db_path=path).set("k", "answer")
+    cache = ResponseCache(db_path=path)
+    assert cache.get("k") == "answer"
+    assert cache.stats()["hits_disk"] == 1
+    assert cache.get("k") == "answer"
+    assert cache.stats()["hits_memory"] == 1
+
+
+def test_memory_hits_do_not_wait_for_disk(tmp_path):
+    cache = ResponseCache(db_path=str(tmp_path / "cache.db"))
+    cache.set("k", "answer")
+    result = []
+    with cache._db_lock:  # a slow disk write in progress
+        reader = threading.Thread(target=lambda: result.append(cache.get("k")))
+        reader.start()
+        reader.join(timeout=1.0)
+        assert result == ["answer"]
@@ -0,0 +1,45 @@
+import gzip
+import json
+import os
+import subprocess
+import sys
+
+from src.utils.history import InteractionHistory
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def spilled(path):
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line)["prompt_excerpt"] for line in f]
+
+
+def test_full_batches_spill_in_eviction_order(tmp_path):
+    path = str(tmp_path / "agent.jsonl.gz")
+    history = InteractionHistory("Agent", capacity=2, spill_path=path)
+    for i in range(InteractionHistory.SPILL_BATCH + 2):
+        history.append(f"q{i}", "a", 0.0)
+    assert spilled(path) == [f"q{i}" for i in range(InteractionHistory.SPILL_BATCH)]
+    assert [r["prompt_excerpt"] for r in history.last(2)] == ["q64", "q65"]
+
+
+def test_close_spills_a_partial_batch(tmp_path):
+    path = str(tmp_path / "agent.jsonl.gz")
+    history = InteractionHistory("Agent", capacity=2, spill_path=path)
+    for i in range(5):
+        history.append(f"q{i}", "a", 0.0)
+    assert not os.path.exists(path)
+    history.close()
+    assert spilled(path) == ["q0", "q1", "q2"]
+
+
+def test_pending_records_are_spilled_at_exit(tmp_path):
+    path = str(tmp_path / "agent.jsonl.gz")
+    script = (
+        "from src.utils.history import InteractionHistory\n"
+        f"history = InteractionHistory('Agent', capacity=1, spill_path={path!r})\n"
+        "for i in range(3):\n"
+        "    history.append(f'q{i}', 'a', 0.0)\n"
+    )
+    subprocess.run([sys.executable, "-c", script], cwd=ROOT, check=True)
+    assert spilled(path) == ["q0", "q1"]
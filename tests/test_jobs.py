@@ -0,0 +1,102 @@
+import time
+from types import SimpleNamespace
+
+from src.core.jobs import JobExecutor
+from src.utils import helpers
+from src.utils.backends import SimulatedBackend
+from src.utils.resilience import ResiliencePolicy
+
+MODEL = "simulated"
+
+
+class FakeOrchestrator:
+    """Answers a query by streaming its words back, one every delay seconds."""
+
+    def __init__(self, session_id: str, delay: float = 0.02):
+        self.session_manager = SimpleNamespace(session_id=session_id)
+        self.delay = delay
+
+    def stream_query(self, query, code=""):
+        yield {"type": "routed", "agents": ["GeneralChatAgent"]}
+        for word in query.split():
+            time.sleep(self.delay)
+            yield {"type": "chunk", "text": word + " "}
+        yield {"type": "done", "result": {"final_response": query}}
+
+
+class ModelOrchestrator(FakeOrchestrator):
+    """Streams a real (simulated) model call, so cancelling it goes through the breaker."""
+
+    def stream_query(self, query, code=""):
+        backend = SimulatedBackend(MODEL, ttft="constant:0", chunk_delay="constant:0.05")
+        for text in helpers.safe_generate_stream(backend, query):
+            yield {"type": "chunk", "text": text}
+
+
+def wait_until(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out waiting"
+        time.sleep(0.01)
+
+
+def test_job_streams_then_finishes():
+    executor = JobExecutor(max_workers=2)
+    job = executor.submit(FakeOrchestrator("A"), "one two three")
+    wait_until(lambda: job.done)
+    snapshot = job.snapshot()
+    assert snapshot["status"] == "done"
+    assert snapshot["agents"] == ["GeneralChatAgent"]
+    assert snapshot["partial"] == "one two three "
+    assert snapshot["result"] == {"final_response": "one two three"}
+
+
+def test_cancel_queued_job_drops_it():
+    executor = JobExecutor(max_workers=1)
+    orchestrator = FakeOrchestrator("A")
+    first = executor.submit(orchestrator, "a b c d e")
+    second = executor.submit(orchestrator, "f g h")
+    assert executor.cancel(second.id)
+    assert second.status == "cancelled"
+    wait_until(lambda: first.done)
+    assert first.status == "done"
+    assert second.snapshot()["partial"] == ""
+
+
+def test_cancel_running_job_keeps_partial_answer():
+    executor = JobExecutor(max_workers=1)
+    job = executor.submit(FakeOrchestrator("A", delay=0.05), " ".join(["word"] * 40))
+    wait_until(lambda: job.snapshot()["partial"])
+    assert executor.cancel(job.id)
+    wait_until(lambda: job.done)
+    assert job.status == "cancelled"
+    assert job.snapshot()["partial"].startswith("word ")
+    assert not executor.cancel(job.id)
+
+
+def test_sessions_take_turns_for_workers():
+    executor = JobExecutor(max_workers=1)
+    busy = FakeOrchestrator("A")
+    queued = [executor.submit(busy, "a b c") for _ in range(3)]
+    late = executor.submit(FakeOrchestrator("B"), "x y z")
+    wait_until(lambda: all(job.done for job in queued + [late]))
+    assert late.started < queued[2].started
+    assert queued[0].started < queued[1].started < queued[2].started
+
+
+def test_stopping_job_during_half_open_probe_frees_the_probe(monkeypatch):
+    policy = ResiliencePolicy(max_retries=0, hedge_percentile=0, breaker_failures=1, breaker_reset=0.01)
+    policy.on_failure(MODEL, ConnectionError("down"), 0)
+    time.sleep(0.02)
+    monkeypatch.setattr(helpers, "_model_policy", policy)
+
+    executor = JobExecutor(max_workers=1)
+    job = executor.submit(ModelOrchestrator("A"), "Explain recursion in python")
+    wait_until(lambda: job.snapshot()["partial"])
+    assert policy.breaker(MODEL).acquire() is None  # the job holds the probe
+    executor.cancel(job.id)
+    wait_until(lambda: job.done)
+
+    assert job.status == "cancelled"
+    assert policy.breaker(MODEL).is_open
+    assert policy.breaker(MODEL).acquire()
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.core.session_manager import SessionManager
+from src.core.session_store import SessionNotFound, SessionStore
+from src.core.system import build_orchestrator
+from src.utils.backends import SimulatedBackend
+from src.utils.cancellation import CancelToken, Cancelled, cancel_scope, raise_if_cancelled
+
+AGENTS = ["ConceptExplainer", "CodeGenerator"]
+
+
+def test_agent_timeout_starts_when_the_agent_runs(monkeypatch):
+    orchestrator = build_orchestrator()
+    orchestrator.executor = ThreadPoolExecutor(max_workers=1)  # the second agent queues
+    orchestrator.agent_timeout = 0.3
+
+    def call_agent(name, prompt, ctx):
+        time.sleep(0.2)
+        return f"{name} answer"
+
+    monkeypatch.setattr(orchestrator, "call_agent", call_agent)
+    responses = orchestrator._run_agents(AGENTS, "Explain recursion", "", "")
+    assert responses == {name: f"{name} answer" for name in AGENTS}
+
+
+def test_timed_out_agent_is_cancelled(monkeypatch):
+    orchestrator = build_orchestrator()
+    orchestrator.agent_timeout = 0.1
+    stopped = threading.Event()
+
+    def call_agent(name, prompt, ctx):
+        if name == "ConceptExplainer":
+            return "quick answer"
+        try:
+            for _ in range(500):
+                time.sleep(0.01)
+                raise_if_cancelled()
+        except Cancelled:
+            stopped.set()
+            raise
+        return "too late"
+
+    monkeypatch.setattr(orchestrator, "call_agent", call_agent)
+    responses = orchestrator._run_agents(AGENTS, "Explain recursion", "", "")
+    assert responses["ConceptExplainer"] == "quick answer"
+    assert responses["CodeGenerator"].startswith("[CodeGenerator TIMEOUT]")
+    assert stopped.wait(1.0)
+
+
+def test_sessions_fan_out_concurrently(monkeypatch):
+    orchestrator = build_orchestrator()
+    orchestrator.agent_timeout = 0.5
+    agents = list(orchestrator.agents)
+
+    def call_agent(name, prompt, ctx):
+        time.sleep(0.2)
+        return f"{name} answer"
+
+    monkeypatch.setattr(orchestrator, "call_agent", call_agent)
+    sessions = []
+    for user in ("alice", "bob"):
+        manager = SessionManager(SessionStore())
+        manager.create_session(user, "beginner")
+        sessions.append(orchestrator.bind_session(manager))
+    assert sessions[0].executor is sessions[1].executor
+
+    results = {}
+
+    def ask(session):
+        results[session.session_manager.session_id] = session._run_agents(agents, "Explain recursion", "", "")
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=ask, args=(session,)) for session in sessions]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert time.monotonic() - start < 0.4  # every agent of both sessions ran at once
+    for responses in results.values():
+        assert responses == {name: f"{name} answer" for name in agents}
+
+
+def test_lost_session_is_reported_to_the_caller(monkeypatch):
+    manager = SessionManager(SessionStore())
+    manager.create_session("alice")
+    orchestrator = build_orchestrator().bind_session(manager)
+    monkeypatch.setattr(orchestrator, "decide_agents", lambda query, has_code=False: AGENTS)
+    monkeypatch.setattr(orchestrator, "call_agent", lambda name, prompt, ctx: f"{name} explains recursion")
+    manager.store.delete(manager.session_id)
+
+    with pytest.raises(SessionNotFound):
+        orchestrator.process_query("Explain recursion")
+
+
+def test_cancelled_async_agent_call_raises(monkeypatch):
+    orchestrator = build_orchestrator()
+    agent = orchestrator.agents["ConceptExplainer"]
+    monkeypatch.setattr(agent, "model", SimulatedBackend("simulated", ttft="constant:0", chunk_delay="constant:0.05",
+                                                         output_words=100, chunk_words=2))
+    token = CancelToken()
+
+    async def scenario():
+        with cancel_scope(token):
+            call = asyncio.ensure_future(orchestrator.acall_agent("ConceptExplainer", "Explain closures", ""))
+        await asyncio.sleep(0.1)
+        token.cancel()
+        start = time.monotonic()
+        with pytest.raises(Cancelled):
+            await call
+        return time.monotonic() - start
+
+    assert asyncio.run(scenario()) < 0.5
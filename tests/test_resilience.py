@@ -0,0 +1,175 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.utils import helpers
+from src.utils.backends import SimulatedBackend
+from src.utils.cancellation import Cancelled, raise_if_cancelled
+from src.utils.resilience import CircuitBreaker, CircuitOpenError, ResiliencePolicy
+from src.utils.scheduler import SchedulerTimeout
+
+MODEL = "simulated"
+
+
+def open_policy() -> ResiliencePolicy:
+    """A policy whose breaker for MODEL has just opened and is ready to probe."""
+    policy = ResiliencePolicy(max_retries=0, hedge_percentile=0, breaker_failures=1, breaker_reset=0.01)
+    policy.on_failure(MODEL, ConnectionError("down"), 0)
+    assert policy.breaker(MODEL).is_open
+    time.sleep(0.02)
+    return policy
+
+
+def test_breaker_half_open_transitions():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.01)
+    assert breaker.acquire() == 0
+    assert not breaker.record_failure()
+    assert breaker.record_failure()
+    assert breaker.acquire() is None
+
+    time.sleep(0.02)
+    probe = breaker.acquire()
+    assert probe
+    assert breaker.acquire() is None  # one probe at a time
+    assert breaker.record_failure()  # failed probe reopens
+    assert breaker.acquire() is None
+
+    time.sleep(0.02)
+    assert breaker.acquire()
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.acquire() == 0
+
+
+def test_release_probe_only_frees_its_own_slot():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    first = breaker.acquire()
+    breaker.release_probe(first)
+    second = breaker.acquire()
+    breaker.release_probe(first)  # stale: must not free the second probe
+    assert breaker.acquire() is None
+    breaker.release_probe(second)
+    assert breaker.is_open
+    assert breaker.acquire()
+
+
+def test_probe_ended_by_local_rejection_releases_slot():
+    policy = open_policy()
+
+    def rejected():
+        raise SchedulerTimeout("no model quota")
+
+    with pytest.raises(SchedulerTimeout):
+        policy.call(MODEL, rejected)
+    assert policy.breaker(MODEL).is_open
+    assert policy.call(MODEL, lambda: "ok") == "ok"
+    assert not policy.breaker(MODEL).is_open
+
+
+def test_async_probe_cancelled_by_timeout_releases_slot():
+    policy = open_policy()
+
+    async def slow():
+        await asyncio.sleep(1)
+        return "late"
+
+    async def fast():
+        return "ok"
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(policy.acall(MODEL, slow), 0.01)
+        return await policy.acall(MODEL, fast)
+
+    assert asyncio.run(scenario()) == "ok"
+    assert not policy.breaker(MODEL).is_open
+
+
+def test_stream_probe_closed_by_consumer_releases_slot(monkeypatch):
+    policy = open_policy()
+    monkeypatch.setattr(helpers, "_model_policy", policy)
+    backend = SimulatedBackend(MODEL, ttft="constant:0", chunk_delay="constant:0", output_words=50, chunk_words=2)
+
+    stream = helpers.safe_generate_stream(backend, "Explain recursion")
+    next(stream)
+    stream.close()  # e.g. an SSE client disconnecting mid-answer
+
+    assert policy.breaker(MODEL).is_open
+    assert "".join(helpers.safe_generate_stream(backend, "Explain recursion"))
+    assert not policy.breaker(MODEL).is_open
+
+
+def test_open_circuit_fails_fast():
+    policy = ResiliencePolicy(max_retries=0, hedge_percentile=0, breaker_failures=1, breaker_reset=60)
+    policy.on_failure(MODEL, ConnectionError("down"), 0)
+    with pytest.raises(CircuitOpenError):
+        policy.call(MODEL, lambda: "ok")
+
+
+def hedging_policy() -> ResiliencePolicy:
+    """A policy that hedges calls to MODEL still running after 50ms."""
+    policy = ResiliencePolicy(max_retries=0, hedge_percentile=0.5, hedge_min_samples=1, hedge_min_delay=0.05)
+    policy.on_success(MODEL, 0.01)
+    return policy
+
+
+def test_quota_wait_does_not_count_toward_hedge_delay():
+    policy = hedging_policy()
+    calls = []
+
+    def admit(wait):
+        time.sleep(0.2)  # queued behind other callers for longer than the hedge delay
+        return 1
+
+    def fn(ticket):
+        calls.append(ticket)
+        time.sleep(0.01)
+        return "ok"
+
+    assert policy.call(MODEL, fn, admit=admit) == "ok"
+    assert calls == [1]
+
+
+def test_hedge_is_skipped_without_free_quota():
+    policy = hedging_policy()
+    calls = []
+
+    def fn(ticket):
+        calls.append(ticket)
+        time.sleep(0.1)
+        return "ok"
+
+    assert policy.call(MODEL, fn, admit=lambda wait: 1 if wait else None) == "ok"
+    assert calls == [1]
+
+
+def test_losing_call_is_cancelled():
+    policy = hedging_policy()
+    stopped = threading.Event()
+
+    def fn(ticket):
+        if ticket == "hedge":
+            return "hedge answer"
+        try:
+            for _ in range(200):
+                time.sleep(0.01)
+                raise_if_cancelled()
+        except Cancelled:
+            stopped.set()
+            raise
+        return "too late"
+
+    assert policy.call(MODEL, fn, admit=lambda wait: "primary" if wait else "hedge") == "hedge answer"
+    assert stopped.wait(1.0)
+
+
+def test_reserve_hedge_workers_only_grows_the_pool():
+    policy = ResiliencePolicy(hedge_workers=4)
+    policy.reserve_hedge_workers(10)
+    policy.reserve_hedge_workers(3)
+    assert policy.hedge_workers == 20
+    assert policy._get_executor()._max_workers == 20
@@ -0,0 +1,42 @@
+from src.core.router import QueryRouter
+from src.utils.matcher import PhraseMatcher
+
+
+def test_phrases_match_whole_words_only():
+    router = QueryRouter.from_file()
+    assert router.route("hi there")["agents"] == ["GeneralChatAgent"]
+    assert "GeneralChatAgent" not in router.route("explain this code to me")["agents"]
+    assert router.route("what's a closure")["agents"] == ["ConceptExplainer"]
+
+
+def test_overlapping_phrases_each_match_once():
+    matcher = PhraseMatcher()
+    matcher.add("a b", "AB")
+    matcher.add("b", "B")
+    assert matcher.find("a b") == ["AB", "B"]
+
+
+def test_recompiling_does_not_duplicate_matches():
+    matcher = PhraseMatcher()
+    matcher.add("a b", "AB")
+    matcher.add("b", "B")
+    assert matcher.find("a b") == ["AB", "B"]
+    matcher.compile()
+    assert matcher.find("a b") == ["AB", "B"]
+    matcher.add("c", "C")  # recompiled by the next match
+    assert matcher.find("a b c") == ["AB", "B", "C"]
+
+
+def test_router_scores_are_stable_across_recompiles():
+    router = QueryRouter({
+        "default_agent": "ConceptExplainer",
+        "fallback_agent": "GeneralChatAgent",
+        "rules": [
+            {"id": "review", "agent": "CodeReviewer", "patterns": ["improve code"]},
+            {"id": "generate", "agent": "CodeGenerator", "patterns": ["code"]},
+        ],
+    })
+    first = router.route("please improve code")["scores"]
+    assert first == {"CodeReviewer": 1.0, "CodeGenerator": 1.0}
+    router.matcher.compile()
+    assert router.route("please improve code")["scores"] == first
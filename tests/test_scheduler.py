@@ -0,0 +1,67 @@
+import threading
+import time
+
+import pytest
+
+from src.utils import helpers
+from src.utils.backends import SimulatedBackend
+from src.utils.scheduler import RequestScheduler, SchedulerTimeout, request_scope
+
+
+def tpm_level(scheduler: RequestScheduler) -> float:
+    return scheduler._buckets[1].level
+
+
+def test_acquire_takes_estimate_and_settle_corrects_it():
+    scheduler = RequestScheduler(rpm=0, tpm=100000, burst=0.99)
+    start = tpm_level(scheduler)
+    scheduler.acquire(1000)
+    assert tpm_level(scheduler) == pytest.approx(start - 1000, abs=5)
+    scheduler.settle(1000, 400)  # used less than reserved: refund
+    assert tpm_level(scheduler) == pytest.approx(start - 400, abs=5)
+    scheduler.settle(400, 900)  # used more: charge the difference
+    assert tpm_level(scheduler) == pytest.approx(start - 900, abs=5)
+
+
+def test_acquire_times_out_without_taking_quota():
+    scheduler = RequestScheduler(rpm=1, tpm=0, max_wait=0.05)
+    scheduler.acquire(1)
+    with pytest.raises(SchedulerTimeout):
+        scheduler.acquire(1)
+    assert scheduler.queue_depth() == {"interactive": 0, "synthesis": 0, "background": 0}
+
+
+def test_timed_out_stream_leaves_token_quota_unchanged(monkeypatch):
+    # one request per minute, a large token allowance that refills slowly
+    scheduler = RequestScheduler(rpm=1, tpm=100000, burst=0.99, max_wait=0.05)
+    monkeypatch.setattr(helpers, "_model_scheduler", scheduler)
+    scheduler.acquire(1000)
+    before = tpm_level(scheduler)
+
+    backend = SimulatedBackend("simulated", ttft="constant:0", chunk_delay="constant:0")
+    text = "".join(helpers.safe_generate_stream(backend, "Explain recursion"))
+
+    assert "no model quota" in text
+    assert backend.calls == 0
+    assert tpm_level(scheduler) == pytest.approx(before, abs=5)
+
+
+def test_sessions_take_turns_within_a_priority():
+    scheduler = RequestScheduler(rpm=600, tpm=0, burst=0.0)  # one request every 0.1s
+    scheduler.acquire(1)  # use up the burst
+    order = []
+
+    def call(session, n):
+        with request_scope(session, "interactive"):
+            scheduler.acquire(1)
+        order.append((session, n))
+
+    threads = [threading.Thread(target=call, args=("A", i)) for i in range(3)]
+    for t in threads:
+        t.start()
+        time.sleep(0.01)
+    late = threading.Thread(target=call, args=("B", 0))
+    late.start()
+    for t in threads + [late]:
+        t.join()
+    assert order.index(("B", 0)) < order.index(("A", 2))
@@ -0,0 +1,54 @@
+import os
+import signal
+import time
+
+import pytest
+
+from src import server
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="multiple workers need os.fork")
+
+
+@pytest.fixture
+def crashing_workers(monkeypatch, tmp_path):
+    def crash(*args):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(server, "_serve_worker", crash)
+    handlers = signal.getsignal(signal.SIGTERM), signal.getsignal(signal.SIGINT)
+    yield str(tmp_path / "sessions.db")
+    signal.signal(signal.SIGTERM, handlers[0])
+    signal.signal(signal.SIGINT, handlers[1])
+
+
+def test_crash_looping_worker_stops_the_server(crashing_workers):
+    start = time.monotonic()
+    with pytest.raises(SystemExit) as exit_info:
+        server.serve("127.0.0.1", 0, workers=2, session_db=crashing_workers, restart_limit=0)
+    assert exit_info.value.code == 1
+    assert time.monotonic() - start < 1.0
+
+
+def test_crashed_worker_is_restarted_after_a_delay(crashing_workers):
+    start = time.monotonic()
+    with pytest.raises(SystemExit):
+        server.serve("127.0.0.1", 0, workers=2, session_db=crashing_workers, restart_limit=1)
+    assert time.monotonic() - start >= 1.0  # one restart, one second later
+
+
+def test_clean_exits_do_not_count_as_crashes(crashing_workers, monkeypatch, tmp_path):
+    starts = tmp_path / "starts"
+    starts.touch()
+
+    def exit_then_crash(*args):
+        with open(starts, "a") as f:
+            f.write("start\n")
+        if len(starts.read_text().splitlines()) > 4:
+            raise RuntimeError("boom")
+
+    monkeypatch.setattr(server, "_serve_worker", exit_then_crash)
+    start = time.monotonic()
+    with pytest.raises(SystemExit):
+        server.serve("127.0.0.1", 0, workers=2, session_db=crashing_workers, restart_limit=0)
+    assert len(starts.read_text().splitlines()) > 4  # clean exits were restarted, the first crash stopped it
+    assert time.monotonic() - start < 1.0
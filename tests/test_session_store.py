@@ -0,0 +1,47 @@
+import pytest
+
+from src.core.session_manager import SessionManager
+from src.core.session_store import SessionNotFound, SessionStore, SQLiteSessionBackend
+
+
+def test_memory_store_forgets_least_recently_used_idle_sessions():
+    store = SessionStore(num_shards=1, max_resident=10, idle_ttl=0)
+    for i in range(10):
+        store.put(f"s{i}", {"progress_score": i})
+    store.get("s0")  # recently used, so kept
+    store.put("s10", {"progress_score": 10})
+
+    assert store.resident_count() <= 10
+    assert store.get("s0") == {"progress_score": 0}
+    assert store.get("s10") == {"progress_score": 10}
+    assert store.get("s1") is None
+
+
+def test_backed_store_reloads_evicted_sessions(tmp_path):
+    store = SessionStore(SQLiteSessionBackend(str(tmp_path / "sessions.db")), num_shards=1, max_resident=10)
+    for i in range(11):
+        store.put(f"s{i}", {"progress_score": i})
+
+    assert store.resident_count() <= 10
+    assert store.get("s0") == {"progress_score": 0}
+
+
+def test_memory_store_keeps_active_sessions_beyond_capacity():
+    store = SessionStore(num_shards=1, max_resident=10, idle_ttl=3600)
+    for i in range(20):
+        store.put(f"s{i}", {"progress_score": i})
+
+    assert store.resident_count() == 20
+    assert store.get("s0") == {"progress_score": 0}
+
+
+def test_failed_concept_update_leaves_covered_unchanged():
+    store = SessionStore(num_shards=1, max_resident=10, idle_ttl=0)
+    manager = SessionManager(store)
+    manager.create_session("alice")
+    assert manager.add_concepts(["loops", "loops"]) == ["loops"]
+    store.delete(manager.session_id)  # e.g. forgotten while idle
+
+    with pytest.raises(SessionNotFound):
+        manager.add_concepts(["recursion"])
+    assert manager._covered == {"loops"}
@@ -0,0 +1,51 @@
+import time
+
+from src.utils.similarity_cache import SimilarityCache, query_shingles
+
+AGENTS = ["ConceptExplainer"]
+ANSWER = {"final_response": "A decorator wraps a function.", "agent_responses": {}}
+
+
+def test_rephrased_question_hits():
+    cache = SimilarityCache()
+    cache.store("What's a python decorator?", AGENTS, ANSWER)
+    hit = cache.lookup("explain decorators in python", AGENTS)
+    assert hit["final_response"] == ANSWER["final_response"]
+    assert hit["similarity"] == 1.0
+
+
+def test_question_words_are_kept():
+    assert "why" in query_shingles("why use a python decorator")
+    cache = SimilarityCache()
+    cache.store("what is a python decorator", AGENTS, ANSWER)
+    assert cache.lookup("why python decorator", AGENTS) is None
+    assert cache.lookup("how does a python decorator work", AGENTS) is None
+
+
+def test_answers_are_scoped_to_agents_and_skill_level():
+    cache = SimilarityCache()
+    cache.store("what is a python decorator", AGENTS, ANSWER, "beginner")
+    assert cache.lookup("what is a python decorator", ["CodeGenerator"], "beginner") is None
+    assert cache.lookup("what is a python decorator", AGENTS, "advanced") is None
+    assert cache.lookup("what is a python decorator", AGENTS, "beginner") is not None
+
+
+def test_expired_entries_are_pruned_and_free_candidate_slots():
+    cache = SimilarityCache(max_candidates=2)
+    cache.store("python decorator syntax", AGENTS, ANSWER)
+    cache.ttl = 0.05
+    for i in range(3):  # newer, so looked at first
+        cache.store("python decorator syntax", AGENTS, {"final_response": f"stale {i}"})
+    time.sleep(0.1)
+    assert cache.lookup("python decorator syntax", AGENTS)["final_response"] == ANSWER["final_response"]
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["evictions"] == 3
+
+
+def test_oldest_entry_is_evicted_beyond_capacity():
+    cache = SimilarityCache(max_entries=2)
+    for topic in ("decorator", "generator", "closure"):
+        cache.store(f"python {topic}", AGENTS, {"final_response": topic})
+    assert cache.lookup("python decorator", AGENTS) is None
+    assert cache.lookup("python closure", AGENTS)["final_response"] == "closure"
+    assert cache.stats()["buckets"] <= 2 * cache.bands
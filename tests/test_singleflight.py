@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.utils.cancellation import CancelToken, Cancelled, cancel_scope, raise_if_cancelled
+from src.utils.singleflight import SingleFlight
+
+
+def slow_call():
+    for _ in range(25):
+        time.sleep(0.02)
+        raise_if_cancelled()
+    return "ok"
+
+
+def slow_stream():
+    for i in range(25):
+        time.sleep(0.02)
+        raise_if_cancelled()
+        yield i
+
+
+async def slow_acall():
+    for _ in range(25):
+        await asyncio.sleep(0.02)
+        raise_if_cancelled()
+    return "ok"
+
+
+def run_pair(call, cancel):
+    """Start a leader and a follower sharing one call, then cancel the named callers."""
+    tokens = {"leader": CancelToken(), "follower": CancelToken()}
+    results = {}
+
+    def caller(name):
+        with cancel_scope(tokens[name]):
+            try:
+                results[name] = call()
+            except Cancelled:
+                results[name] = "cancelled"
+
+    threads = {name: threading.Thread(target=caller, args=(name,)) for name in tokens}
+    threads["leader"].start()
+    time.sleep(0.05)
+    threads["follower"].start()
+    time.sleep(0.05)
+    start = time.monotonic()
+    for name in cancel:
+        tokens[name].cancel()
+    for thread in threads.values():
+        thread.join()
+    return results, time.monotonic() - start
+
+
+@pytest.mark.parametrize("cancel, expected", [
+    (("leader",), {"leader": ("ok", False), "follower": ("ok", True)}),
+    (("follower",), {"leader": ("ok", False), "follower": "cancelled"}),
+])
+def test_shared_call_survives_one_cancelled_caller(cancel, expected):
+    flight = SingleFlight()
+    results, _ = run_pair(lambda: flight.do("key", slow_call), cancel)
+    assert results == expected
+
+
+def test_shared_call_stops_when_every_caller_is_cancelled():
+    flight = SingleFlight()
+    results, elapsed = run_pair(lambda: flight.do("key", slow_call), ("leader", "follower"))
+    assert results == {"leader": "cancelled", "follower": "cancelled"}
+    assert elapsed < 0.2
+
+
+def test_shared_stream_keeps_serving_the_remaining_subscriber():
+    flight = SingleFlight()
+    results, _ = run_pair(lambda: list(flight.stream("key", slow_stream)[0]), ("leader",))
+    assert results == {"leader": "cancelled", "follower": list(range(25))}
+
+
+def test_shared_stream_stops_when_every_subscriber_is_cancelled():
+    flight = SingleFlight()
+    results, elapsed = run_pair(lambda: list(flight.stream("key", slow_stream)[0]),
+                                ("leader", "follower"))
+    assert results == {"leader": "cancelled", "follower": "cancelled"}
+    assert elapsed < 0.2
+
+
+@pytest.mark.parametrize("cancel, expected", [
+    (("leader",), {"leader": "cancelled", "follower": ("ok", True)}),
+    (("leader", "follower"), {"leader": "cancelled", "follower": "cancelled"}),
+])
+def test_shared_async_call_is_cancelled_only_with_every_caller(cancel, expected):
+    flight = SingleFlight()
+    tokens = {"leader": CancelToken(), "follower": CancelToken()}
+
+    async def caller(name):
+        with cancel_scope(tokens[name]):
+            try:
+                return await flight.ado("key", slow_acall)
+            except Cancelled:
+                return "cancelled"
+
+    async def scenario():
+        tasks = {}
+        for name in tokens:
+            tasks[name] = asyncio.ensure_future(caller(name))
+            await asyncio.sleep(0.05)
+        for name in cancel:
+            tokens[name].cancel()
+        return {name: await task for name, task in tasks.items()}
+
+    assert asyncio.run(scenario()) == expected
@@ -0,0 +1,29 @@
+from src.core.synthesis import dedupe_responses
+
+CODE = "```python\ndef f(n):\n    return n\n```"
+
+
+def test_duplicate_paragraphs_are_dropped_keeping_separators():
+    deduped = dedupe_responses({
+        "ConceptExplainer": "Recursion is a function calling itself.\n\nIt needs a base case.",
+        "CodeGenerator": "Here you go.\n\nIt needs a base case.\n\n\nAlways test it.",
+    })
+    assert deduped["ConceptExplainer"] == "Recursion is a function calling itself.\n\nIt needs a base case."
+    assert deduped["CodeGenerator"] == "Here you go.\n\n\nAlways test it."
+
+
+def test_duplicate_between_prose_and_code_fence_keeps_the_fence_on_its_own_line():
+    deduped = dedupe_responses({
+        "ConceptExplainer": "It needs a base case.",
+        "CodeGenerator": f"Here is an example.\n\nIt needs a base case.\n{CODE}\nThat's it.",
+    })
+    assert deduped["CodeGenerator"] == f"Here is an example.\n{CODE}\nThat's it."
+
+
+def test_duplicate_code_and_prose_between_two_fences():
+    other = "```python\nprint(f(3))\n```"
+    deduped = dedupe_responses({
+        "ConceptExplainer": f"It needs a base case.\n\n{CODE}",
+        "CodeGenerator": f"{CODE}\nIt needs a base case.\n{other}",
+    })
+    assert deduped["CodeGenerator"] == f"_(same code as in the 📚 Concept Explanation section)_\n\n{other}"
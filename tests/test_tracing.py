@@ -0,0 +1,44 @@
+import threading
+
+from src.utils.tracing import Tracer, Span, current_span, NOOP_SPAN
+
+
+def test_unsampled_spans_nest_and_restore_the_current_span(tmp_path):
+    tracer = Tracer(str(tmp_path / "traces.jsonl"), sample_rate=0)
+    with tracer.start_span("query") as outer:
+        with tracer.start_span("agents") as inner:
+            assert current_span() is inner
+        assert current_span() is outer
+    assert current_span() is NOOP_SPAN
+
+
+def test_unsampled_spans_in_concurrent_threads(tmp_path):
+    tracer = Tracer(str(tmp_path / "traces.jsonl"), sample_rate=0)
+    errors = []
+    barrier = threading.Barrier(4)
+
+    def work():
+        try:
+            with tracer.start_span("query"):
+                barrier.wait()
+                with tracer.start_span("agent"):
+                    pass
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+
+
+def test_sampled_trace_is_exported(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracer = Tracer(str(path), sample_rate=1)
+    with tracer.start_span("query") as root:
+        assert isinstance(root, Span)
+        with tracer.start_span("agents"):
+            pass
+    assert path.read_text().count("\n") == 1